@@ -0,0 +1,344 @@
+"""
+SYNTHETIC DATASET GENERATOR
+===========================
+Fills a scratch MySQL database with realistic results data for the grade
+engine benchmark (grade_engine_benchmark.py).
+
+- N students spread over batches (default 2021-2024), departments and
+  colleges; batches before 2022 are on the 2021 scheme, later ones on 2022
+- Each batch has as many semesters as it has completed (up to 8)
+- Per semester: core subjects, a lab, internal-only courses (external = 0),
+  one elective picked from a group of three, a mini project (100 marks) and
+  major project / internship subjects (200 marks)
+- Backlogs: failed subjects get further attempts (attempt_number 2, 3) with
+  a new external mark, as the scrapers store them
+- RV updates: a share of the results get their external marks revised after
+  the load, with a bulk UPDATE that clears the grade like Rv_ScrapperVTU.py
+
+result_status holds what the portal shows ('P' / 'F'); letter grades,
+summaries and CGPA are left empty for the grade engines to fill in.
+The same --seed always gives the same data.
+
+The database (default resana_bench, env BENCH_MYSQL_DATABASE) is created if
+missing and its tables are dropped and recreated from database_schema.sql.
+Refuses to run against the database configured in .env unless --force.
+
+Usage:
+    python generate_dataset.py --students 10000
+    python generate_dataset.py --students 100000 --seed 7 --rv-rate 0.03
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(BENCH_DIR, '..', 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+import mysql.connector
+
+from db_config import DB_CONFIG
+from calculate_grades import bulk_update
+
+SCHEMA_FILE = os.path.join(BENCH_DIR, '..', 'database_schema.sql')
+DEFAULT_DATABASE = os.getenv('BENCH_MYSQL_DATABASE', 'resana_bench')
+DEFAULT_BATCHES = (2021, 2022, 2023, 2024)
+REFERENCE_YEAR = 2025           # Semesters completed = 2 per year since the batch joined
+DEPARTMENTS = ('CS', 'IS', 'EC', 'ME', 'AI')
+SECTIONS = ('A', 'B', 'C', 'D')
+MAX_SERIAL = 999                # USN serials per college / batch / department
+MAX_ATTEMPTS = 3
+INSERT_CHUNK = 5000
+
+DEFAULT_BACKLOG_RETRY_RATE = 0.85
+DEFAULT_RV_RATE = 0.02
+
+# (name, credits, kind) per semester
+#   kind: core, lab, internal (external = 0), project (200 marks),
+#         mini (100 marks), elective (one of the group is taken)
+CORE_NAMES = (
+    'ENGINEERING MATHEMATICS', 'DATA STRUCTURES', 'DIGITAL DESIGN', 'OPERATING SYSTEMS',
+    'COMPUTER NETWORKS', 'DATABASE MANAGEMENT SYSTEMS', 'THEORY OF COMPUTATION', 'SOFTWARE ENGINEERING',
+    'ANALYSIS & DESIGN OF ALGORITHMS', 'COMPUTER ORGANIZATION', 'MACHINE LEARNING', 'CLOUD COMPUTING',
+    'COMPILER DESIGN', 'CRYPTOGRAPHY', 'DISCRETE MATHEMATICS', 'MICROCONTROLLERS',
+)
+INTERNAL_NAMES = ('PHYSICAL EDUCATION', 'NATIONAL SERVICE SCHEME', 'YOGA', 'SCIENTIFIC FOUNDATIONS OF HEALTH')
+ELECTIVE_NAMES = (
+    ('PROJECT MANAGEMENT', 'DATA MINING', 'INTERNET OF THINGS'),
+    ('BLOCKCHAIN TECHNOLOGY', 'NATURAL LANGUAGE PROCESSING', 'COMPUTER VISION'),
+    ('BIG DATA ANALYTICS', 'DEEP LEARNING', 'AUGMENTED REALITY'),
+)
+
+
+def semester_layout(semester):
+    """[(name, credits, kind)] - the subject slots of one semester"""
+    cores = 2 if semester == 8 else 4
+    layout = [(CORE_NAMES[(semester * 3 + n) % len(CORE_NAMES)], 4 if n < 2 else 3, 'core')
+              for n in range(cores)]
+    if semester <= 6:
+        layout.append((f"{CORE_NAMES[(semester * 3) % len(CORE_NAMES)]} LABORATORY", 1, 'lab'))
+    if semester <= 4:
+        layout.append((INTERNAL_NAMES[semester - 1], 1, 'internal'))
+    if 5 <= semester <= 7:
+        for name in ELECTIVE_NAMES[semester - 5]:
+            layout.append((name, 3, 'elective'))
+    if semester == 6:
+        layout.append(('MINI PROJECT', 2, 'mini'))
+    if semester == 7:
+        layout.append(('MAJOR PROJECT PHASE II', 10, 'project'))
+    if semester == 8:
+        layout.append(('INTERNSHIP', 10, 'project'))
+    return layout
+
+
+def subject_code(scheme, department, semester, slot, kind):
+    """BCS501 / BCSL506 (2022 scheme), 21CS51 / 21CSL56 (2021 scheme)"""
+    lab = 'L' if kind == 'lab' else ''
+    if scheme == '22':
+        return f"B{department}{lab}{semester}{slot + 1:02d}"
+    return f"21{department}{lab}{semester}{slot + 1}"
+
+
+def build_subjects():
+    """
+    Subject catalogue for every scheme / department / semester
+
+    Returns:
+        (subject rows for INSERT, {(scheme, department, semester): [(code, credits, kind)]})
+    """
+    rows = []
+    catalogue = {}
+    for scheme in ('21', '22'):
+        for department in DEPARTMENTS:
+            for semester in range(1, 9):
+                slots = []
+                for slot, (name, credits, kind) in enumerate(semester_layout(semester)):
+                    code = subject_code(scheme, department, semester, slot, kind)
+                    rows.append((code, name, semester, scheme, credits, code[-3:], 200 if kind == 'project' else 100))
+                    slots.append((code, credits, kind))
+                catalogue[(scheme, department, semester)] = slots
+    return rows, catalogue
+
+
+def college_code(index):
+    """1AA, 1AB, ... - a new college every MAX_SERIAL students of a batch/department"""
+    first, second = divmod(index, 26)
+    return f"1{chr(ord('A') + first % 26)}{chr(ord('A') + second)}"
+
+
+def scraped_status(external, total):
+    """Result column as shown by the portal - same pass rule as the grade engines"""
+    if external == 0:
+        return 'P' if total >= 40 else 'F'
+    return 'P' if external >= 18 and total >= 40 else 'F'
+
+
+def scaled_mark(rng, ability, maximum, spread):
+    """Mark out of maximum around the student's ability"""
+    return max(0, min(maximum, round(maximum * rng.gauss(ability, spread))))
+
+
+def subject_marks(rng, ability, kind):
+    """(internal, external) for one attempt"""
+    if kind == 'internal':
+        return scaled_mark(rng, ability + 0.1, 100, 0.08), 0
+    maximum = 100 if kind == 'project' else 50
+    return (scaled_mark(rng, ability + 0.05, maximum, 0.08),
+            scaled_mark(rng, ability - 0.04, maximum, 0.14))
+
+
+# =============================================================================
+# DATABASE SETUP
+# =============================================================================
+
+def connect(database):
+    """Connection to database (created if it doesn't exist yet)"""
+    config = {key: value for key, value in DB_CONFIG.items() if key != 'database'}
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+    cursor.execute(f"USE `{database}`")
+    cursor.close()
+    return conn
+
+
+def schema_statements(path=SCHEMA_FILE):
+    """CREATE TABLE statements of database_schema.sql (comments stripped)"""
+    with open(path, encoding='utf-8') as f:
+        sql = '\n'.join(line.split('--', 1)[0] for line in f)
+    return [statement.strip() for statement in sql.split(';') if statement.strip()]
+
+
+def recreate_schema(cursor):
+    """Drop every table of the schema and create it again"""
+    statements = schema_statements()
+    tables = [re.search(r'CREATE TABLE\s+`?(\w+)', statement, re.IGNORECASE).group(1)
+              for statement in statements]
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in tables:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    for statement in statements:
+        cursor.execute(statement)
+
+
+# =============================================================================
+# GENERATION
+# =============================================================================
+
+def generate_dataset(database=DEFAULT_DATABASE, students=1000, seed=42, batches=DEFAULT_BATCHES,
+                     backlog_retry_rate=DEFAULT_BACKLOG_RETRY_RATE, rv_rate=DEFAULT_RV_RATE, verbose=True):
+    """
+    Recreate the schema in database and fill it with students and results
+
+    Returns:
+        Dictionary with row counts and the time taken (seconds)
+    """
+    def log(message):
+        if verbose:
+            print(message)
+
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    conn = connect(database)
+    cursor = conn.cursor()
+
+    try:
+        recreate_schema(cursor)
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        cursor.execute("SET UNIQUE_CHECKS = 0")
+
+        subject_rows, catalogue = build_subjects()
+        cursor.executemany("""
+            INSERT INTO subjects (subject_code, subject_name, semester, scheme, credits, short_code, max_marks)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, subject_rows)
+        conn.commit()
+        log(f"OK {len(subject_rows)} subjects ({len(catalogue)} scheme/department/semester groups)")
+
+        stats = {"students": 0, "subjects": len(subject_rows), "results": 0,
+                 "backlog_attempts": 0, "rv_updates": 0}
+        student_rows = []
+        result_rows = []
+        rv_rows = []
+        result_id = 0
+
+        def flush(force=False):
+            if student_rows and (force or len(student_rows) >= INSERT_CHUNK):
+                cursor.executemany("""
+                    INSERT INTO student_details (usn, name, gender, batch, discipline, scheme, section)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, student_rows)
+                student_rows.clear()
+            if result_rows and (force or len(result_rows) >= INSERT_CHUNK):
+                cursor.executemany("""
+                    INSERT INTO results
+                    (result_id, student_usn, subject_code, semester, internal_marks, external_marks,
+                     total_marks, result_status, is_elective, attempt_number)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, result_rows)
+                result_rows.clear()
+                conn.commit()
+
+        groups = len(batches) * len(DEPARTMENTS)
+        for index in range(students):
+            batch = batches[index % len(batches)]
+            department = DEPARTMENTS[(index // len(batches)) % len(DEPARTMENTS)]
+            college, serial = divmod(index // groups, MAX_SERIAL)
+            usn = f"{college_code(college)}{batch % 100:02d}{department}{serial + 1:03d}"
+            scheme = '22' if batch >= 2022 else '21'
+            student_rows.append((usn, f"STUDENT {index + 1}", rng.choice(('Male', 'Female')),
+                                 batch, 'VTU', scheme, rng.choice(SECTIONS)))
+            stats['students'] += 1
+
+            ability = min(0.97, max(0.25, rng.gauss(0.66, 0.13)))
+            for semester in range(1, max(1, min(8, 2 * (REFERENCE_YEAR - batch))) + 1):
+                slots = catalogue[(scheme, department, semester)]
+                electives = [slot for slot in slots if slot[2] == 'elective']
+                taken = [slot for slot in slots if slot[2] != 'elective']
+                if electives:
+                    taken.append(rng.choice(electives))
+
+                for code, _, kind in taken:
+                    internal, external = subject_marks(rng, ability, kind)
+                    for attempt in range(1, MAX_ATTEMPTS + 1):
+                        total = internal + external
+                        status = scraped_status(external, total)
+                        result_id += 1
+                        result_rows.append((result_id, usn, code, semester, internal, external, total,
+                                            status, int(kind == 'elective'), attempt))
+                        stats['results'] += 1
+                        if attempt > 1:
+                            stats['backlog_attempts'] += 1
+                        if status == 'P' or rng.random() >= backlog_retry_rate:
+                            break
+                        # Backlog exam: internal marks carry over, new external mark
+                        external = subject_marks(rng, ability + 0.08 * attempt, kind)[1]
+
+                    # RV: external marks revised on the final attempt
+                    if kind not in ('internal', 'project') and rng.random() < rv_rate:
+                        revised = min(50, external + rng.randint(1, 12))
+                        total = internal + revised
+                        rv_rows.append((result_id, revised, total, scraped_status(revised, total)))
+
+            flush()
+            if verbose and (index + 1) % 10000 == 0:
+                print(f"  Generated {index + 1} students ({stats['results']} results)...")
+
+        flush(force=True)
+        conn.commit()
+        log(f"OK {stats['students']} students, {stats['results']} results "
+            f"({stats['backlog_attempts']} backlog attempts)")
+
+        # Revaluation pass - same columns Rv_ScrapperVTU.py rewrites
+        rv_updates = [(rid, revised, total, status, None, None) for rid, revised, total, status in rv_rows]
+        bulk_update(cursor, 'results', 'result_id',
+                    ['external_marks', 'total_marks', 'result_status', 'letter_grade', 'grade_points'],
+                    rv_updates)
+        conn.commit()
+        stats['rv_updates'] = len(rv_updates)
+        log(f"OK {stats['rv_updates']} RV updates")
+
+        cursor.execute("SET UNIQUE_CHECKS = 1")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        stats['seconds'] = round(time.perf_counter() - started, 2)
+        log(f"OK Dataset ready in `{database}` in {stats['seconds']:.1f}s")
+        return stats
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def guard_database(database, force):
+    """True unless database is the one the app itself uses (.env)"""
+    if database == DB_CONFIG['database'] and not force:
+        print(f"STOP `{database}` is the database configured in .env - pick a scratch database "
+              f"with --database (or pass --force)")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate a synthetic results dataset for the grade benchmarks')
+    parser.add_argument('--students', type=int, default=1000, help='Number of students')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed, same data)')
+    parser.add_argument('--batches', type=str, default=','.join(map(str, DEFAULT_BATCHES)),
+                        help='Comma-separated batch years')
+    parser.add_argument('--backlog-retry-rate', type=float, default=DEFAULT_BACKLOG_RETRY_RATE,
+                        help='Chance a failed subject is attempted again')
+    parser.add_argument('--rv-rate', type=float, default=DEFAULT_RV_RATE,
+                        help='Share of results whose external marks are revised')
+    parser.add_argument('--database', type=str, default=DEFAULT_DATABASE,
+                        help='Scratch MySQL database (created if missing, tables recreated)')
+    parser.add_argument('--force', action='store_true', help='Allow the database configured in .env')
+    args = parser.parse_args()
+
+    if not guard_database(args.database, args.force):
+        sys.exit(1)
+    batches = tuple(int(year) for year in args.batches.split(',') if year.strip())
+    generate_dataset(args.database, max(1, args.students), args.seed, batches,
+                     args.backlog_retry_rate, args.rv_rate)
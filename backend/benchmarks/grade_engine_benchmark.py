@@ -0,0 +1,438 @@
+"""
+GRADE ENGINE BENCHMARK
+======================
+Times every grade engine on the same synthetic dataset and checks that
+they produce the same grades, semester summaries and CGPAs.
+
+Engines:
+- python:      calculate_grades.py --engine python, semester by semester
+- sql:         calculate_grades.py --engine sql, semester by semester
+- numpy:       grade_kernel.py over the whole results table
+- fast:        recalculate_all_grades_fast.py
+- fast-stream: recalculate_all_grades_fast.py --stream
+- migrate:     migrate_existing_data.py steps 2-4 (the schema step is skipped -
+               the generated schema already has every column)
+
+For each size (default 1k, 10k and 100k students) the dataset is generated
+with generate_dataset.py, then for each engine:
+
+1. Grades, summaries and CGPAs are cleared (result_status back to the
+   portal's P / F)
+2. The engine runs in-process, its output captured; end-to-end and
+   per-step times are recorded
+3. Latest-attempt grades, student_semester_summary and student_details.cgpa
+   are copied into snapshot tables
+
+Each engine's snapshot is then compared with the reference engine (the
+first one that ran), column by column, inside MySQL.
+
+The row-by-row engines (python, migrate) issue several queries per result
+and are skipped above --row-engine-limit students (default 10000).
+
+Runs use --database (default resana_bench, env BENCH_MYSQL_DATABASE), never
+the database in .env - it is dropped and regenerated for every size.
+
+Usage:
+    python grade_engine_benchmark.py
+    python grade_engine_benchmark.py --sizes 1000,10000 --engines sql,numpy,fast
+    python grade_engine_benchmark.py --sizes 100000 --row-engine-limit 0 --json grades.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'scripts'))
+sys.path.insert(0, BENCH_DIR)
+
+import db_config
+from generate_dataset import DEFAULT_DATABASE, generate_dataset, guard_database
+
+ENGINES = ('python', 'sql', 'numpy', 'fast', 'fast-stream', 'migrate')
+ROW_BY_ROW_ENGINES = ('python', 'migrate')
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_ROW_ENGINE_LIMIT = 10000
+FAILURE_OUTPUT_LINES = 20
+EXAMPLES = 3
+
+# Portal status from the marks - what the scrapers store before any engine runs
+RESET_STATUS_SQL = """CASE
+    WHEN external_marks = 0 THEN IF(total_marks >= 40, 'P', 'F')
+    WHEN external_marks >= 18 AND total_marks >= 40 THEN 'P'
+    ELSE 'F'
+END"""
+
+# name: (key columns, compared columns, query producing the snapshot)
+SNAPSHOTS = {
+    'results': (('result_id',), ('letter_grade', 'grade_points', 'result_status'), """
+        SELECT r.result_id, r.letter_grade, r.grade_points, r.result_status
+        FROM results r
+        INNER JOIN (
+            SELECT student_usn, subject_code, semester, MAX(attempt_number) as max_attempt
+            FROM results
+            GROUP BY student_usn, subject_code, semester
+        ) latest ON r.student_usn = latest.student_usn
+                   AND r.subject_code = latest.subject_code
+                   AND r.semester = latest.semester
+                   AND r.attempt_number = latest.max_attempt
+    """),
+    'summaries': (('student_usn', 'semester'),
+                  ('sgpa', 'total_marks_obtained', 'total_marks_maximum', 'percentage',
+                   'total_credits', 'class_grade', 'has_backlogs', 'backlog_count'), """
+        SELECT student_usn, semester, sgpa, total_marks_obtained, total_marks_maximum, percentage,
+               total_credits, class_grade, has_backlogs, backlog_count
+        FROM student_semester_summary
+    """),
+    'cgpa': (('usn',), ('cgpa',), "SELECT usn, cgpa FROM student_details"),
+}
+
+
+# =============================================================================
+# ENGINE RUNNERS (each returns {step: seconds})
+# =============================================================================
+
+def run_calculate_grades(engine, semesters):
+    """calculate_grades_for_semester for every semester, CGPA once after the last"""
+    from calculate_grades import calculate_grades_for_semester
+    timings = {}
+    for semester in semesters:
+        result = calculate_grades_for_semester(semester, verbose=False, engine=engine,
+                                               include_cgpa=semester == semesters[-1])
+        if not result['success']:
+            raise RuntimeError(result['error'])
+        for step, seconds in result['timings'].items():
+            timings[step] = timings.get(step, 0.0) + seconds
+    return timings
+
+
+def run_numpy(semesters):
+    """grade_kernel.recalculate over every semester at once"""
+    from grade_kernel import recalculate
+    conn = db_config.get_db_connection()
+    cursor = conn.cursor()
+    try:
+        return recalculate(cursor, conn, None, verbose=False)['timings']
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@contextlib.contextmanager
+def timed_function(module, name, timings, step):
+    """Replace module.name with a wrapper adding its run time to timings[step]"""
+    original = getattr(module, name)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            timings[step] = timings.get(step, 0.0) + time.perf_counter() - start
+
+    setattr(module, name, wrapper)
+    try:
+        yield
+    finally:
+        setattr(module, name, original)
+
+
+def run_fast(stream):
+    """recalculate_all_grades_fast, split into grades+SGPA and the rest (data fixes, CGPA)"""
+    import recalculate_all_grades_fast as fast
+    timings = {}
+    step_function = 'stream_grades_and_sgpa' if stream else 'batch_grades_and_sgpa'
+    start = time.perf_counter()
+    with timed_function(fast, step_function, timings, 'grades_sgpa'):
+        success = fast.fast_recalculate_all_grades(stream=stream)
+    if not success:
+        raise RuntimeError("fast_recalculate_all_grades failed")
+    timings['fixes_cgpa'] = time.perf_counter() - start - timings.get('grades_sgpa', 0.0)
+    return timings
+
+
+def run_migrate(semesters):
+    """migrate_existing_data.py steps 2-4"""
+    import migrate_existing_data as migrate
+    timings = {}
+    for step, function in (('letter_grades', migrate.update_all_letter_grades),
+                           ('sgpa', migrate.calculate_all_sgpa),
+                           ('cgpa', migrate.update_all_cgpa)):
+        start = time.perf_counter()
+        success = function()
+        timings[step] = time.perf_counter() - start
+        if not success:
+            raise RuntimeError(f"migrate_existing_data step '{step}' failed")
+    return timings
+
+
+RUNNERS = {
+    'python': lambda semesters: run_calculate_grades('python', semesters),
+    'sql': lambda semesters: run_calculate_grades('sql', semesters),
+    'numpy': run_numpy,
+    'fast': lambda semesters: run_fast(False),
+    'fast-stream': lambda semesters: run_fast(True),
+    'migrate': run_migrate,
+}
+
+
+# =============================================================================
+# RESET / SNAPSHOT / COMPARE
+# =============================================================================
+
+def snapshot_table(name, engine):
+    return f"bench_snap_{name}_{engine.replace('-', '_')}"
+
+
+def reset_grades(cursor, conn):
+    """Back to the state right after a scrape: no grades, summaries or CGPAs"""
+    cursor.execute(f"""
+        UPDATE results
+        SET letter_grade = NULL, grade_points = NULL, result_status = {RESET_STATUS_SQL}
+    """)
+    cursor.execute("DELETE FROM student_semester_summary")
+    cursor.execute("UPDATE student_details SET cgpa = NULL")
+    conn.commit()
+
+
+def take_snapshots(cursor, conn, engine):
+    """Copy what the engine wrote into bench_snap_* tables"""
+    for name, (keys, _, query) in SNAPSHOTS.items():
+        table = snapshot_table(name, engine)
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"CREATE TABLE {table} (PRIMARY KEY ({', '.join(keys)})) {query}")
+    conn.commit()
+
+
+def drop_snapshots(cursor, engines):
+    for engine in engines:
+        for name in SNAPSHOTS:
+            cursor.execute(f"DROP TABLE IF EXISTS {snapshot_table(name, engine)}")
+
+
+def compare_snapshots(cursor, reference, engine):
+    """
+    Differences between two engines' snapshots
+
+    Returns:
+        {snapshot: {"rows", "mismatched", "missing", "extra", "columns": {column: count}, "examples"}}
+    """
+    comparison = {}
+    for name, (keys, columns, _) in SNAPSHOTS.items():
+        ref, other = snapshot_table(name, reference), snapshot_table(name, engine)
+        join = " AND ".join(f"a.{key} = b.{key}" for key in keys)
+        same = " AND ".join(f"a.{column} <=> b.{column}" for column in columns)
+        matched = f"b.{keys[0]} IS NOT NULL"
+
+        column_sums = ", ".join(f"SUM({matched} AND NOT (a.{column} <=> b.{column}))" for column in columns)
+        cursor.execute(f"""
+            SELECT COUNT(*), SUM(b.{keys[0]} IS NULL), SUM({matched} AND NOT ({same})), {column_sums}
+            FROM {ref} a
+            LEFT JOIN {other} b ON {join}
+        """)
+        rows, missing, mismatched, *column_counts = [int(value or 0) for value in cursor.fetchone()]
+
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM {other} b
+            LEFT JOIN {ref} a ON {join}
+            WHERE a.{keys[0]} IS NULL
+        """)
+        extra = cursor.fetchone()[0]
+
+        examples = []
+        if mismatched:
+            cursor.execute(f"""
+                SELECT {', '.join(f'a.{key}' for key in keys)},
+                       {', '.join(f'a.{column}' for column in columns)},
+                       {', '.join(f'b.{column}' for column in columns)}
+                FROM {ref} a
+                INNER JOIN {other} b ON {join}
+                WHERE NOT ({same})
+                LIMIT {EXAMPLES}
+            """)
+            for row in cursor.fetchall():
+                key, values = row[:len(keys)], row[len(keys):]
+                examples.append({
+                    "key": [str(value) for value in key],
+                    reference: [None if v is None else str(v) for v in values[:len(columns)]],
+                    engine: [None if v is None else str(v) for v in values[len(columns):]],
+                })
+
+        comparison[name] = {
+            "rows": rows,
+            "mismatched": mismatched,
+            "missing": missing,
+            "extra": extra,
+            "columns": {column: count for column, count in zip(columns, column_counts) if count},
+            "examples": examples,
+        }
+    return comparison
+
+
+def is_equivalent(comparison):
+    return all(not (c['mismatched'] or c['missing'] or c['extra']) for c in comparison.values())
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def run_engine(engine, semesters, verbose):
+    """Run one engine with its output captured; returns (timings, seconds)"""
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(sys.stdout if verbose else output):
+            timings = RUNNERS[engine](semesters)
+    except Exception:
+        if not verbose:
+            for line in output.getvalue().splitlines()[-FAILURE_OUTPUT_LINES:]:
+                print(f"    {line}")
+        raise
+    return timings, time.perf_counter() - start
+
+
+def benchmark_size(args, size, engines):
+    """Generate the dataset for one size and run every engine on it"""
+    print(f"\n{'='*100}")
+    print(f"DATASET: {size} students")
+    print(f"{'='*100}")
+    dataset = generate_dataset(args.database, size, args.seed, rv_rate=args.rv_rate)
+
+    conn = db_config.get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT semester FROM results ORDER BY semester")
+    semesters = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT COUNT(*) FROM results")
+    results = cursor.fetchone()[0]
+
+    runs = []
+    ran = []
+    try:
+        for engine in engines:
+            if engine in ROW_BY_ROW_ENGINES and size > args.row_engine_limit:
+                print(f"SKIP {engine}: row-by-row engine above --row-engine-limit {args.row_engine_limit}")
+                continue
+            reset_grades(cursor, conn)
+            print(f"INFO Running {engine}...")
+            try:
+                timings, seconds = run_engine(engine, semesters, args.verbose)
+            except ImportError as e:
+                print(f"SKIP {engine}: {e}")
+                continue
+            except Exception as e:
+                print(f"FAIL {engine}: {e}")
+                continue
+            take_snapshots(cursor, conn, engine)
+            ran.append(engine)
+            runs.append({
+                "engine": engine,
+                "seconds": round(seconds, 3),
+                "results_per_second": round(results / seconds) if seconds else None,
+                "steps": {step: round(value, 3) for step, value in timings.items()},
+            })
+            print(f"OK {engine}: {seconds:.2f}s")
+
+        if ran:
+            reference = ran[0]
+            for run in runs:
+                if run['engine'] != reference:
+                    run['comparison'] = compare_snapshots(cursor, reference, run['engine'])
+                    run['equivalent'] = is_equivalent(run['comparison'])
+                else:
+                    run['equivalent'] = True
+        drop_snapshots(cursor, ran)
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+    return {
+        "students": size,
+        "results": results,
+        "dataset": dataset,
+        "reference": ran[0] if ran else None,
+        "runs": runs,
+    }
+
+
+def print_report(report):
+    """Timing table plus the differences from the reference engine"""
+    print(f"\n{'='*100}")
+    print(f"{'students':>9}{'results':>10}  {'engine':<12}{'total s':>9}{'rows/s':>10}  {'equal':<6} steps (s)")
+    print(f"{'-'*100}")
+    for size in report:
+        for run in size['runs']:
+            equal = 'ref' if run['engine'] == size['reference'] else ('yes' if run['equivalent'] else 'NO')
+            steps = ", ".join(f"{step} {seconds:.2f}" for step, seconds in run['steps'].items())
+            print(f"{size['students']:>9}{size['results']:>10}  {run['engine']:<12}{run['seconds']:>9.2f}"
+                  f"{run['results_per_second'] or 0:>10}  {equal:<6} {steps}")
+    print(f"{'='*100}")
+
+    for size in report:
+        for run in size['runs']:
+            if run['equivalent']:
+                continue
+            print(f"\nWARN {run['engine']} differs from {size['reference']} ({size['students']} students):")
+            for name, comparison in run['comparison'].items():
+                if not (comparison['mismatched'] or comparison['missing'] or comparison['extra']):
+                    continue
+                columns = ", ".join(f"{column} {count}" for column, count in comparison['columns'].items())
+                print(f"  {name}: {comparison['mismatched']} of {comparison['rows']} rows differ"
+                      + (f" ({columns})" if columns else "")
+                      + (f", {comparison['missing']} missing" if comparison['missing'] else "")
+                      + (f", {comparison['extra']} extra" if comparison['extra'] else ""))
+                for example in comparison['examples']:
+                    print(f"    {'/'.join(example['key'])}: {size['reference']} {example[size['reference']]}"
+                          f" vs {run['engine']} {example[run['engine']]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark and cross-check the grade engines on synthetic data')
+    parser.add_argument('--sizes', type=str, default=','.join(map(str, DEFAULT_SIZES)),
+                        help='Comma-separated student counts')
+    parser.add_argument('--engines', type=str, default=','.join(ENGINES),
+                        help=f"Comma-separated, first one that runs is the reference: {', '.join(ENGINES)}")
+    parser.add_argument('--row-engine-limit', type=int, default=DEFAULT_ROW_ENGINE_LIMIT,
+                        help='Skip python / migrate above this many students')
+    parser.add_argument('--seed', type=int, default=42, help='Dataset random seed')
+    parser.add_argument('--rv-rate', type=float, default=0.02, help='Share of results revised by RV')
+    parser.add_argument('--database', type=str, default=DEFAULT_DATABASE,
+                        help='Scratch MySQL database (dropped and regenerated for every size)')
+    parser.add_argument('--force', action='store_true', help='Allow the database configured in .env')
+    parser.add_argument('--verbose', action='store_true', help="Show the engines' own output")
+    parser.add_argument('--json', type=str, default=None, help='Also write all results to this JSON file')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    engines = [engine.strip() for engine in args.engines.split(',') if engine.strip()]
+    unknown = [engine for engine in engines if engine not in ENGINES]
+    if unknown:
+        parser.error(f"Unknown engine: {', '.join(unknown)}")
+    if not guard_database(args.database, args.force):
+        sys.exit(1)
+
+    # Every connection the engines open goes to the benchmark database
+    db_config.DB_CONFIG['database'] = args.database
+
+    report = []
+    try:
+        for size in sizes:
+            report.append(benchmark_size(args, size, engines))
+    except KeyboardInterrupt:
+        print("STOP Interrupted - reporting the finished sizes")
+
+    if report:
+        print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""
+MOCK VTU RESULTS PORTAL
+=======================
+Local stand-in for results.vtu.ac.in, for measuring scraper throughput
+without touching the real portal.
+
+Serves the same elements ultimate_scraper.py (get_vtu_results) and
+Rv_ScrapperVTU.py (get_vtu_rv_results) use:
+
+- index.php: form#raj with the captcha block (//*[@id="raj"]/div[2]/div[2]/img),
+  its refresh link (.../p/a), the lns / captchacode fields and #submit
+- captcha.php: generated 6-character captcha with a known answer per session,
+  gray text on white with colored noise (what mask_captcha keeps / drops)
+- resultpage.php: the student header (td[1] USN, td[3] name) and divTable
+  result tables - several per page for regular results (current semester
+  plus a backlog), 9 columns for RV - or the portal's alerts for a wrong
+  captcha / invalid USN
+
+Results are generated from the USN, so repeated runs see the same data.
+Latency, error and invalid-USN rates are configurable. GET /stats returns
+request counters (POST /stats/reset clears them) for scraper_benchmark.py.
+
+Usage:
+    python mock_vtu_portal.py --port 8765 --latency-ms 300 --error-rate 0.02
+
+    Regular results: http://127.0.0.1:8765/results/index.php
+    RV results:      http://127.0.0.1:8765/rv/index.php
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import random
+import secrets
+import string
+import threading
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from PIL import Image, ImageDraw, ImageFont
+
+CAPTCHA_ALPHABET = string.ascii_uppercase + string.digits
+CAPTCHA_LENGTH = 6
+SESSION_COOKIE = 'PHPSESSID'
+
+INVALID_USN_ALERT = "University Seat Number is not available or Invalid..!"
+INVALID_CAPTCHA_ALERT = "Invalid captcha code !!!"
+
+# Gray inside mask_captcha's HSV window (S <= 10, 62 <= V <= 142); noise is saturated
+CAPTCHA_TEXT_COLOR = (105, 105, 105)
+CAPTCHA_NOISE_COLORS = ((220, 40, 40), (40, 160, 40), (40, 80, 220), (230, 150, 20))
+
+SUBJECT_NAMES = (
+    "SOFTWARE ENGINEERING AND PROJECT MANAGEMENT", "COMPUTER NETWORKS", "THEORY OF COMPUTATION",
+    "ARTIFICIAL INTELLIGENCE", "RESEARCH METHODOLOGY AND IPR", "ENVIRONMENTAL STUDIES",
+    "DATABASE MANAGEMENT SYSTEMS", "ANALYSIS AND DESIGN OF ALGORITHMS",
+)
+FIRST_NAMES = ("AARAV", "ANANYA", "ROHAN", "DIYA", "KARTHIK", "MEGHANA", "PRANAV", "SNEHA")
+LAST_NAMES = ("RAO", "SHARMA", "GOWDA", "IYER", "REDDY", "NAIK", "HEGDE", "KUMAR")
+
+FORM_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>VTU Results</title></head>
+<body>
+<h3>{title}</h3>
+<form id="raj" action="resultpage.php" method="post">
+  <div class="form-group">
+    <label>University Seat Number</label>
+    <input type="text" name="lns" class="form-control">
+  </div>
+  <div class="form-group">
+    <div class="col-md-6">
+      <input type="text" name="captchacode" class="form-control" autocomplete="off">
+    </div>
+    <div class="col-md-6">
+      <img src="captcha.php?r=0" alt="captcha" style="display:block">
+      <p><a href="javascript:void(0)"
+            onclick="document.querySelector('#raj img').src='captcha.php?r='+Math.random();">Refresh</a></p>
+    </div>
+  </div>
+  <input type="submit" id="submit" value="SUBMIT">
+</form>
+</body>
+</html>
+"""
+
+ALERT_PAGE = """<!DOCTYPE html>
+<html><body><script>alert('{message}');window.location.replace('index.php');</script></body></html>
+"""
+
+RESULT_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>VTU Results</title></head>
+<body>
+<table>
+  <tr><td><b>University Seat Number</b></td><td> : {usn}</td></tr>
+  <tr><td><b>Student Name</b></td><td> : {name}</td></tr>
+</table>
+{tables}
+</body>
+</html>
+"""
+
+
+def seeded(usn, salt=''):
+    """Random generator fixed by the USN, so every run serves the same results"""
+    return random.Random(hashlib.sha256(f"{usn}{salt}".encode()).hexdigest())
+
+
+def div_table(semester, header, rows):
+    """One divTable (header row + data rows)"""
+    lines = [f'<div><b>Semester : {semester}</b></div>', '<div class="divTable"><div class="divTableBody">']
+    for cells in [header] + rows:
+        lines.append('<div class="divTableRow">' +
+                     ''.join(f'<div class="divTableCell">{cell}</div>' for cell in cells) + '</div>')
+    lines.append('</div></div>')
+    return '\n'.join(lines)
+
+
+def subject_code(scheme, semester, index):
+    """Subject code the scrapers can read the semester from (BCS501 / 21CS51)"""
+    if scheme == '21':
+        return f"21CS{semester}{index}"
+    return f"BCS{semester}0{index}"
+
+
+def student_name(usn):
+    rng = seeded(usn, 'name')
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def pass_fail(internal, external):
+    """Result letter the portal shows for the marks"""
+    return 'P' if external >= 18 and internal + external >= 40 else 'F'
+
+
+def regular_tables(usn, semester, scheme, subjects):
+    """Current semester table, plus a backlog table for some students"""
+    rng = seeded(usn, 'regular')
+    header = ["Subject Code", "Subject Name", "Internal Marks", "External Marks", "Total", "Result",
+              "Announced / Updated on"]
+
+    def row(sem, index):
+        internal = rng.randint(25, 50)
+        external = rng.randint(10, 50)
+        return [subject_code(scheme, sem, index), SUBJECT_NAMES[(index - 1) % len(SUBJECT_NAMES)],
+                internal, external, internal + external, pass_fail(internal, external), '2025-02-10']
+
+    tables = [div_table(semester, header, [row(semester, i) for i in range(1, subjects + 1)])]
+    if semester > 1 and rng.random() < 0.3:
+        tables.append(div_table(semester - 1, header, [row(semester - 1, rng.randint(1, subjects))]))
+    return tables
+
+
+def rv_tables(usn, semester, scheme, subjects):
+    """One 9-column RV table with the subjects the student applied for"""
+    rng = seeded(usn, 'rv')
+    header = ["Subject Code", "Subject Name", "Internal Marks", "Old Marks", "Old Result",
+              "RV Marks", "RV Result", "Final Marks", "Final Result"]
+    rows = []
+    for index in sorted(rng.sample(range(1, subjects + 1), k=min(subjects, rng.randint(1, 3)))):
+        internal = rng.randint(25, 50)
+        old = rng.randint(10, 30)
+        rv = min(60, old + rng.randint(0, 12))
+        final = max(old, rv)
+        rows.append([subject_code(scheme, semester, index), SUBJECT_NAMES[(index - 1) % len(SUBJECT_NAMES)],
+                     internal, old, pass_fail(internal, old), rv, pass_fail(internal, rv),
+                     final, pass_fail(internal, final)])
+    return [div_table(semester, header, rows)]
+
+
+def load_font(size):
+    """A TrueType font if one is installed, else Pillow's default"""
+    for name in ('DejaVuSans-Bold.ttf', 'DejaVuSans.ttf', 'Arial.ttf', 'LiberationSans-Bold.ttf'):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+class MockPortal:
+    """
+    Portal state: captcha answers per session and request counters
+
+    Args:
+        semester / scheme / subjects: Shape of the generated results
+        latency_ms / jitter_ms: Delay added to every request
+        error_rate: Share of page loads answered with 503
+        invalid_rate: Share of USNs that are "not available or invalid"
+        captcha_noise: Noise lines / dots per captcha
+    """
+
+    def __init__(self, semester=5, scheme='22', subjects=6, latency_ms=0, jitter_ms=0,
+                 error_rate=0.0, invalid_rate=0.0, captcha_noise=6, seed=None):
+        self.semester = semester
+        self.scheme = scheme
+        self.subjects = max(1, min(subjects, 9))
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.invalid_rate = invalid_rate
+        self.captcha_noise = captcha_noise
+        self.font = load_font(34)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._answers = {}      # session -> current captcha answer
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {
+                "page_loads": 0,
+                "page_errors": 0,
+                "captchas_served": 0,
+                "submits": 0,
+                "captcha_rejected": 0,
+                "invalid_usn": 0,
+                "results_served": 0,
+                "usns_served": [],
+            }
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def served(self, usn):
+        """Count a result page for usn"""
+        with self._lock:
+            self.stats['results_served'] += 1
+            self.stats['usns_served'].append(usn)
+
+    def page_fails(self):
+        """Decide whether this page load gets a 503"""
+        return self._rng.random() < self.error_rate
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            served = stats.pop('usns_served')
+        stats['distinct_usns_served'] = len(set(served))
+        if stats['submits']:
+            stats['captcha_success_rate'] = round(1 - stats['captcha_rejected'] / stats['submits'], 3)
+        return stats
+
+    async def delay(self):
+        """Configured latency (+/- jitter) for one request"""
+        seconds = (self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def is_invalid(self, usn):
+        """Fixed per USN, so retries get the same answer"""
+        return seeded(usn, 'invalid').random() < self.invalid_rate
+
+    def new_captcha(self, session):
+        """Generate a captcha for the session; returns PNG bytes"""
+        answer = ''.join(self._rng.choice(CAPTCHA_ALPHABET) for _ in range(CAPTCHA_LENGTH))
+        with self._lock:
+            self._answers[session] = answer
+
+        image = Image.new('RGB', (200, 50), (255, 255, 255))
+        draw = ImageDraw.Draw(image)
+        for _ in range(self.captcha_noise):
+            color = self._rng.choice(CAPTCHA_NOISE_COLORS)
+            draw.line([(self._rng.randint(0, 200), self._rng.randint(0, 50)),
+                       (self._rng.randint(0, 200), self._rng.randint(0, 50))], fill=color, width=2)
+            x, y = self._rng.randint(0, 196), self._rng.randint(0, 46)
+            draw.ellipse([x, y, x + 4, y + 4], fill=color)
+        draw.text((12, 6), answer, font=self.font, fill=CAPTCHA_TEXT_COLOR)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def check_captcha(self, session, code):
+        """True if code answers the session's current captcha (each captcha is used once)"""
+        with self._lock:
+            answer = self._answers.pop(session, None)
+        return answer is not None and code.strip().upper() == answer
+
+
+def create_app(portal):
+    """FastAPI app serving /results/* and /rv/* from portal"""
+    app = FastAPI(title="Mock VTU Results Portal")
+
+    def session_of(request):
+        return request.cookies.get(SESSION_COOKIE) or secrets.token_hex(8)
+
+    @app.get("/{kind}/index.php", response_class=HTMLResponse)
+    async def index(kind: str, request: Request):
+        await portal.delay()
+        portal.count('page_loads')
+        if portal.page_fails():
+            portal.count('page_errors')
+            return HTMLResponse("<html><body><h1>503 Service Unavailable</h1></body></html>", status_code=503)
+        title = "Revaluation Results" if kind == 'rv' else "Examination Results"
+        response = HTMLResponse(FORM_PAGE.format(title=title))
+        response.set_cookie(SESSION_COOKIE, session_of(request))
+        return response
+
+    @app.get("/{kind}/captcha.php")
+    async def captcha(kind: str, request: Request):
+        await portal.delay()
+        portal.count('captchas_served')
+        session = session_of(request)
+        response = Response(portal.new_captcha(session), media_type='image/png',
+                            headers={"Cache-Control": "no-store"})
+        response.set_cookie(SESSION_COOKIE, session)
+        return response
+
+    @app.post("/{kind}/resultpage.php", response_class=HTMLResponse)
+    async def result_page(kind: str, request: Request):
+        await portal.delay()
+        portal.count('submits')
+        # Urlencoded form parsed by hand - Form() would need python-multipart
+        form = parse_qs((await request.body()).decode('utf-8', 'replace'))
+        usn = form.get('lns', [''])[0].strip().upper()
+        if not portal.check_captcha(session_of(request), form.get('captchacode', [''])[0]):
+            portal.count('captcha_rejected')
+            return ALERT_PAGE.format(message=INVALID_CAPTCHA_ALERT)
+        if not usn or portal.is_invalid(usn):
+            portal.count('invalid_usn')
+            return ALERT_PAGE.format(message=INVALID_USN_ALERT)
+
+        portal.served(usn)
+        if kind == 'rv':
+            tables = rv_tables(usn, portal.semester, portal.scheme, portal.subjects)
+        else:
+            tables = regular_tables(usn, portal.semester, portal.scheme, portal.subjects)
+        return RESULT_PAGE.format(usn=usn, name=student_name(usn), tables='\n'.join(tables))
+
+    @app.get("/stats")
+    async def stats():
+        return JSONResponse(portal.snapshot())
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        portal.reset_stats()
+        return {"reset": True}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Mock VTU results portal for scraper benchmarks')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--semester', type=int, default=5, help='Semester of the generated results')
+    parser.add_argument('--scheme', type=str, default='22', choices=['21', '22'])
+    parser.add_argument('--subjects', type=int, default=6, help='Subjects per semester (max 9)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay added to every request')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Random +/- variation of the delay')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of page loads answered with 503')
+    parser.add_argument('--invalid-rate', type=float, default=0.0, help='Share of USNs reported as invalid')
+    parser.add_argument('--captcha-noise', type=int, default=6, help='Noise lines/dots per captcha')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for captchas, errors and jitter')
+    args = parser.parse_args()
+
+    portal = MockPortal(semester=args.semester, scheme=args.scheme, subjects=args.subjects,
+                        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                        invalid_rate=args.invalid_rate, captcha_noise=args.captcha_noise, seed=args.seed)
+    print(f"MOCK VTU PORTAL on http://{args.host}:{args.port}/results/index.php (RV: /rv/index.php)")
+    uvicorn.run(create_app(portal), host=args.host, port=args.port, log_level='warning')
@@ -0,0 +1,303 @@
+"""
+SCRAPER THROUGHPUT BENCHMARK
+============================
+End-to-end throughput of ultimate_scraper.py / Rv_ScrapperVTU.py against the
+local mock portal (mock_vtu_portal.py), for a grid of settings:
+
+- scraper: vtu (regular results) and/or rv (revaluation)
+- mode:    fixed worker pool or adaptive (--adaptive, AIMD from --workers)
+- workers: e.g. 5,10,20
+
+Each run starts the real scraper script, exactly as the FastAPI service does,
+and reports USNs/min, attempts per USN (STAGE_STATS), the portal's captcha
+success rate, CPU time, peak memory and peak Chrome processes.
+
+The scrapers write what they scrape to MySQL: runs use --database (default
+resana_bench), never the database in .env - point it at a scratch copy of
+the schema. Each run gets a fresh scrape journal, so the invalid-USN cache of
+one run doesn't skip USNs in the next, and the vtu scraper runs with --force,
+so USNs an earlier run already stored are scraped again.
+
+Resource use is sampled with psutil when installed (whole process tree,
+including Chrome); otherwise CPU time and the largest child's peak RSS come
+from getrusage.
+
+Usage:
+    python scraper_benchmark.py --usns 40 --workers 5,10,20 --modes fixed,adaptive
+    python scraper_benchmark.py --scrapers vtu,rv --latency-ms 300 --error-rate 0.05 --json results.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(BENCH_DIR, '..', 'scripts')
+MOCK_PORTAL = os.path.join(BENCH_DIR, 'mock_vtu_portal.py')
+SCRAPERS = {
+    'vtu': (os.path.join(SCRIPTS_DIR, 'ultimate_scraper.py'), 'results'),
+    'rv': (os.path.join(SCRIPTS_DIR, 'Rv_ScrapperVTU.py'), 'rv'),
+}
+MODES = ('fixed', 'adaptive')
+SAMPLE_SECONDS = 0.5
+
+
+def portal_request(base_url, path, method='GET'):
+    """JSON from the mock portal's /stats endpoints"""
+    request = urllib.request.Request(base_url + path, method=method, data=b'' if method == 'POST' else None)
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read().decode())
+
+
+def start_portal(args):
+    """Start mock_vtu_portal.py and wait until it answers"""
+    cmd = [
+        sys.executable, MOCK_PORTAL,
+        '--port', str(args.port),
+        '--semester', str(args.semester),
+        '--scheme', args.scheme,
+        '--latency-ms', str(args.latency_ms),
+        '--jitter-ms', str(args.jitter_ms),
+        '--error-rate', str(args.error_rate),
+        '--invalid-rate', str(args.invalid_rate),
+    ]
+    process = subprocess.Popen(cmd)
+    base_url = f"http://127.0.0.1:{args.port}"
+    for _ in range(50):
+        try:
+            portal_request(base_url, '/stats')
+            return process, base_url
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Mock portal did not start")
+
+
+def parse_output(lines, usns):
+    """Final OK / FAIL / INVALID per USN and the STAGE_STATS summary"""
+    usn_set = set(usns)
+    outcomes = {'OK': set(), 'FAIL': set(), 'INVALID': set()}
+    stage_stats = None
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0] in outcomes and parts[1] in usn_set:
+            outcomes[parts[0]].add(parts[1])
+        elif line.startswith('STAGE_STATS '):
+            try:
+                stage_stats = json.loads(line[len('STAGE_STATS '):])
+            except ValueError:
+                pass
+    # A FAIL for an attempt that later succeeded is not a failure
+    outcomes['FAIL'] -= outcomes['OK'] | outcomes['INVALID']
+    return outcomes, stage_stats
+
+
+class ResourceSampler:
+    """Peak memory / Chrome processes and CPU time of a process tree (psutil)"""
+
+    def __init__(self, pid):
+        self.root = psutil.Process(pid) if psutil else None
+        self.peak_rss = 0
+        self.peak_chrome = 0
+        self._cpu = {}      # pid -> last seen user+system seconds
+
+    def sample(self):
+        if not self.root:
+            return
+        try:
+            processes = [self.root] + self.root.children(recursive=True)
+        except psutil.Error:
+            return
+        rss = 0
+        chrome = 0
+        for process in processes:
+            try:
+                with process.oneshot():
+                    rss += process.memory_info().rss
+                    times = process.cpu_times()
+                    self._cpu[process.pid] = times.user + times.system
+                    name = process.name().lower()
+            except psutil.Error:
+                continue
+            if name.startswith(('chrome', 'chromium')) and 'driver' not in name \
+                    and not any(arg.startswith('--type=') for arg in self._cmdline(process)):
+                chrome += 1
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_chrome = max(self.peak_chrome, chrome)
+
+    @staticmethod
+    def _cmdline(process):
+        try:
+            return process.cmdline()
+        except psutil.Error:
+            return []
+
+    @property
+    def cpu_seconds(self):
+        return sum(self._cpu.values())
+
+
+def run_scraper(args, base_url, scraper, mode, workers, usns):
+    """One benchmark run; returns its result row"""
+    script, portal_path = SCRAPERS[scraper]
+    cmd = [
+        sys.executable, script,
+        '--url', f"{base_url}/{portal_path}/index.php",
+        '--workers', str(workers),
+        '--usns', ','.join(usns),
+        '--scheme', args.scheme,
+    ]
+    if scraper == 'vtu':
+        # --force: without it USNs an earlier run already stored with every
+        # subject passed are skipped by the pre-filter and reported OK instantly
+        cmd += ['--semester', str(args.semester), '--force']
+    if mode == 'adaptive':
+        cmd.append('--adaptive')
+
+    journal_dir = tempfile.mkdtemp(prefix='scraper_bench_')
+    env = dict(os.environ,
+               MYSQL_DATABASE=args.database,
+               SCRAPE_JOURNAL=os.path.join(journal_dir, 'scrape_journal.db'),
+               PYTHONUNBUFFERED='1')
+
+    portal_request(base_url, '/stats/reset', method='POST')
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN) if resource else None
+    print(f"RUN {scraper} {mode} workers={workers} usns={len(usns)}")
+
+    started = time.time()
+    process = subprocess.Popen(cmd, cwd=SCRIPTS_DIR, env=env, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace')
+    lines = []
+    reader = threading.Thread(target=lambda: lines.extend(process.stdout), daemon=True)
+    reader.start()
+    sampler = ResourceSampler(process.pid)
+    while process.poll() is None:
+        sampler.sample()
+        time.sleep(SAMPLE_SECONDS)
+    reader.join()
+    elapsed = time.time() - started
+
+    outcomes, stage_stats = parse_output(lines, usns)
+    portal_stats = portal_request(base_url, '/stats')
+    resolved = len(outcomes['OK']) + len(outcomes['INVALID'])
+    attempts = (stage_stats or {}).get('attempt', {}).get('count') or portal_stats['page_loads']
+
+    cpu_seconds = sampler.cpu_seconds
+    peak_rss_mb = sampler.peak_rss / 1024 / 1024
+    if usage_before is not None and not psutil:
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu_seconds = (usage.ru_utime - usage_before.ru_utime) + (usage.ru_stime - usage_before.ru_stime)
+        peak_rss_mb = usage.ru_maxrss / 1024     # Largest single child, KB on Linux
+
+    if process.returncode != 0:
+        print(f"WARN {scraper} exited with {process.returncode} - last lines:")
+        for line in lines[-10:]:
+            print(f"  {line.rstrip()}")
+
+    return {
+        "scraper": scraper,
+        "mode": mode,
+        "workers": workers,
+        "usns": len(usns),
+        "ok": len(outcomes['OK']),
+        "failed": len(outcomes['FAIL']),
+        "invalid": len(outcomes['INVALID']),
+        "seconds": round(elapsed, 1),
+        "usns_per_min": round(resolved / elapsed * 60, 2) if elapsed else 0.0,
+        "attempts_per_usn": round(attempts / len(usns), 2),
+        "captcha_success_rate": portal_stats.get('captcha_success_rate'),
+        "cpu_seconds": round(cpu_seconds, 1),
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "peak_chrome": sampler.peak_chrome if psutil else None,
+        "stage_stats": stage_stats,
+        "portal": portal_stats,
+    }
+
+
+def print_report(rows):
+    """Summary table of all runs"""
+    print(f"\n{'='*118}")
+    print("SCRAPER BENCHMARK")
+    print(f"{'='*118}")
+    print(f"{'scraper':<8}{'mode':<10}{'workers':>8}{'usns':>6}{'ok':>5}{'fail':>6}{'inv':>5}"
+          f"{'seconds':>9}{'USNs/min':>10}{'att/USN':>9}{'captcha':>9}{'CPU s':>8}{'peak MB':>9}{'chrome':>8}")
+    for row in rows:
+        captcha = f"{row['captcha_success_rate']:.0%}" if row['captcha_success_rate'] is not None else '-'
+        chrome = row['peak_chrome'] if row['peak_chrome'] is not None else '-'
+        print(f"{row['scraper']:<8}{row['mode']:<10}{row['workers']:>8}{row['usns']:>6}{row['ok']:>5}"
+              f"{row['failed']:>6}{row['invalid']:>5}{row['seconds']:>9.1f}{row['usns_per_min']:>10.2f}"
+              f"{row['attempts_per_usn']:>9.2f}{captcha:>9}{row['cpu_seconds']:>8.1f}{row['peak_rss_mb']:>9.1f}"
+              f"{chrome:>8}")
+    print(f"{'='*118}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scraper throughput benchmark against the mock VTU portal')
+    parser.add_argument('--scrapers', type=str, default='vtu', help='Comma-separated: vtu, rv')
+    parser.add_argument('--modes', type=str, default='fixed', help='Comma-separated: fixed, adaptive')
+    parser.add_argument('--workers', type=str, default='5,10', help='Comma-separated worker counts')
+    parser.add_argument('--usns', type=int, default=20, help='USNs per run')
+    parser.add_argument('--usn-prefix', type=str, default='1BM22CS', help='Generated USNs: prefix + 001, 002, ...')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per setting')
+    parser.add_argument('--semester', type=int, default=5)
+    parser.add_argument('--scheme', type=str, default='22', choices=['21', '22'])
+    parser.add_argument('--database', type=str, default=os.getenv('BENCH_MYSQL_DATABASE', 'resana_bench'),
+                        help='MySQL database the scrapers write to (scratch copy of the schema)')
+    parser.add_argument('--port', type=int, default=8765, help='Mock portal port')
+    parser.add_argument('--latency-ms', type=float, default=200, help='Portal delay per request')
+    parser.add_argument('--jitter-ms', type=float, default=100, help='Random +/- variation of the delay')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of page loads answered with 503')
+    parser.add_argument('--invalid-rate', type=float, default=0.05, help='Share of USNs the portal rejects')
+    parser.add_argument('--json', type=str, default=None, help='Also write all results to this JSON file')
+    args = parser.parse_args()
+
+    scrapers = [name.strip() for name in args.scrapers.split(',') if name.strip()]
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    worker_counts = [int(count) for count in args.workers.split(',') if count.strip()]
+    unknown = [name for name in scrapers if name not in SCRAPERS] + [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"Unknown scraper/mode: {', '.join(unknown)}")
+    usns = [f"{args.usn_prefix}{i:03d}" for i in range(1, args.usns + 1)]
+
+    portal, base_url = start_portal(args)
+    rows = []
+    try:
+        for scraper in scrapers:
+            for mode in modes:
+                for workers in worker_counts:
+                    for _ in range(args.repeat):
+                        rows.append(run_scraper(args, base_url, scraper, mode, workers, usns))
+    except KeyboardInterrupt:
+        print("STOP Interrupted - reporting the finished runs")
+    finally:
+        portal.terminate()
+        portal.wait()
+
+    if rows:
+        print_report(rows)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
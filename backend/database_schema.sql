@@ -24,7 +24,8 @@ CREATE TABLE subjects (
     semester INT NOT NULL,                  -- e.g., 3, 4
     scheme VARCHAR(10) DEFAULT '22',        -- Scheme: '21' or '22'
     credits INT NOT NULL,                   -- e.g., 3, 4 (for SGPA calculation)
-    short_code VARCHAR(10)                  -- Internal code, e.g., '401'
+    short_code VARCHAR(10),                 -- Internal code, e.g., '401'
+    max_marks INT NOT NULL DEFAULT 100      -- 100, or 200 for major project/internship (set by calculate_grades.py)
 );
 
 -- 3. Teachers Table
@@ -89,3 +90,12 @@ CREATE TABLE student_semester_summary (
     INDEX idx_sgpa (sgpa),
     INDEX idx_class_grade (class_grade)
 );
+
+-- 7. Grade Boundaries Table (Lookup used by the set-based SQL grade engine)
+-- Populated by calculate_grades.py --engine sql
+CREATE TABLE grade_boundaries (
+    letter_grade VARCHAR(5) PRIMARY KEY,    -- O, A+, A, B+, B, C, P, F
+    grade_points INT NOT NULL,              -- 0-10
+    min_percentage INT NOT NULL,            -- Inclusive lower bound
+    max_percentage INT DEFAULT NULL         -- Exclusive upper bound (NULL for O)
+);
@@ -0,0 +1,235 @@
+"""
+SCRAPE JOB SCHEDULER
+====================
+One worker budget for the whole service, shared by every scrape request.
+
+Each request used to start its scraper with its own `workers` (default 20),
+so three departments scraping at once meant 60 Chromes in one container.
+Now every request is a job that draws slots (= concurrent browser workers)
+from a global budget (SCRAPER_SLOT_BUDGET):
+
+- Jobs start in arrival order as long as every running job can still get
+  min_slots; the others wait in a FIFO queue and report their position
+- Running jobs share the budget fairly: equal shares, except that a job that
+  needs fewer (small USN list or low `workers`) leaves the rest to the others
+- Whenever a job starts or finishes the shares are recomputed and written to
+  each job's slot file - the VTU and RV scrapers (--slot-file) re-read it and
+  shrink or grow their pool while running
+- Jobs whose scraper can't resize (autonomous) keep the slots they started with
+"""
+
+import itertools
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_SLOT_BUDGET = 20
+DEFAULT_MIN_SLOTS = 2
+DEFAULT_SLOT_DIR = os.path.join(tempfile.gettempdir(), 'scraper_slots')
+
+
+class ScrapeJob:
+    """
+    One scrape request's claim on the slot budget
+
+    cap is what the job can use at most: min(requested workers, USNs)
+    """
+
+    def __init__(self, job_id, kind, requested, size, resizable, slot_path):
+        self.job_id = job_id
+        self.kind = kind
+        self.requested = requested
+        self.size = size
+        self.cap = max(1, min(requested, size))
+        self.resizable = resizable
+        self.slot_path = slot_path if resizable else None
+        self.allocated = 0
+        self.start_slots = 0         # Allocation when the job started
+        self.queue_position = 0      # Position when submitted (0 = started at once)
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.cancelled = False
+
+    @property
+    def queue_wait(self):
+        """Seconds spent waiting for slots"""
+        end = self.started_at or time.time()
+        return round(end - self.submitted_at, 3)
+
+
+class JobScheduler:
+    """
+    Thread-safe slot allocator for scrape jobs
+
+    Args:
+        total_slots: Global budget of concurrent scrape workers
+        min_slots: Least a running job gets - limits how many jobs run at once
+        slot_dir: Where slot files for resizable jobs are written
+    """
+
+    def __init__(self, total_slots=DEFAULT_SLOT_BUDGET, min_slots=DEFAULT_MIN_SLOTS, slot_dir=DEFAULT_SLOT_DIR):
+        self.total_slots = max(1, total_slots)
+        self.min_slots = max(1, min(min_slots, self.total_slots))
+        self.slot_dir = slot_dir
+        self._cond = threading.Condition()
+        self._queue = []
+        self._running = []
+        self._ids = itertools.count(1)
+        self._completed = 0
+        os.makedirs(slot_dir, exist_ok=True)
+
+    def submit(self, kind, requested, size, resizable=True):
+        """
+        Queue a job; it starts at once if the budget allows
+
+        Returns:
+            ScrapeJob (wait() for it before launching the scraper)
+        """
+        with self._cond:
+            job_id = f"{kind}-{next(self._ids)}"
+            job = ScrapeJob(job_id, kind, requested, size, resizable,
+                            os.path.join(self.slot_dir, f"{job_id}.slots"))
+            self._queue.append(job)
+            self._admit()
+            if job.started_at is None:
+                job.queue_position = self._queue.index(job) + 1
+                print(f"JOB {job_id} queued at position {job.queue_position} "
+                      f"({len(self._running)} running, {self.in_use()}/{self.total_slots} slots in use)")
+            return job
+
+    def wait(self, job, timeout=None):
+        """Block until job has slots; False if it was cancelled or timeout passed"""
+        give_up_at = time.time() + timeout if timeout is not None else None
+        with self._cond:
+            while job.started_at is None and not job.cancelled:
+                remaining = None
+                if give_up_at is not None:
+                    remaining = give_up_at - time.time()
+                    if remaining <= 0:
+                        return False
+                self._cond.wait(remaining)
+            return not job.cancelled
+
+    def finish(self, job):
+        """Release a job's slots (or drop it from the queue) and rebalance"""
+        with self._cond:
+            if job in self._running:
+                self._running.remove(job)
+                self._completed += 1
+                print(f"JOB {job.job_id} finished - released {job.allocated} slots")
+            elif job in self._queue:
+                self._queue.remove(job)
+                job.cancelled = True
+                print(f"JOB {job.job_id} left the queue")
+            if job.slot_path:
+                try:
+                    os.remove(job.slot_path)
+                except OSError:
+                    pass
+            # Freed slots go to queued jobs first, then to the running ones
+            self._admit()
+            self._rebalance()
+            self._cond.notify_all()
+
+    def in_use(self):
+        """Slots currently allocated"""
+        return sum(job.allocated for job in self._running)
+
+    def _fixed_slots(self):
+        """Slots held by running jobs that can't be resized (call with the lock held)"""
+        return sum(job.allocated for job in self._running if not job.resizable)
+
+    def _admit(self):
+        """Start queued jobs while every running job keeps min_slots (call with the lock held)"""
+        started = False
+        while self._queue:
+            job = self._queue[0]
+            resizable_count = sum(1 for running in self._running if running.resizable)
+            free_for_shares = self.total_slots - self._fixed_slots()
+            if free_for_shares < self.min_slots * (resizable_count + 1):
+                break
+
+            self._queue.pop(0)
+            if not job.resizable:
+                # Fixed for its whole run: a fair share, but leave min_slots
+                # for every resizable job already running
+                share = free_for_shares // (resizable_count + 1)
+                spare = free_for_shares - self.min_slots * resizable_count
+                job.allocated = max(1, min(job.cap, max(self.min_slots, share), spare))
+                job.start_slots = job.allocated
+                print(f"JOB {job.job_id} started with {job.allocated} slots (fixed)")
+            job.started_at = time.time()
+            self._running.append(job)
+            started = True
+
+        if started:
+            self._rebalance()
+            self._cond.notify_all()
+
+    def _rebalance(self):
+        """Recompute the fair shares of resizable jobs (call with the lock held)"""
+        resizable = sorted((job for job in self._running if job.resizable), key=lambda job: job.cap)
+        remaining = self.total_slots - self._fixed_slots()
+        for index, job in enumerate(resizable):
+            # Equal split of what is left; jobs capped below it hand the rest on
+            share = min(job.cap, max(1, remaining // (len(resizable) - index)))
+            remaining -= share
+            if share != job.allocated:
+                if job.allocated:
+                    print(f"JOB {job.job_id} slots {job.allocated} -> {share}")
+                else:
+                    job.start_slots = share
+                    print(f"JOB {job.job_id} started with {share} slots")
+                job.allocated = share
+                self._write_slots(job)
+
+    def _write_slots(self, job):
+        """Publish a job's allocation to its scraper (atomic replace)"""
+        tmp_path = f"{job.slot_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(str(job.allocated))
+            os.replace(tmp_path, job.slot_path)
+        except OSError as e:
+            print(f"WARN Could not write slot file for {job.job_id}: {e}")
+
+    def position(self, job):
+        """Current queue position (0 once running)"""
+        with self._cond:
+            return self._queue.index(job) + 1 if job in self._queue else 0
+
+    def status(self):
+        """Snapshot for the /jobs endpoint"""
+        now = time.time()
+        with self._cond:
+            return {
+                "total_slots": self.total_slots,
+                "min_slots": self.min_slots,
+                "slots_in_use": self.in_use(),
+                "completed_jobs": self._completed,
+                "running": [
+                    {
+                        "job_id": job.job_id,
+                        "kind": job.kind,
+                        "usns": job.size,
+                        "requested_workers": job.requested,
+                        "allocated_slots": job.allocated,
+                        "resizable": job.resizable,
+                        "queue_wait": job.queue_wait,
+                        "running_seconds": round(now - job.started_at, 1),
+                    }
+                    for job in self._running
+                ],
+                "queued": [
+                    {
+                        "job_id": job.job_id,
+                        "kind": job.kind,
+                        "usns": job.size,
+                        "requested_workers": job.requested,
+                        "queue_position": position,
+                        "waiting_seconds": round(now - job.submitted_at, 1),
+                    }
+                    for position, job in enumerate(self._queue, start=1)
+                ],
+            }
@@ -6,10 +6,16 @@ No logic changes - just a clean API interface
 Auto-calculates SGPA/CGPA after scraping completes
 """
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, ConfigDict, ValidationError
-from typing import List
+from typing import List, Optional
+from regrade_queue import RegradeQueue, DEFAULT_DEBOUNCE_SECONDS, DEFAULT_MAX_WAIT_SECONDS
+from job_scheduler import JobScheduler, DEFAULT_SLOT_BUDGET, DEFAULT_MIN_SLOTS, DEFAULT_SLOT_DIR
+from request_coalescer import (RequestCoalescer, IdempotencyConflict, DEFAULT_IDEMPOTENCY_TTL_SECONDS,
+                               OUTCOME_OK, OUTCOME_INVALID)
 import subprocess
 import json
 import time
@@ -37,12 +43,192 @@ GRADE_CALCULATOR = os.path.join(SCRIPTS_DIR, 'calculate_grades.py')
 
 # Import grade calculation function
 sys.path.insert(0, SCRIPTS_DIR)
+from metrics import ServiceMetrics, CONTENT_TYPE, count_chrome_instances
 try:
     from calculate_grades import calculate_grades_for_semester
 except ImportError:
     calculate_grades_for_semester = None
     print("WARNING: Grade calculator not found, SGPA/CGPA won't be calculated automatically")
 
+# With grade_triggers.py installed MySQL grades every write itself
+try:
+    from grade_triggers import triggers_installed
+except ImportError:
+    triggers_installed = None
+
+# The check opens a MySQL connection, so its answer is cached and refreshed
+# in a worker thread at most every GRADE_TRIGGERS_CHECK_TTL seconds (picks up
+# grade_triggers.py install / uninstall within that time)
+TRIGGERS_CHECK_TTL = float(os.getenv('GRADE_TRIGGERS_CHECK_TTL', 60))
+_triggers_check = {"installed": False, "checked_at": None}
+
+async def grades_maintained_by_triggers():
+    """True when the post-scrape grade calculation can be skipped"""
+    if not triggers_installed:
+        return False
+    checked_at = _triggers_check['checked_at']
+    if checked_at is None or time.time() - checked_at >= TRIGGERS_CHECK_TTL:
+        _triggers_check['installed'] = bool(await run_in_threadpool(triggers_installed))
+        _triggers_check['checked_at'] = time.time()
+    return _triggers_check['installed']
+
+def run_regrade(semester, usns):
+    """Recalculate grades for usns in semester (called by the regrade queue)"""
+    if calculate_grades_for_semester:
+        return calculate_grades_for_semester(semester, verbose=False, usns=usns)
+    
+    # Fallback: run calculate_grades.py with the same Python interpreter
+    grade_cmd = [
+        sys.executable,
+        GRADE_CALCULATOR,
+        '--semester', str(semester),
+        '--usns', ','.join(usns)
+    ]
+    try:
+        grade_result = subprocess.run(
+            grade_cmd,
+            capture_output=True,
+            text=True,
+            cwd=SCRIPTS_DIR,
+            encoding='utf-8',
+            errors='replace',
+            timeout=300  # 5 minute timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {"success": False, "error": "Grade calculation timed out (>5 min)"}
+    if grade_result.returncode != 0:
+        return {"success": False, "error": (grade_result.stderr or grade_result.stdout)[-500:]}
+    return {"success": True}
+
+# Counters/histograms behind GET /metrics (Prometheus)
+service_metrics = ServiceMetrics()
+
+def run_regrade_timed(semester, usns):
+    """run_regrade, with its duration recorded in the metrics"""
+    started_at = time.time()
+    result = {"success": False}
+    try:
+        result = run_regrade(semester, usns)
+        return result
+    finally:
+        service_metrics.record_regrade(time.time() - started_at, bool(result.get('success')))
+
+# Post-scrape grade calculations go through one debounced queue: scrapes of the
+# same semester finishing close together are merged into a single regrade
+regrade_queue = RegradeQueue(
+    run_regrade_timed,
+    debounce_seconds=float(os.getenv('REGRADE_DEBOUNCE_SECONDS', DEFAULT_DEBOUNCE_SECONDS)),
+    max_wait_seconds=float(os.getenv('REGRADE_MAX_WAIT_SECONDS', DEFAULT_MAX_WAIT_SECONDS))
+)
+
+async def queue_regrade(semester, usns):
+    """
+    Queue a regrade for the students a scrape succeeded for
+
+    Returns:
+        True when a regrade was queued
+    """
+    if not usns:
+        return False
+    if await grades_maintained_by_triggers():
+        print("SKIPPED: Grades maintained by MySQL triggers (grade_triggers.py)")
+        return False
+    pending = regrade_queue.submit(semester, usns)
+    print(f"Regrade queued for Semester {semester} ({pending} students pending)")
+    return True
+
+# Every scrape request draws its browser workers from one global budget,
+# shared fairly between the jobs running at the same time
+job_scheduler = JobScheduler(
+    total_slots=int(os.getenv('SCRAPER_SLOT_BUDGET', DEFAULT_SLOT_BUDGET)),
+    min_slots=int(os.getenv('SCRAPER_MIN_JOB_SLOTS', DEFAULT_MIN_SLOTS)),
+    slot_dir=os.getenv('SCRAPER_SLOT_DIR', DEFAULT_SLOT_DIR)
+)
+
+async def acquire_slots(kind, workers, size, resizable=True):
+    """
+    Queue a scrape job for the global worker budget and wait until it starts
+
+    The caller must release it with job_scheduler.finish(job)
+    """
+    job = job_scheduler.submit(kind, workers, size, resizable)
+    try:
+        await run_in_threadpool(job_scheduler.wait, job)
+    except BaseException:
+        # Client went away while queued
+        job_scheduler.finish(job)
+        raise
+    return job
+
+def run_scraper(cmd):
+    """Run a scraper script and capture its output"""
+    return subprocess.run(
+        cmd,
+        capture_output=True,
+        text=True,
+        cwd=SCRIPTS_DIR,
+        encoding='utf-8',
+        errors='replace'
+    )
+
+def job_fields(job):
+    """Scheduling details for ScrapeResponse (nothing if every USN was coalesced)"""
+    if job is None:
+        return {}
+    return {
+        "job_id": job.job_id,
+        "queue_position": job.queue_position,
+        "queue_wait": job.queue_wait,
+        "allocated_slots": job.start_slots,
+    }
+
+# Duplicate work across requests: USNs already being scraped for the same
+# endpoint/URL/semester are shared, and Idempotency-Key repeats are answered once
+coalescer = RequestCoalescer(
+    idempotency_ttl_seconds=float(os.getenv('IDEMPOTENCY_TTL_SECONDS', DEFAULT_IDEMPOTENCY_TTL_SECONDS))
+)
+
+async def run_idempotent(endpoint, idempotency_key, body, handler):
+    """Run a scrape handler, or return the response of an earlier request with the same key"""
+    if not idempotency_key:
+        return await handler()
+    try:
+        response, replayed = await coalescer.idempotent(endpoint, idempotency_key, body, handler)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if replayed:
+        return response.model_copy(update={"idempotent_replay": True})
+    return response
+
+def add_attached_outcomes(outcomes, succeeded, failed, invalid):
+    """Merge outcomes of USNs scraped by another request into this request's lists"""
+    for usn, outcome in outcomes.items():
+        if outcome == OUTCOME_OK:
+            succeeded.append(usn)
+        elif outcome == OUTCOME_INVALID:
+            invalid.append(usn)
+        else:
+            failed.append(usn)
+
+def final_failures(failed, succeeded, invalid):
+    """
+    USNs that really failed: scrapers print FAIL for every failed attempt,
+    so drop USNs that later succeeded and those reported as invalid
+    """
+    done = set(succeeded) | set(invalid)
+    return [usn for usn in dict.fromkeys(failed) if usn not in done]
+
+def parse_stats_line(logs, marker):
+    """Last "{marker} {json}" line printed by a scraper (BREAKER_STATS, STAGE_STATS, PROFILE_STATS), as a dict"""
+    prefix = marker + ' '
+    for line in reversed(logs):
+        if line.startswith(prefix):
+            try:
+                return json.loads(line[len(prefix):])
+            except ValueError:
+                return None
+    return None
+
 # Request models
 class VTUScrapeRequest(BaseModel):
     url: str
@@ -50,11 +236,16 @@ class VTUScrapeRequest(BaseModel):
     scheme: str
     usns: List[str]
     workers: int = 20
+    resume: bool = False  # Skip USNs already done in the checkpoint journal
+    force: bool = False   # Re-scrape USNs whose semester results are already complete
+    adaptive: bool = False  # Let the scraper tune the worker count (AIMD), starting from workers
+    profile: bool = False   # Run the scraper with --profile (cProfile + tracemalloc into PROFILE_DIR)
     
 class AutonomousScrapeRequest(BaseModel):
     url: str
     students: List[dict]  # [{"usn": "1BI22IS001", "dob": "2004-05-15"}, ...]
     workers: int = 20
+    profile: bool = False   # Run the scraper with --profile (cProfile + tracemalloc into PROFILE_DIR)
 
 class RVScrapeRequest(BaseModel):
     model_config = ConfigDict(extra='ignore')
@@ -63,6 +254,9 @@ class RVScrapeRequest(BaseModel):
     semester: int
     usns: List[str]
     workers: int = 20
+    resume: bool = False  # Skip USNs already done in the checkpoint journal
+    adaptive: bool = False  # Let the scraper tune the worker count (AIMD), starting from workers
+    profile: bool = False   # Run the scraper with --profile (cProfile + tracemalloc into PROFILE_DIR)
     
 class ScrapeResponse(BaseModel):
     success: bool
@@ -73,75 +267,123 @@ class ScrapeResponse(BaseModel):
     time_taken: float
     message: str
     logs: List[str]
+    regrade_queued: bool = False
+    invalid_usns: List[str] = []  # Rejected by VTU as invalid - not retried, not counted as failed
+    breaker: Optional[dict] = None  # Portal circuit breaker state/counters (BREAKER_STATS line)
+    stage_timings: Optional[dict] = None  # Per-stage latency histograms (STAGE_STATS line)
+    profile: Optional[dict] = None  # Profile files and hottest functions, with "profile": true (PROFILE_STATS line)
+    job_id: Optional[str] = None
+    queue_position: int = 0      # Position in the job queue on arrival (0 = started at once)
+    queue_wait: float = 0.0      # Seconds spent waiting for worker slots
+    allocated_slots: int = 0     # Workers granted from the global budget at start
+    coalesced_usns: List[str] = []  # Scraped by a concurrent request for the same URL/semester
+    idempotent_replay: bool = False  # Response of an earlier request with the same Idempotency-Key
 
 @app.post("/scrape/vtu", response_model=ScrapeResponse)
-async def scrape_vtu_results(request: VTUScrapeRequest):
+async def scrape_vtu_results(request: VTUScrapeRequest, idempotency_key: Optional[str] = Header(None)):
     """
     Call ultimate_scraper.py with given parameters
     """
+    return await run_idempotent('vtu', idempotency_key, request.model_dump(), lambda: scrape_vtu(request))
+
+async def scrape_vtu(request: VTUScrapeRequest):
+    """Scrape the USNs of a VTU request that no other request is scraping"""
     start_time = time.time()
     
-    print(f"VTU SCRAPER STARTED - {len(request.usns)} students - {request.workers} workers")
-    
-    # Prepare command
-    usns_csv = ','.join(request.usns)
-    
-    cmd = [
-        'python',
-        ULTIMATE_SCRAPER,
-        '--url', request.url,
-        '--semester', str(request.semester),
-        '--scheme', request.scheme,
-        '--workers', str(request.workers),
-        '--usns', usns_csv
-    ]
+    # USNs another request is already scraping are attached to that job
+    claim = coalescer.claim('vtu', request.url, request.semester, request.usns)
+    usns = claim.owned
+    job = None
+    scheduling = {}
     
     try:
-        # Run the scraper
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=SCRIPTS_DIR,
-            encoding='utf-8',
-            errors='replace'
-        )
-        
-        # Parse output
-        output_lines = result.stdout.split('\n')
-        logs = [line for line in output_lines if line.strip()]
-        
-        # Count success/failed from logs
-        # ultimate_scraper.py prints:
-        # - "OK {usn}" at the end when successful
-        # - "FAIL {usn}" at the end when failed
+        logs = []
         succeeded = []
         failed = []
+        invalid = []
+        breaker = None
+        stage_timings = None
+        profile = None
+        regrade_queued = False
         
-        for line in logs:
-            # Check for final success/fail markers (exactly "OK {usn}" or "FAIL {usn}")
-            parts = line.split()
-            if len(parts) == 2:
-                if parts[0] == 'OK' and parts[1] in request.usns:
-                    succeeded.append(parts[1])
-                elif parts[0] == 'FAIL' and parts[1] in request.usns:
-                    failed.append(parts[1])
+        if usns:
+            # Wait for worker slots - the scraper resizes itself via the slot file
+            job = await acquire_slots('vtu', request.workers, len(usns))
+            
+            print(f"VTU SCRAPER STARTED - {len(usns)} students - {job.start_slots} of {request.workers} workers (job {job.job_id})")
+            
+            # Prepare command
+            usns_csv = ','.join(usns)
+            
+            cmd = [
+                'python',
+                ULTIMATE_SCRAPER,
+                '--url', request.url,
+                '--semester', str(request.semester),
+                '--scheme', request.scheme,
+                '--workers', str(job.cap),
+                '--usns', usns_csv,
+                '--checkpoint',
+                '--slot-file', job.slot_path
+            ]
+            if request.resume:
+                cmd.append('--resume')
+            if request.force:
+                cmd.append('--force')
+            if request.adaptive:
+                cmd.append('--adaptive')
+            if request.profile:
+                cmd.append('--profile')
+            
+            # Run the scraper (in a thread, so other requests are served meanwhile)
+            result = await run_in_threadpool(run_scraper, cmd)
+            
+            # Scraper has exited - hand its slots back before waiting on attached USNs
+            scheduling = job_fields(job)
+            job_scheduler.finish(job)
+            job = None
+            
+            # Parse output
+            output_lines = result.stdout.split('\n')
+            logs = [line for line in output_lines if line.strip()]
+            
+            # Count success/failed from logs
+            # ultimate_scraper.py prints:
+            # - "OK {usn}" at the end when successful
+            # - "FAIL {usn}" at the end when failed
+            # - "INVALID {usn}" when VTU rejects the USN (or it is cached as invalid)
+            owned = set(usns)
+            for line in logs:
+                # Check for final success/fail markers (exactly "OK {usn}" or "FAIL {usn}")
+                parts = line.split()
+                if len(parts) == 2:
+                    if parts[0] == 'OK' and parts[1] in owned:
+                        succeeded.append(parts[1])
+                    elif parts[0] == 'FAIL' and parts[1] in owned:
+                        failed.append(parts[1])
+                    elif parts[0] == 'INVALID' and parts[1] in owned and parts[1] not in invalid:
+                        invalid.append(parts[1])
+            
+            # A failed attempt that was retried successfully isn't a failure
+            failed = final_failures(failed, succeeded, invalid)
+            breaker = parse_stats_line(logs, 'BREAKER_STATS')
+            stage_timings = parse_stats_line(logs, 'STAGE_STATS')
+            profile = parse_stats_line(logs, 'PROFILE_STATS')
+            claim.resolve(succeeded, invalid)
+            
+            # Queue SGPA/CGPA recalculation for the students this scrape touched
+            # (attached USNs are regraded by the request that scraped them)
+            regrade_queued = await queue_regrade(request.semester, succeeded)
         
-        time_taken = time.time() - start_time
+        service_metrics.record_scrape('vtu', len(succeeded), len(failed), len(invalid), len(claim.attached),
+                                      time.time() - start_time, stage_timings)
         
-        print(f"VTU SCRAPER COMPLETED - Success: {len(succeeded)} - Failed: {len(failed)} - Time: {time_taken:.2f}s")
+        # USNs scraped by another request: wait for that job's outcome
+        add_attached_outcomes(await claim.wait_attached(), succeeded, failed, invalid)
         
-        # Auto-calculate SGPA/CGPA after successful scraping
-        if len(succeeded) > 0 and calculate_grades_for_semester:
-            try:
-                print(f"Calculating SGPA/CGPA for Semester {request.semester}...")
-                grade_result = calculate_grades_for_semester(request.semester, verbose=False)
-                if grade_result['success']:
-                    print(f"Grade calculation completed successfully")
-                else:
-                    print(f"Grade calculation failed: {grade_result.get('error', 'Unknown error')}")
-            except Exception as e:
-                print(f"Grade calculation error (non-fatal): {str(e)}")
+        time_taken = time.time() - start_time
+        
+        print(f"VTU SCRAPER COMPLETED - Success: {len(succeeded)} - Failed: {len(failed)} - Invalid: {len(invalid)} - Time: {time_taken:.2f}s")
         
         return ScrapeResponse(
             success=True,
@@ -150,12 +392,20 @@ async def scrape_vtu_results(request: VTUScrapeRequest):
             failed=len(failed),
             failed_usns=failed,
             time_taken=time_taken,
-            message=f"Scraping completed. {len(succeeded)} succeeded, {len(failed)} failed.",
-            logs=logs[-50:]  # Last 50 log lines
+            message=f"Scraping completed. {len(succeeded)} succeeded, {len(failed)} failed, {len(invalid)} invalid.",
+            logs=logs[-50:],  # Last 50 log lines
+            regrade_queued=regrade_queued,
+            invalid_usns=invalid,
+            breaker=breaker,
+            stage_timings=stage_timings,
+            profile=profile,
+            coalesced_usns=list(claim.attached),
+            **scheduling
         )
         
     except Exception as e:
         print(f"VTU SCRAPER ERROR: {str(e)}")
+        service_metrics.inc('scraper_scrape_errors_total', endpoint='vtu')
         return ScrapeResponse(
             success=False,
             total=len(request.usns),
@@ -164,59 +414,92 @@ async def scrape_vtu_results(request: VTUScrapeRequest):
             failed_usns=request.usns,
             time_taken=time.time() - start_time,
             message=f"Scraper failed: {str(e)}",
-            logs=[str(e)]
+            logs=[str(e)],
+            **(job_fields(job) or scheduling)
         )
+    finally:
+        claim.release()
+        if job:
+            job_scheduler.finish(job)
 
 @app.post("/scrape/autonomous", response_model=ScrapeResponse)
-async def scrape_autonomous_results(request: AutonomousScrapeRequest):
+async def scrape_autonomous_results(request: AutonomousScrapeRequest, idempotency_key: Optional[str] = Header(None)):
     """
     Call AUTONOMOUS_scrapper.py with given parameters
     """
+    return await run_idempotent('autonomous', idempotency_key, request.model_dump(), lambda: scrape_autonomous(request))
+
+async def scrape_autonomous(request: AutonomousScrapeRequest):
+    """Scrape the students of an autonomous request that no other request is scraping"""
     start_time = time.time()
     
-    print(f"AUTONOMOUS SCRAPER STARTED - {len(request.students)} students - {request.workers} workers")
-    
-    # Prepare command
-    students_json = json.dumps(request.students)
-    
-    cmd = [
-        'python',
-        AUTONOMOUS_SCRAPER,
-        '--url', request.url,
-        '--workers', str(request.workers),
-        '--students', students_json
-    ]
+    # USNs another request is already scraping are attached to that job
+    claim = coalescer.claim('autonomous', request.url, None, [s['usn'] for s in request.students])
+    students = [s for s in request.students if s['usn'] in set(claim.owned)]
+    job = None
+    scheduling = {}
     
     try:
-        # Run the scraper
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=SCRIPTS_DIR,
-            encoding='utf-8',
-            errors='replace'
-        )
-        
-        # Parse output
-        output_lines = result.stdout.split('\n')
-        logs = [line for line in output_lines if line.strip()]
-        
-        # Count success/failed from logs
-        # ultimate_scraper.py prints:
-        # - "OK {usn}" at the end when successful
-        # - "FAIL {usn}" at the end when failed
+        logs = []
         succeeded = []
         failed = []
+        stage_timings = None
+        profile = None
+        
+        if students:
+            # AUTONOMOUS_scrapper.py can't resize itself - it keeps its starting slots
+            job = await acquire_slots('autonomous', request.workers, len(students), resizable=False)
+            
+            print(f"AUTONOMOUS SCRAPER STARTED - {len(students)} students - {job.start_slots} of {request.workers} workers (job {job.job_id})")
+            
+            # Prepare command
+            students_json = json.dumps(students)
+            
+            cmd = [
+                'python',
+                AUTONOMOUS_SCRAPER,
+                '--url', request.url,
+                '--workers', str(job.start_slots),
+                '--students', students_json
+            ]
+            if request.profile:
+                cmd.append('--profile')
+            
+            # Run the scraper (in a thread, so other requests are served meanwhile)
+            result = await run_in_threadpool(run_scraper, cmd)
+            
+            # Scraper has exited - hand its slots back before waiting on attached USNs
+            scheduling = job_fields(job)
+            job_scheduler.finish(job)
+            job = None
+            
+            # Parse output
+            output_lines = result.stdout.split('\n')
+            logs = [line for line in output_lines if line.strip()]
+            
+            # Count success/failed from logs
+            # ultimate_scraper.py prints:
+            # - "OK {usn}" at the end when successful
+            # - "FAIL {usn}" at the end when failed
+            owned = set(claim.owned)
+            for line in logs:
+                # Check for final success/fail markers (exactly "OK {usn}" or "FAIL {usn}")
+                parts = line.split()
+                if len(parts) == 2:
+                    if parts[0] == 'OK' and parts[1] in owned:
+                        succeeded.append(parts[1])
+                    elif parts[0] == 'FAIL' and parts[1] in owned:
+                        failed.append(parts[1])
+            
+            stage_timings = parse_stats_line(logs, 'STAGE_STATS')
+            profile = parse_stats_line(logs, 'PROFILE_STATS')
+            claim.resolve(succeeded, [])
+        
+        service_metrics.record_scrape('autonomous', len(succeeded), len(failed), 0, len(claim.attached),
+                                      time.time() - start_time, stage_timings)
         
-        for line in logs:
-            # Check for final success/fail markers (exactly "OK {usn}" or "FAIL {usn}")
-            parts = line.split()
-            if len(parts) == 2:
-                if parts[0] == 'OK' and parts[1] in [s['usn'] for s in request.students]:
-                    succeeded.append(parts[1])
-                elif parts[0] == 'FAIL' and parts[1] in [s['usn'] for s in request.students]:
-                    failed.append(parts[1])
+        # USNs scraped by another request: wait for that job's outcome
+        add_attached_outcomes(await claim.wait_attached(), succeeded, failed, [])
         
         time_taken = time.time() - start_time
         
@@ -230,11 +513,16 @@ async def scrape_autonomous_results(request: AutonomousScrapeRequest):
             failed_usns=failed,
             time_taken=time_taken,
             message=f"Scraping completed. {len(succeeded)} succeeded, {len(failed)} failed.",
-            logs=logs[-50:]  # Last 50 log lines
+            logs=logs[-50:],  # Last 50 log lines
+            stage_timings=stage_timings,
+            profile=profile,
+            coalesced_usns=list(claim.attached),
+            **scheduling
         )
         
     except Exception as e:
         print(f"AUTONOMOUS SCRAPER ERROR: {str(e)}")
+        service_metrics.inc('scraper_scrape_errors_total', endpoint='autonomous')
         return ScrapeResponse(
             success=False,
             total=len(request.students),
@@ -243,8 +531,13 @@ async def scrape_autonomous_results(request: AutonomousScrapeRequest):
             failed_usns=[s['usn'] for s in request.students],
             time_taken=time.time() - start_time,
             message=f"Scraper failed: {str(e)}",
-            logs=[str(e)]
+            logs=[str(e)],
+            **(job_fields(job) or scheduling)
         )
+    finally:
+        claim.release()
+        if job:
+            job_scheduler.finish(job)
 
 @app.post("/scrape/rv", response_model=ScrapeResponse)
 async def scrape_rv_results(request: Request):
@@ -263,150 +556,148 @@ async def scrape_rv_results(request: Request):
         print(f"❌ VALIDATION ERROR: {e}")
         raise HTTPException(status_code=422, detail=str(e))
     
+    return await run_idempotent('rv', request.headers.get('Idempotency-Key'), validated_request.model_dump(),
+                                lambda: scrape_rv(validated_request))
+
+async def scrape_rv(validated_request: RVScrapeRequest):
+    """Scrape the USNs of an RV request that no other request is scraping"""
     start_time = time.time()
     
-    print(f"RV SCRAPER STARTED - {len(validated_request.usns)} students - {validated_request.workers} workers")
-    print(f"RV SCRAPER - Request received: url={validated_request.url}, semester={validated_request.semester}, usns_count={len(validated_request.usns)}")
-    
-    # Prepare command
-    usns_csv = ','.join(validated_request.usns)
-    
-    cmd = [
-        'python',
-        RV_SCRAPER,
-        '--url', validated_request.url,
-        '--workers', str(validated_request.workers),
-        '--usns', usns_csv
-    ]
+    # USNs another request is already scraping are attached to that job
+    claim = coalescer.claim('rv', validated_request.url, validated_request.semester, validated_request.usns)
+    usns = claim.owned
+    job = None
+    scheduling = {}
     
     try:
-        # Run the scraper
-        print(f"CMD Executing command: {' '.join(cmd)}")
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=SCRIPTS_DIR,
-            encoding='utf-8',
-            errors='replace'
-        )
-        
-        # Parse output
-        output_lines = result.stdout.split('\n')
-        error_lines = result.stderr.split('\n')
-        logs = [line for line in output_lines if line.strip()]
-        
-        # Print ALL output for debugging
-        print(f"\n{'='*60}")
-        print(f"RV SCRAPER STDOUT ({len(logs)} lines):")
-        print(f"{'='*60}")
-        for line in logs[-100:]:  # Last 100 lines
-            print(line)
-        print(f"{'='*60}\n")
+        logs = []
+        succeeded = []
+        failed = []
+        invalid = []
+        breaker = None
+        stage_timings = None
+        profile = None
+        regrade_queued = False
         
-        if error_lines and any(line.strip() for line in error_lines):
+        if usns:
+            # Wait for worker slots - the scraper resizes itself via the slot file
+            job = await acquire_slots('rv', validated_request.workers, len(usns))
+            
+            print(f"RV SCRAPER STARTED - {len(usns)} students - {job.start_slots} of {validated_request.workers} workers (job {job.job_id})")
+            print(f"RV SCRAPER - Request received: url={validated_request.url}, semester={validated_request.semester}, usns_count={len(validated_request.usns)}")
+            
+            # Prepare command
+            usns_csv = ','.join(usns)
+            
+            cmd = [
+                'python',
+                RV_SCRAPER,
+                '--url', validated_request.url,
+                '--workers', str(job.cap),
+                '--usns', usns_csv,
+                '--checkpoint',
+                '--slot-file', job.slot_path
+            ]
+            if validated_request.resume:
+                cmd.append('--resume')
+            if validated_request.adaptive:
+                cmd.append('--adaptive')
+            if validated_request.profile:
+                cmd.append('--profile')
+            
+            # Run the scraper
+            print(f"CMD Executing command: {' '.join(cmd)}")
+            result = await run_in_threadpool(run_scraper, cmd)
+            
+            # Scraper has exited - hand its slots back before waiting on attached USNs
+            scheduling = job_fields(job)
+            job_scheduler.finish(job)
+            job = None
+            
+            # Parse output
+            output_lines = result.stdout.split('\n')
+            error_lines = result.stderr.split('\n')
+            logs = [line for line in output_lines if line.strip()]
+            
+            # Print ALL output for debugging
+            print(f"\n{'='*60}")
+            print(f"RV SCRAPER STDOUT ({len(logs)} lines):")
+            print(f"{'='*60}")
+            for line in logs[-100:]:  # Last 100 lines
+                print(line)
+            print(f"{'='*60}\n")
+            
+            if error_lines and any(line.strip() for line in error_lines):
+                print(f"\n{'='*60}")
+                print(f"RV SCRAPER STDERR:")
+                print(f"{'='*60}")
+                for line in error_lines:
+                    if line.strip():
+                        print(line)
+                print(f"{'='*60}\n")
+            
+            # Count success/failed from logs
+            # Rv_ScrapperVTU.py prints various formats:
+            # - "OK {usn} - RV results scraped"
+            # - "OK {usn}"
+            # - "FAIL {usn} - Failed after 1 browser attempt(s)" (per try, retried by the scheduler)
+            # - "FAIL {usn}"
+            # - "INVALID {usn}" (no RV results for the USN, or cached as such)
+            owned = set(usns)
+            for line in logs:
+                # Check if line starts with OK or FAIL
+                if line.startswith('OK '):
+                    # Extract USN (second word before any dash/hyphen)
+                    parts = line.split()
+                    if len(parts) >= 2:
+                        usn_candidate = parts[1]
+                        if usn_candidate in owned and usn_candidate not in succeeded:
+                            succeeded.append(usn_candidate)
+                            print(f"OK - Marked success: {usn_candidate}")
+                elif line.startswith('FAIL '):
+                    # Extract USN
+                    parts = line.split()
+                    if len(parts) >= 2:
+                        usn_candidate = parts[1]
+                        if usn_candidate in owned and usn_candidate not in failed:
+                            failed.append(usn_candidate)
+                            print(f"FAIL - Marked failed: {usn_candidate}")
+                elif line.startswith('INVALID '):
+                    parts = line.split()
+                    if len(parts) >= 2:
+                        usn_candidate = parts[1]
+                        if usn_candidate in owned and usn_candidate not in invalid:
+                            invalid.append(usn_candidate)
+                            print(f"INVALID - Marked invalid: {usn_candidate}")
+            
+            failed = final_failures(failed, succeeded, invalid)
+            breaker = parse_stats_line(logs, 'BREAKER_STATS')
+            stage_timings = parse_stats_line(logs, 'STAGE_STATS')
+            profile = parse_stats_line(logs, 'PROFILE_STATS')
+            claim.resolve(succeeded, invalid)
+            
+            # Queue SGPA/CGPA recalculation after successful RV scraping
+            # RV updates marks, so grades need recalculation
             print(f"\n{'='*60}")
-            print(f"RV SCRAPER STDERR:")
+            print(f"POST-SCRAPING: Grade Calculation")
             print(f"{'='*60}")
-            for line in error_lines:
-                if line.strip():
-                    print(line)
+            regrade_queued = await queue_regrade(validated_request.semester, succeeded)
+            if not succeeded:
+                print(f"SKIPPED: No successful scrapes, nothing to recalculate")
             print(f"{'='*60}\n")
         
-        # Count success/failed from logs
-        # Rv_ScrapperVTU.py prints various formats:
-        # - "OK {usn} - RV results scraped"
-        # - "OK {usn}"
-        # - "FAIL {usn} - Failed after 5 attempts"
-        # - "FAIL {usn}"
-        succeeded = []
-        failed = []
+        service_metrics.record_scrape('rv', len(succeeded), len(failed), len(invalid), len(claim.attached),
+                                      time.time() - start_time, stage_timings)
         
-        for line in logs:
-            # Check if line starts with OK or FAIL
-            if line.startswith('OK '):
-                # Extract USN (second word before any dash/hyphen)
-                parts = line.split()
-                if len(parts) >= 2:
-                    usn_candidate = parts[1]
-                    if usn_candidate in validated_request.usns and usn_candidate not in succeeded:
-                        succeeded.append(usn_candidate)
-                        print(f"OK - Marked success: {usn_candidate}")
-            elif line.startswith('FAIL '):
-                # Extract USN
-                parts = line.split()
-                if len(parts) >= 2:
-                    usn_candidate = parts[1]
-                    if usn_candidate in validated_request.usns and usn_candidate not in failed:
-                        failed.append(usn_candidate)
-                        print(f"FAIL - Marked failed: {usn_candidate}")
+        # USNs scraped by another request: wait for that job's outcome
+        add_attached_outcomes(await claim.wait_attached(), succeeded, failed, invalid)
         
         time_taken = time.time() - start_time
         
         print(f"\n{'='*60}")
-        print(f"RV SCRAPER COMPLETED - Success: {len(succeeded)} - Failed: {len(failed)} - Time: {time_taken:.2f}s")
+        print(f"RV SCRAPER COMPLETED - Success: {len(succeeded)} - Failed: {len(failed)} - Invalid: {len(invalid)} - Time: {time_taken:.2f}s")
         print(f"{'='*60}")
         
-        # Auto-calculate SGPA/CGPA after successful RV scraping
-        # RV updates marks, so grades need recalculation
-        print(f"\n{'='*60}")
-        print(f"POST-SCRAPING: Grade Calculation")
-        print(f"{'='*60}")
-        if len(succeeded) > 0:
-            try:
-                print(f"Running grade calculation for Semester {validated_request.semester}...")
-                print(f"Students affected: {len(succeeded)}")
-                
-                # Use subprocess to call calculate_grades.py directly (more reliable than import)
-                # Use sys.executable to ensure we use the same Python interpreter
-                grade_cmd = [
-                    sys.executable,  # Use current Python interpreter
-                    GRADE_CALCULATOR,
-                    '--semester', str(validated_request.semester)
-                ]
-                
-                print(f"CMD: {' '.join(grade_cmd)}")
-                print(f"Python: {sys.executable}")
-                print(f"Script: {GRADE_CALCULATOR}")
-                print(f"CWD: {SCRIPTS_DIR}")
-                
-                grade_result = subprocess.run(
-                    grade_cmd,
-                    capture_output=True,
-                    text=True,
-                    cwd=SCRIPTS_DIR,
-                    encoding='utf-8',
-                    errors='replace',
-                    timeout=300  # 5 minute timeout
-                )
-                
-                if grade_result.returncode == 0:
-                    print(f"SUCCESS: Grade calculation completed")
-                    # Print last 20 lines of output
-                    output_lines = [line for line in grade_result.stdout.split('\n') if line.strip()]
-                    if output_lines:
-                        print("Grade Calculation Output:")
-                        for line in output_lines[-20:]:
-                            print(f"  {line}")
-                else:
-                    print(f"FAILED: Grade calculation failed with exit code {grade_result.returncode}")
-                    if grade_result.stderr:
-                        print(f"Error output: {grade_result.stderr}")
-                    if grade_result.stdout:
-                        print(f"Standard output: {grade_result.stdout[-500:]}")  # Last 500 chars
-                    
-            except subprocess.TimeoutExpired:
-                print(f"ERROR: Grade calculation timed out (>5 min)")
-            except Exception as grade_error:
-                print(f"ERROR: Grade calculation exception: {str(grade_error)}")
-            except Exception as e:
-                print(f"ERROR: Grade calculation crashed: {str(e)}")
-                import traceback
-                traceback.print_exc()
-        else:
-            print(f"SKIPPED: No successful scrapes, nothing to recalculate")
-        print(f"{'='*60}\n")
-        
         return ScrapeResponse(
             success=True,
             total=len(validated_request.usns),
@@ -414,12 +705,20 @@ async def scrape_rv_results(request: Request):
             failed=len(failed),
             failed_usns=failed,
             time_taken=time_taken,
-            message=f"RV scraping completed. {len(succeeded)} succeeded, {len(failed)} failed.",
-            logs=logs[-50:]  # Last 50 log lines
+            message=f"RV scraping completed. {len(succeeded)} succeeded, {len(failed)} failed, {len(invalid)} invalid.",
+            logs=logs[-50:],  # Last 50 log lines
+            regrade_queued=regrade_queued,
+            invalid_usns=invalid,
+            breaker=breaker,
+            stage_timings=stage_timings,
+            profile=profile,
+            coalesced_usns=list(claim.attached),
+            **scheduling
         )
         
     except Exception as e:
         print(f"RV SCRAPER ERROR: {str(e)}")
+        service_metrics.inc('scraper_scrape_errors_total', endpoint='rv')
         return ScrapeResponse(
             success=False,
             total=len(validated_request.usns),
@@ -428,8 +727,48 @@ async def scrape_rv_results(request: Request):
             failed_usns=validated_request.usns,
             time_taken=time.time() - start_time,
             message=f"RV scraper failed: {str(e)}",
-            logs=[str(e)]
+            logs=[str(e)],
+            **(job_fields(job) or scheduling)
         )
+    finally:
+        claim.release()
+        if job:
+            job_scheduler.finish(job)
+
+@app.get("/grades/status")
+async def grade_status():
+    """State of the regrade queue per semester (pending / running / last run)"""
+    return {
+        "triggers": await grades_maintained_by_triggers(),
+        **regrade_queue.status()
+    }
+
+@app.get("/jobs")
+async def job_status():
+    """Global worker budget (running/queued jobs) and coalesced in-flight USNs"""
+    return {
+        **job_scheduler.status(),
+        "coalescing": coalescer.status()
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics: scrape counters, stage/regrade histograms, live job and Chrome gauges"""
+    jobs = job_scheduler.status()
+    coalescing = coalescer.status()
+    regrades = regrade_queue.status()
+    gauges = {
+        "scraper_jobs_running": [({"kind": kind}, sum(1 for job in jobs['running'] if job['kind'] == kind))
+                                 for kind in ('vtu', 'autonomous', 'rv')],
+        "scraper_jobs_queued": len(jobs['queued']),
+        "scraper_slots_in_use": jobs['slots_in_use'],
+        "scraper_slots_total": jobs['total_slots'],
+        "scraper_usns_in_flight": sum(coalescing['usns_in_flight'].values()),
+        "scraper_regrade_pending_usns": sum(state['pending_usns'] + state['running_usns']
+                                            for state in regrades['semesters'].values()),
+        "scraper_chrome_instances": count_chrome_instances(),
+    }
+    return PlainTextResponse(service_metrics.render(gauges), media_type=CONTENT_TYPE)
 
 @app.get("/health")
 async def health_check():
@@ -0,0 +1,199 @@
+"""
+PROMETHEUS METRICS
+==================
+Counters and histograms for the /metrics endpoint, in the Prometheus text
+exposition format (no client library needed).
+
+The scrapers run as subprocesses, so their numbers reach the service through
+their output: the final OK/FAIL/INVALID lines and the STAGE_STATS line
+(per-stage histogram buckets, see scripts/stage_timings.py). Those are added
+up here after every scrape. Live values (jobs, slots, Chrome processes) are
+passed to render() as gauges when /metrics is scraped.
+
+Exposed:
+- scraper_scrapes_total, scraper_usns_total{outcome}   -> rate() = USNs/sec
+- scraper_scrape_errors_total
+- scraper_scrape_duration_seconds                      -> per request
+- scraper_captcha_attempts_total                        -> / usns ok = attempts per success
+- scraper_stage_duration_seconds{stage}                 -> OCR, db_lock_wait, db_connect, ...
+- scraper_regrade_duration_seconds, scraper_regrades_total{result}
+"""
+
+import math
+import os
+import threading
+
+from stage_timings import BUCKETS, STAGE_CAPTCHA_CAPTURE
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Regrades and whole scrapes take longer than a single stage
+DURATION_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+# name -> (type, help)
+METRICS = {
+    'scraper_scrapes_total': ('counter', 'Scrape requests handled'),
+    'scraper_usns_total': ('counter', 'USNs per request, by outcome (ok / failed / invalid, or coalesced '
+                                      'when a concurrent request scraped them)'),
+    'scraper_scrape_errors_total': ('counter', 'Scrape requests that failed as a whole'),
+    'scraper_scrape_duration_seconds': ('histogram', 'Wall time of a scrape request'),
+    'scraper_captcha_attempts_total': ('counter', 'Scrape attempts that captured a captcha for OCR'),
+    'scraper_stage_duration_seconds': ('histogram', 'Time per scrape attempt spent in each stage'),
+    'scraper_regrades_total': ('counter', 'Post-scrape grade recalculations, by result'),
+    'scraper_regrade_duration_seconds': ('histogram', 'Duration of a post-scrape grade recalculation'),
+    'scraper_jobs_running': ('gauge', 'Scrape jobs holding worker slots'),
+    'scraper_jobs_queued': ('gauge', 'Scrape jobs waiting for worker slots'),
+    'scraper_slots_in_use': ('gauge', 'Worker slots allocated to running jobs'),
+    'scraper_slots_total': ('gauge', 'Global worker slot budget'),
+    'scraper_usns_in_flight': ('gauge', 'USNs currently being scraped'),
+    'scraper_regrade_pending_usns': ('gauge', 'Students waiting for or in a grade recalculation'),
+    'scraper_chrome_instances': ('gauge', 'Chrome browser processes running'),
+}
+
+
+def format_value(value):
+    """Number in exposition format"""
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(labels):
+    """{k="v",...} or empty"""
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def count_chrome_instances():
+    """Chrome/Chromium browser processes (not their renderer/GPU helpers); None without /proc"""
+    if not os.path.isdir('/proc'):
+        return None
+    count = 0
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                args = f.read().split(b'\0')
+        except OSError:
+            continue
+        name = os.path.basename(args[0]).decode(errors='replace') if args[0] else ''
+        if name.startswith(('chrome', 'chromium')) and name != 'chromedriver' \
+                and not any(arg.startswith(b'--type=') for arg in args):
+            count += 1
+    return count
+
+
+class ServiceMetrics:
+    """
+    Thread-safe counters and histograms of the scraper service
+
+    Histograms keep cumulative bucket counts like Prometheus does, so the
+    pre-bucketed stage histograms of each scraper run can simply be added.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}      # (name, labels) -> value
+        self._histograms = {}    # (name, labels) -> {"bounds", "buckets", "sum", "count"}
+
+    def inc(self, name, value=1, **labels):
+        """Add value to a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _histogram(self, name, bounds, labels):
+        """Histogram state (call with the lock held)"""
+        key = (name, tuple(sorted(labels.items())))
+        if key not in self._histograms:
+            self._histograms[key] = {"bounds": bounds, "buckets": [0] * len(bounds), "sum": 0.0, "count": 0}
+        return self._histograms[key]
+
+    def observe(self, name, seconds, bounds=DURATION_BUCKETS, **labels):
+        """Add one observation to a histogram"""
+        with self._lock:
+            histogram = self._histogram(name, bounds, labels)
+            for index, bound in enumerate(bounds):
+                if seconds <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    def add_buckets(self, name, buckets, total, count, bounds=BUCKETS, **labels):
+        """Add pre-bucketed observations (cumulative counts per bound) to a histogram"""
+        if len(buckets) != len(bounds):
+            return
+        with self._lock:
+            histogram = self._histogram(name, bounds, labels)
+            histogram['buckets'] = [a + b for a, b in zip(histogram['buckets'], buckets)]
+            histogram['sum'] += total
+            histogram['count'] += count
+
+    def record_scrape(self, endpoint, succeeded, failed, invalid, coalesced, duration, stage_timings):
+        """
+        Add one finished scrape request
+
+        succeeded/failed/invalid count the USNs this request scraped itself,
+        coalesced those it left to a concurrent request; stage_timings is the
+        STAGE_STATS summary (or None)
+        """
+        self.inc('scraper_scrapes_total', endpoint=endpoint)
+        for outcome, count in (('ok', succeeded), ('failed', failed), ('invalid', invalid),
+                               ('coalesced', coalesced)):
+            if count:
+                self.inc('scraper_usns_total', count, endpoint=endpoint, outcome=outcome)
+        self.observe('scraper_scrape_duration_seconds', duration, endpoint=endpoint)
+
+        for stage, stats in (stage_timings or {}).items():
+            if 'buckets' not in stats:
+                continue
+            self.add_buckets('scraper_stage_duration_seconds', stats['buckets'], stats['total'],
+                             stats['count'], endpoint=endpoint, stage=stage)
+            if stage == STAGE_CAPTCHA_CAPTURE:
+                self.inc('scraper_captcha_attempts_total', stats['count'], endpoint=endpoint)
+
+    def record_regrade(self, duration, success):
+        """Add one grade recalculation run"""
+        self.inc('scraper_regrades_total', result='success' if success else 'failed')
+        self.observe('scraper_regrade_duration_seconds', duration)
+
+    def render(self, gauges=None):
+        """
+        Everything in exposition format
+
+        gauges: {name: value or [(labels dict, value), ...]} read at scrape time
+        """
+        series = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                series.setdefault(name, []).append(f"{name}{format_labels(labels)} {format_value(value)}")
+            for (name, labels), histogram in self._histograms.items():
+                lines = series.setdefault(name, [])
+                for bound, count in zip(histogram['bounds'], histogram['buckets']):
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', format_value(bound)),))} {count}")
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(round(histogram['sum'], 6))}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram['count']}")
+
+        for name, value in (gauges or {}).items():
+            if value is None:
+                continue
+            samples = value if isinstance(value, list) else [({}, value)]
+            series[name] = [f"{name}{format_labels(tuple(sorted(labels.items())))} {format_value(v)}"
+                            for labels, v in samples]
+
+        output = []
+        for name in [n for n in METRICS if n in series] + sorted(n for n in series if n not in METRICS):
+            metric_type, help_text = METRICS.get(name, ('untyped', name))
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {metric_type}")
+            output.extend(series[name])
+        return '\n'.join(output) + '\n'
@@ -0,0 +1,164 @@
+"""
+DEBOUNCED REGRADE QUEUE
+=======================
+In-process queue for "regrade (semester, usns)" jobs.
+
+Scrape endpoints used to run a grade calculation right after every scrape,
+so several scrapes of the same semester finishing close together started
+overlapping calculations on the same tables. Instead they now submit a job:
+
+- Jobs for the same semester are merged (union of USNs)
+- A run starts after a short quiet period (debounce), but never later than
+  max_wait after the first pending job, so a steady stream of scrapes can't
+  postpone grading forever
+- Only one regrade per semester runs at a time - jobs arriving during a run
+  are merged into the next one, scheduled when the current run finishes
+- Different semesters run independently
+"""
+
+import threading
+import time
+import traceback
+
+DEFAULT_DEBOUNCE_SECONDS = 5.0
+DEFAULT_MAX_WAIT_SECONDS = 30.0
+
+
+class RegradeQueue:
+    """
+    Debounced, per-semester regrade scheduler
+
+    Args:
+        run_regrade: Callable(semester, usns) -> result dict with at least
+                     "success" (and optionally "error", "timings")
+        debounce_seconds: Quiet period after the last submit before running
+        max_wait_seconds: Upper bound on how long a pending job may wait
+    """
+
+    def __init__(self, run_regrade, debounce_seconds=DEFAULT_DEBOUNCE_SECONDS,
+                 max_wait_seconds=DEFAULT_MAX_WAIT_SECONDS):
+        self.run_regrade = run_regrade
+        self.debounce_seconds = debounce_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()
+        self._semesters = {}
+
+    def _state(self, semester):
+        """Per-semester bookkeeping (call with the lock held)"""
+        if semester not in self._semesters:
+            self._semesters[semester] = {
+                "pending": set(),
+                "first_pending_at": None,
+                "timer": None,
+                "running": False,
+                "running_usns": 0,
+                "runs": 0,
+                "merged_jobs": 0,
+                "last_run": None,
+            }
+        return self._semesters[semester]
+
+    def submit(self, semester, usns):
+        """
+        Queue a regrade of usns in semester
+
+        Returns:
+            Number of USNs now pending for the semester
+        """
+        with self._lock:
+            state = self._state(semester)
+            if state['pending']:
+                state['merged_jobs'] += 1
+            else:
+                state['first_pending_at'] = time.time()
+            state['pending'].update(usns)
+
+            # A running regrade reschedules itself when it finishes
+            if not state['running']:
+                self._schedule(semester, state)
+
+            return len(state['pending'])
+
+    def _schedule(self, semester, state):
+        """(Re)start the debounce timer (call with the lock held)"""
+        if state['timer']:
+            state['timer'].cancel()
+
+        waited = time.time() - state['first_pending_at']
+        delay = max(0.0, min(self.debounce_seconds, self.max_wait_seconds - waited))
+
+        timer = threading.Timer(delay, self._run, args=(semester,))
+        timer.daemon = True
+        state['timer'] = timer
+        timer.start()
+
+    def _run(self, semester):
+        """Timer callback - run one regrade with every USN pending for the semester"""
+        with self._lock:
+            state = self._state(semester)
+            if state['running'] or not state['pending']:
+                return
+            usns = sorted(state['pending'])
+            state['pending'] = set()
+            state['first_pending_at'] = None
+            state['timer'] = None
+            state['running'] = True
+            state['running_usns'] = len(usns)
+
+        print(f"REGRADE START - Semester {semester} - {len(usns)} students")
+        started_at = time.time()
+        try:
+            result = self.run_regrade(semester, usns)
+        except Exception as e:
+            traceback.print_exc()
+            result = {"success": False, "error": str(e)}
+        finished_at = time.time()
+
+        if result.get('success'):
+            print(f"REGRADE DONE - Semester {semester} - {finished_at - started_at:.2f}s")
+        else:
+            print(f"REGRADE FAILED - Semester {semester} - {result.get('error', 'Unknown error')}")
+
+        with self._lock:
+            state['running'] = False
+            state['running_usns'] = 0
+            state['runs'] += 1
+            state['last_run'] = {
+                "success": bool(result.get('success')),
+                "students": len(usns),
+                "started_at": started_at,
+                "finished_at": finished_at,
+                "duration": round(finished_at - started_at, 3),
+                "timings": result.get('timings', {}),
+                "error": result.get('error'),
+            }
+            # Jobs that arrived during the run
+            if state['pending']:
+                self._schedule(semester, state)
+
+    def status(self):
+        """Snapshot of every semester the queue has seen"""
+        now = time.time()
+        with self._lock:
+            semesters = {}
+            for semester, state in sorted(self._semesters.items()):
+                if state['running']:
+                    current = "running"
+                elif state['pending']:
+                    current = "pending"
+                else:
+                    current = "idle"
+                semesters[semester] = {
+                    "state": current,
+                    "pending_usns": len(state['pending']),
+                    "waiting_seconds": round(now - state['first_pending_at'], 1) if state['first_pending_at'] else 0,
+                    "running_usns": state['running_usns'],
+                    "runs": state['runs'],
+                    "merged_jobs": state['merged_jobs'],
+                    "last_run": state['last_run'],
+                }
+            return {
+                "debounce_seconds": self.debounce_seconds,
+                "max_wait_seconds": self.max_wait_seconds,
+                "semesters": semesters,
+            }
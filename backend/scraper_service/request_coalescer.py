@@ -0,0 +1,178 @@
+"""
+IN-FLIGHT REQUEST COALESCING
+============================
+Deduplicates scrape work across concurrent requests.
+
+When the Node backend retried a timed-out /scrape/vtu call, or two users
+started the same semester, the second request launched another full scrape
+of the same USNs against the same URL while the first was still running.
+Now:
+
+- Every USN being scraped is registered under (endpoint, url, semester, usn)
+- A new request only scrapes the USNs nobody is working on yet; for the
+  rest it attaches to the running job and waits for that job's outcome
+- Requests with an Idempotency-Key header are answered once: a repeat with
+  the same key waits for (or replays) the first response instead of starting
+  again. Keys are kept for IDEMPOTENCY_TTL_SECONDS after the response; a
+  request that failed frees its key so it can be retried
+
+Everything runs on the FastAPI event loop, so there is no locking.
+"""
+
+import asyncio
+import time
+
+OUTCOME_OK = 'ok'
+OUTCOME_FAILED = 'failed'
+OUTCOME_INVALID = 'invalid'
+
+DEFAULT_IDEMPOTENCY_TTL_SECONDS = 600
+
+
+class IdempotencyConflict(Exception):
+    """An Idempotency-Key was reused for a different request"""
+
+
+class Claim:
+    """
+    One request's share of the in-flight registry
+
+    owned: USNs this request scrapes itself
+    attached: USNs already in flight elsewhere -> future of their outcome
+    """
+
+    def __init__(self, coalescer, scope, owned, attached):
+        self._coalescer = coalescer
+        self._scope = scope
+        self.owned = owned
+        self.attached = attached
+
+    def resolve(self, succeeded, invalid):
+        """Publish the outcome of every owned USN to attached requests"""
+        succeeded = set(succeeded)
+        invalid = set(invalid)
+        for usn in self.owned:
+            if usn in succeeded:
+                outcome = OUTCOME_OK
+            elif usn in invalid:
+                outcome = OUTCOME_INVALID
+            else:
+                outcome = OUTCOME_FAILED
+            self._coalescer._settle(self._scope + (usn,), outcome)
+
+    def release(self):
+        """Owned USNs without an outcome (scraper crashed) count as failed"""
+        for usn in self.owned:
+            self._coalescer._settle(self._scope + (usn,), OUTCOME_FAILED)
+
+    async def wait_attached(self):
+        """{usn: outcome} for the attached USNs, once their jobs finish"""
+        outcomes = {}
+        for usn, future in self.attached.items():
+            outcomes[usn] = await asyncio.shield(future)
+        return outcomes
+
+
+class RequestCoalescer:
+    """
+    Registry of USNs in flight plus responses by Idempotency-Key
+
+    Args:
+        idempotency_ttl_seconds: How long a finished response is replayed
+    """
+
+    def __init__(self, idempotency_ttl_seconds=DEFAULT_IDEMPOTENCY_TTL_SECONDS):
+        self.idempotency_ttl_seconds = idempotency_ttl_seconds
+        self._in_flight = {}     # (endpoint, url, semester, usn) -> future of the outcome
+        self._responses = {}     # (endpoint, key) -> {"task", "fingerprint", "finished_at"}
+        self._attached = 0
+        self._replayed = 0
+
+    def claim(self, endpoint, url, semester, usns):
+        """
+        Register usns for this request
+
+        Returns:
+            Claim - scrape claim.owned, then resolve() and release() it
+        """
+        loop = asyncio.get_running_loop()
+        scope = (endpoint, url, semester)
+        owned = []
+        attached = {}
+        for usn in dict.fromkeys(usns):
+            future = self._in_flight.get(scope + (usn,))
+            if future is not None:
+                attached[usn] = future
+            else:
+                self._in_flight[scope + (usn,)] = loop.create_future()
+                owned.append(usn)
+
+        if attached:
+            self._attached += len(attached)
+            print(f"COALESCE {endpoint} - {len(attached)} USNs already in flight, "
+                  f"attached to the running job; scraping {len(owned)} new")
+        return Claim(self, scope, owned, attached)
+
+    def _settle(self, key, outcome):
+        """Set an in-flight USN's outcome and unregister it"""
+        future = self._in_flight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(outcome)
+
+    async def idempotent(self, endpoint, key, fingerprint, handler):
+        """
+        Run handler() once per (endpoint, key)
+
+        Returns:
+            (response, replayed) - replayed is True when an earlier request's
+            response is returned
+
+        Raises:
+            IdempotencyConflict: key was used for a different request body
+        """
+        self._expire()
+        entry = self._responses.get((endpoint, key))
+        if entry is not None:
+            if entry['fingerprint'] != fingerprint:
+                raise IdempotencyConflict(f"Idempotency-Key {key} was used for a different request")
+            self._replayed += 1
+            print(f"IDEMPOTENT {endpoint} - key {key} seen before, returning its response")
+            return await asyncio.shield(entry['task']), True
+
+        # The scrape keeps running if this client disconnects, so its retry gets the result
+        task = asyncio.ensure_future(handler())
+        entry = {"task": task, "fingerprint": fingerprint, "finished_at": None}
+        self._responses[(endpoint, key)] = entry
+        task.add_done_callback(lambda done: self._finished(endpoint, key, entry, done))
+        return await asyncio.shield(task), False
+
+    def _finished(self, endpoint, key, entry, task):
+        """Keep successful responses for replay, forget failed ones"""
+        failed = task.cancelled() or task.exception() is not None \
+            or getattr(task.result(), 'success', True) is False
+        if failed:
+            if self._responses.get((endpoint, key)) is entry:
+                del self._responses[(endpoint, key)]
+        else:
+            entry['finished_at'] = time.time()
+
+    def _expire(self):
+        """Drop replayable responses older than the TTL"""
+        cutoff = time.time() - self.idempotency_ttl_seconds
+        for response_key, entry in list(self._responses.items()):
+            if entry['finished_at'] is not None and entry['finished_at'] < cutoff:
+                del self._responses[response_key]
+
+    def status(self):
+        """Snapshot for the /jobs endpoint"""
+        self._expire()
+        scopes = {}
+        for endpoint, url, semester, _ in self._in_flight:
+            scope = f"{endpoint} {url} sem {semester}" if semester is not None else f"{endpoint} {url}"
+            scopes[scope] = scopes.get(scope, 0) + 1
+        return {
+            "usns_in_flight": scopes,
+            "attached_usns": self._attached,
+            "idempotency_keys": len(self._responses),
+            "idempotent_replays": self._replayed,
+        }
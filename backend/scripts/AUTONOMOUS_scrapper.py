@@ -19,6 +19,10 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
 
+from stage_timings import (StageTimings, STAGE_DRIVER_ACQUIRE, STAGE_PAGE_LOAD, STAGE_SUBMIT_WAIT,
+                           STAGE_PARSE, STAGE_DRIVER_QUIT)
+from run_profiler import add_profile_arguments, profile_from_args
+
 # --- SELENIUM-BASED SCRAPER LOGIC (FINAL VERSION) ---
 
 class BITResultsScraper:
@@ -27,6 +31,7 @@ class BITResultsScraper:
         self.driver = None
         self.gui_logger = gui_logger
         self.base_url = "https://ioncudos.in/bit_online_results/"
+        self.stage_timer = StageTimings()
 
     def log(self, message):
         if self.gui_logger:
@@ -43,8 +48,9 @@ class BITResultsScraper:
             options.add_experimental_option("excludeSwitches", ["enable-automation"])
             options.add_experimental_option('useAutomationExtension', False)
             
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=options)
+            with self.stage_timer.stage(STAGE_DRIVER_ACQUIRE):
+                service = Service(ChromeDriverManager().install())
+                self.driver = webdriver.Chrome(service=service, options=options)
             
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             self.log("✅ Chrome browser initialized successfully.")
@@ -56,7 +62,8 @@ class BITResultsScraper:
     def quit_driver(self):
         if self.driver:
             self.log("Closing Chrome browser.")
-            self.driver.quit()
+            with self.stage_timer.stage(STAGE_DRIVER_QUIT):
+                self.driver.quit()
             self.driver = None
             
     def format_date(self, date_input) -> str:
@@ -72,40 +79,44 @@ class BITResultsScraper:
         else: raise ValueError(f"Unsupported date format: {type(date_input)}")
 
     def get_result_data(self, usn: str, dob: str) -> Optional[Dict]:
+        self.stage_timer.begin_attempt()
         try:
             formatted_dob = self.format_date(dob)
             
             self.log(f"Navigating to {self.base_url} to ensure a clean state...")
-            self.driver.get(self.base_url)
+            with self.stage_timer.stage(STAGE_PAGE_LOAD):
+                self.driver.get(self.base_url)
 
-            usn_input = WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.ID, "usn")))
+                usn_input = WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.ID, "usn")))
             dob_input = self.driver.find_element(By.ID, "dob")
             
-            usn_input.clear()
-            usn_input.send_keys(usn)
+            with self.stage_timer.stage(STAGE_SUBMIT_WAIT):
+                usn_input.clear()
+                usn_input.send_keys(usn)
 
-            self.log(f"Setting DOB to {formatted_dob} using JavaScript...")
-            self.driver.execute_script("arguments[0].value = arguments[1];", dob_input, formatted_dob)
-            
-            self.log("Triggering 'change' event on DOB field...")
-            self.driver.execute_script("var e = new Event('change', {bubbles: true}); arguments[0].dispatchEvent(e);", dob_input)
-            time.sleep(0.5)
+                self.log(f"Setting DOB to {formatted_dob} using JavaScript...")
+                self.driver.execute_script("arguments[0].value = arguments[1];", dob_input, formatted_dob)
+                
+                self.log("Triggering 'change' event on DOB field...")
+                self.driver.execute_script("var e = new Event('change', {bubbles: true}); arguments[0].dispatchEvent(e);", dob_input)
+                time.sleep(0.5)
 
-            self.log("Forcibly enabling the submit button using JavaScript...")
-            submit_button = self.driver.find_element(By.ID, "result_submit")
-            self.driver.execute_script("arguments[0].removeAttribute('disabled');", submit_button)
-            
-            self.log("Button is now enabled. Clicking submit.")
-            submit_button.click()
-            
-            self.log("Waiting for results to load...")
-            WebDriverWait(self.driver, 10).until(
-                EC.visibility_of_element_located((By.ID, "stud_name"))
-            )
+                self.log("Forcibly enabling the submit button using JavaScript...")
+                submit_button = self.driver.find_element(By.ID, "result_submit")
+                self.driver.execute_script("arguments[0].removeAttribute('disabled');", submit_button)
+                
+                self.log("Button is now enabled. Clicking submit.")
+                submit_button.click()
+                
+                self.log("Waiting for results to load...")
+                WebDriverWait(self.driver, 10).until(
+                    EC.visibility_of_element_located((By.ID, "stud_name"))
+                )
             
             self.log("Results loaded. Parsing page content...")
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            return self.parse_html_result(soup, usn)
+            with self.stage_timer.stage(STAGE_PARSE):
+                soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+                return self.parse_html_result(soup, usn)
 
         except TimeoutException as e:
             self.log(f"Page timed out. Likely invalid USN/DOB or page didn't load. Error: {e.msg}")
@@ -113,6 +124,8 @@ class BITResultsScraper:
         except Exception as e:
             self.log(f"An unexpected error occurred: {e}")
             return None
+        finally:
+            self.stage_timer.end_attempt()
 
     def parse_html_result(self, soup: BeautifulSoup, usn: str) -> Optional[Dict]:
         """Parses all student details, including the full 10-column subject table."""
@@ -432,8 +445,10 @@ if __name__ == "__main__":
     parser.add_argument('--url', type=str, help='Results URL', required=False)
     parser.add_argument('--workers', type=int, default=1, help='Number of parallel workers (not used yet)')
     parser.add_argument('--students', type=str, help='JSON string with student list [{usn, dob}, ...]', required=False)
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
+    profile_from_args(args, 'autonomous_scraper')
     
     # If CLI args provided, use CLI mode
     if args.url and args.students:
@@ -500,6 +515,7 @@ if __name__ == "__main__":
             print("="*70)
             print(f"✅ Success: {success_count}")
             print(f"❌ Failed: {failed_count}")
+            scraper.stage_timer.report("STAGE TIMINGS - AUTONOMOUS")
             print("="*70)
             
         except json.JSONDecodeError as e:
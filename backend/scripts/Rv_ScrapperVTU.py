@@ -42,12 +42,22 @@ import pytesseract
 from PIL import Image
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoAlertPresentException
+from selenium.common.exceptions import NoAlertPresentException, WebDriverException
 import time
 from bs4 import BeautifulSoup
 from datetime import datetime
 from db_config import get_db_connection, close_connection
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from scrape_scheduler import RetryScheduler, PermanentFailure, SlotFileLimit, DEFAULT_MAX_ATTEMPTS
+from scrape_state import ScrapeJournal, InvalidUsnCache, DEFAULT_JOURNAL_PATH, skip_completed, skip_invalid
+from adaptive_concurrency import (AdaptiveConcurrency, DEFAULT_MIN_WORKERS, DEFAULT_MAX_WORKERS,
+                                  OUTCOME_OK, OUTCOME_INVALID, OUTCOME_CAPTCHA, OUTCOME_ALERT,
+                                  OUTCOME_TIMEOUT, OUTCOME_ERROR)
+from circuit_breaker import CircuitBreaker
+from grade_triggers import defer_summary_refresh, refresh_summaries
+from stage_timings import (StageTimings, STAGE_DRIVER_ACQUIRE, STAGE_PAGE_LOAD, STAGE_CAPTCHA_CAPTURE,
+                           STAGE_MASKING, STAGE_OCR, STAGE_SUBMIT_WAIT, STAGE_PARSE, STAGE_DB_LOCK_WAIT,
+                           STAGE_DB_CONNECT, STAGE_DB_READ, STAGE_DB_WRITE, STAGE_COMMIT, STAGE_DRIVER_QUIT)
+from run_profiler import add_profile_arguments, profile_from_args
 import threading
 import re
 
@@ -63,31 +73,52 @@ if not sys.warnoptions:
 thread_local = threading.local()
 db_lock = threading.Lock()
 
+# Persistent cache of USNs with no RV results (per URL)
+try:
+    invalid_cache = InvalidUsnCache()
+except Exception as e:
+    print(f"WARN Invalid-USN cache disabled: {e}")
+    invalid_cache = None
+
+# Set by --adaptive: AIMD controller that picks the worker count at runtime
+concurrency_controller = None
+
+# Set by --slot-file: the FastAPI service's share of its global worker budget
+slot_limit = None
+
+# Shared by all workers: pauses requests while the results portal is down
+portal_breaker = CircuitBreaker()
+
+# Per-stage latency histograms of every scrape attempt in this run
+stage_timer = StageTimings()
+
 # ==================== CAPTCHA PROCESSING (REUSED FROM ULTIMATE_SCRAPER) ====================
 
 def mask_captcha(image_path):
     """Processes the CAPTCHA image by applying masking for improved text extraction."""
-    try:
-        image = cv2.imread(image_path)
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        lower = np.array([-10, -10, 62])
-        upper = np.array([10, 10, 142])
-        mask = cv2.inRange(hsv_image, lower, upper)
-        masked_image = cv2.bitwise_and(image, image, mask=mask)
-        thread_id = threading.get_ident()
-        processed_image_path = f"masked_captcha_rv_{thread_id}.png"
-        cv2.imwrite(processed_image_path, masked_image)
-        return processed_image_path
-    except Exception as e:
-        return None
+    with stage_timer.stage(STAGE_MASKING):
+        try:
+            image = cv2.imread(image_path)
+            hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            lower = np.array([-10, -10, 62])
+            upper = np.array([10, 10, 142])
+            mask = cv2.inRange(hsv_image, lower, upper)
+            masked_image = cv2.bitwise_and(image, image, mask=mask)
+            thread_id = threading.get_ident()
+            processed_image_path = f"masked_captcha_rv_{thread_id}.png"
+            cv2.imwrite(processed_image_path, masked_image)
+            return processed_image_path
+        except Exception as e:
+            return None
 
 def capture_and_process_captcha(driver):
     """Captures the CAPTCHA image and processes it with masking."""
     try:
-        captcha_element = driver.find_element(By.XPATH, '//*[@id="raj"]/div[2]/div[2]/img')
-        thread_id = threading.get_ident()
-        captcha_image_path = f"captcha_rv_{thread_id}.png"
-        captcha_element.screenshot(captcha_image_path)
+        with stage_timer.stage(STAGE_CAPTCHA_CAPTURE):
+            captcha_element = driver.find_element(By.XPATH, '//*[@id="raj"]/div[2]/div[2]/img')
+            thread_id = threading.get_ident()
+            captcha_image_path = f"captcha_rv_{thread_id}.png"
+            captcha_element.screenshot(captcha_image_path)
         return mask_captcha(captcha_image_path)
     except Exception as e:
         return None
@@ -95,9 +126,10 @@ def capture_and_process_captcha(driver):
 def refresh_and_capture_captcha(driver):
     """Refreshes the CAPTCHA by clicking the refresh button, then captures and processes it."""
     try:
-        refresh_button = driver.find_element(By.XPATH, '//*[@id="raj"]/div[2]/div[2]/p/a')
-        refresh_button.click()
-        time.sleep(1.5)
+        with stage_timer.stage(STAGE_CAPTCHA_CAPTURE):
+            refresh_button = driver.find_element(By.XPATH, '//*[@id="raj"]/div[2]/div[2]/p/a')
+            refresh_button.click()
+            time.sleep(1.5)
         return capture_and_process_captcha(driver)
     except Exception as e:
         return capture_and_process_captcha(driver)
@@ -187,7 +219,7 @@ def get_latest_attempt_number(usn, subject_code, semester):
 
 # ==================== MAIN RV SCRAPING FUNCTION ====================
 
-def get_vtu_rv_results(usn, url):
+def get_vtu_rv_results(usn, url, max_attempts=1):
     """
     Scrapes VTU REVALUATION results for a single USN.
     
@@ -202,6 +234,9 @@ def get_vtu_rv_results(usn, url):
     - Final Marks (internal + final external)
     - Final Result
     
+    One browser try per call by default: RetryScheduler owns the retries,
+    the backoff between them and the attempt budget (--max-attempts).
+    
     Returns True if successful, False otherwise.
     """
     
@@ -214,47 +249,65 @@ def get_vtu_rv_results(usn, url):
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--log-level=3")
     
-    max_attempts = 5
-    
     for attempt in range(max_attempts):
         driver = None
+        ticket = portal_breaker.acquire()
+        if not ticket:
+            print(f"WARN {usn}: Results portal unavailable (circuit open) - giving up for now")
+            break
+        attempt_start = time.time()
+        stage_timer.begin_attempt()
+        outcome = OUTCOME_ERROR
+        # Only a WebDriverException while this is set (page load, submit) counts
+        # against the portal - Chrome failing to start or a local driver error doesn't
+        contacting_portal = False
         try:
-            driver = webdriver.Chrome(options=options)
-            driver.get(url)
-            time.sleep(2)
+            with stage_timer.stage(STAGE_DRIVER_ACQUIRE):
+                driver = webdriver.Chrome(options=options)
+            with stage_timer.stage(STAGE_PAGE_LOAD):
+                contacting_portal = True
+                driver.get(url)
+                time.sleep(2)
+                contacting_portal = False
             
             masked_image_path = refresh_and_capture_captcha(driver)
             if not masked_image_path:
+                outcome = OUTCOME_CAPTCHA
                 continue
             
-            img = Image.open(masked_image_path)
-            ocr_configs = [
-                r'--psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789',
-                r'--psm 8 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            ]
-            
-            captcha_text = ''
-            for cfg in ocr_configs:
-                try:
-                    captcha_text = pytesseract.image_to_string(img, config=cfg).strip()
-                    captcha_text = ''.join(c for c in captcha_text if c.isalnum())
-                    if len(captcha_text) >= 6:
-                        break
-                except Exception:
-                    continue
+            with stage_timer.stage(STAGE_OCR):
+                img = Image.open(masked_image_path)
+                ocr_configs = [
+                    r'--psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789',
+                    r'--psm 8 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
+                ]
+                
+                captcha_text = ''
+                for cfg in ocr_configs:
+                    try:
+                        captcha_text = pytesseract.image_to_string(img, config=cfg).strip()
+                        captcha_text = ''.join(c for c in captcha_text if c.isalnum())
+                        if len(captcha_text) >= 6:
+                            break
+                    except Exception:
+                        continue
             
             if not captcha_text or len(captcha_text) < 6:
+                outcome = OUTCOME_CAPTCHA
                 continue
             
             # Fill form
-            usn_input_field = driver.find_element(By.NAME, "lns")
-            captcha_input_field = driver.find_element(By.NAME, "captchacode")
-            usn_input_field.clear()
-            captcha_input_field.clear()
-            usn_input_field.send_keys(usn)
-            captcha_input_field.send_keys(captcha_text)
-            driver.find_element(By.ID, "submit").click()
-            time.sleep(5)  # Increased wait time for page load
+            with stage_timer.stage(STAGE_SUBMIT_WAIT):
+                usn_input_field = driver.find_element(By.NAME, "lns")
+                captcha_input_field = driver.find_element(By.NAME, "captchacode")
+                usn_input_field.clear()
+                captcha_input_field.clear()
+                usn_input_field.send_keys(usn)
+                captcha_input_field.send_keys(captcha_text)
+                contacting_portal = True
+                driver.find_element(By.ID, "submit").click()
+                time.sleep(5)  # Increased wait time for page load
+                contacting_portal = False
             
             # Check for alert
             try:
@@ -264,43 +317,48 @@ def get_vtu_rv_results(usn, url):
                 
                 if "University Seat Number is not available or Invalid" in alert_text:
                     print(f"WARN {usn}: Invalid USN or no RV results")
-                    return False
+                    outcome = OUTCOME_INVALID
+                    mark_invalid_usn(url, usn)
+                    raise PermanentFailure(f"{usn}: invalid USN or no RV results")
                 elif "captcha" in alert_text.lower():
+                    outcome = OUTCOME_CAPTCHA
                     continue
                 else:
+                    outcome = OUTCOME_ALERT
                     continue
             except NoAlertPresentException:
                 pass
             
             # Parse with BeautifulSoup
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            
-            # Wait for results table to be present
-            try:
-                # Check if we got results by looking for the divTable class
-                result_tables = soup.find_all("div", attrs={"class": "divTable"})
-                if not result_tables:
-                    # Page loaded but no results - might be invalid CAPTCHA or no RV results
-                    print(f"WARN {usn}: No result tables found, retrying...")
+            with stage_timer.stage(STAGE_PARSE):
+                soup = BeautifulSoup(driver.page_source, "html.parser")
+                
+                # Wait for results table to be present
+                try:
+                    # Check if we got results by looking for the divTable class
+                    result_tables = soup.find_all("div", attrs={"class": "divTable"})
+                    if not result_tables:
+                        # Page loaded but no results - might be invalid CAPTCHA or no RV results
+                        print(f"WARN {usn}: No result tables found, retrying...")
+                        continue
+                except Exception as e:
+                    print(f"FAIL Could not find result tables: {e}")
                     continue
-            except Exception as e:
-                print(f"FAIL Could not find result tables: {e}")
-                continue
-            
-            try:
-                all_tds = soup.find_all("td")
-                if len(all_tds) < 4:
-                    print(f"WARN {usn}: Incomplete page load (only {len(all_tds)} td elements), retrying...")
-                    time.sleep(2)
+                
+                try:
+                    all_tds = soup.find_all("td")
+                    if len(all_tds) < 4:
+                        print(f"WARN {usn}: Incomplete page load (only {len(all_tds)} td elements), retrying...")
+                        time.sleep(2)
+                        continue
+                        
+                    student_name = all_tds[3].text.lstrip(" : ")
+                    student_usn = all_tds[1].text.lstrip(" : ")
+                    print(f"OK Found RV results for: {student_name} ({student_usn})")
+                except (IndexError, AttributeError) as e:
+                    print(f"FAIL Could not extract student info (page may not be fully loaded): {e}")
+                    print(f"     Found {len(soup.find_all('td'))} td elements")
                     continue
-                    
-                student_name = all_tds[3].text.lstrip(" : ")
-                student_usn = all_tds[1].text.lstrip(" : ")
-                print(f"OK Found RV results for: {student_name} ({student_usn})")
-            except (IndexError, AttributeError) as e:
-                print(f"FAIL Could not extract student info (page may not be fully loaded): {e}")
-                print(f"     Found {len(soup.find_all('td'))} td elements")
-                continue
             
             # ==================== RV TABLE PARSING ====================
             # The RV table has a DIFFERENT structure than regular results
@@ -324,12 +382,18 @@ def get_vtu_rv_results(usn, url):
                         continue
                     
                     # Database operations with lock
+                    lock_requested = time.perf_counter()
                     with db_lock:
-                        connection = get_db_connection()
+                        stage_timer.add(STAGE_DB_LOCK_WAIT, time.perf_counter() - lock_requested)
+                        with stage_timer.stage(STAGE_DB_CONNECT):
+                            connection = get_db_connection()
                         if not connection:
                             return False
                         
                         cursor = connection.cursor()
+                        # Grade triggers installed: refresh each summary once after the commit, not per row
+                        deferred_summaries = defer_summary_refresh(cursor)
+                        written_semesters = set()
                         
                         for row in rows:
                             cells = row.find_all("div", attrs={"class": "divTableCell"})
@@ -393,8 +457,9 @@ def get_vtu_rv_results(usn, url):
                             LIMIT 1
                             """
                             
-                            cursor.execute(check_query, (student_usn, subject_code, detected_semester))
-                            existing_record = cursor.fetchone()
+                            with stage_timer.stage(STAGE_DB_READ):
+                                cursor.execute(check_query, (student_usn, subject_code, detected_semester))
+                                existing_record = cursor.fetchone()
                             
                             if existing_record:
                                 # Record exists - UPDATE with RV marks (don't change attempt_number)
@@ -438,8 +503,10 @@ def get_vtu_rv_results(usn, url):
                                 )
                                 
                                 try:
-                                    rows_affected = cursor.execute(update_query, data)
-                                    cursor.fetchall()  # Clear any unread results from UPDATE
+                                    with stage_timer.stage(STAGE_DB_WRITE):
+                                        rows_affected = cursor.execute(update_query, data)
+                                        written_semesters.add(detected_semester)
+                                        cursor.fetchall()  # Clear any unread results from UPDATE
                                     ext_change = f"{existing_external}->{final_external_marks}" if existing_external != final_external_marks else str(final_external_marks)
                                     total_change = f"{existing_total}->{total_marks}" if existing_total != total_marks else str(total_marks)
                                     status_changed = f"{existing_status}->{final_result}" if existing_status != final_result else final_result
@@ -449,10 +516,11 @@ def get_vtu_rv_results(usn, url):
                                     print(f"     Status: {status_changed}")
                                     
                                     # Verify the update
-                                    cursor.execute("SELECT total_marks, external_marks, internal_marks FROM results WHERE student_usn=%s AND subject_code=%s AND semester=%s", 
-                                                 (student_usn, subject_code, detected_semester))
-                                    verify = cursor.fetchone()
-                                    cursor.fetchall()  # Clear any remaining results
+                                    with stage_timer.stage(STAGE_DB_READ):
+                                        cursor.execute("SELECT total_marks, external_marks, internal_marks FROM results WHERE student_usn=%s AND subject_code=%s AND semester=%s", 
+                                                     (student_usn, subject_code, detected_semester))
+                                        verify = cursor.fetchone()
+                                        cursor.fetchall()  # Clear any remaining results
                                     if verify:
                                         print(f"     VERIFY: DB now shows Total={verify[0]}, External={verify[1]}, Internal={verify[2]}")
                                     
@@ -487,7 +555,9 @@ def get_vtu_rv_results(usn, url):
                                 )
                                 
                                 try:
-                                    cursor.execute(insert_query, data)
+                                    with stage_timer.stage(STAGE_DB_WRITE):
+                                        cursor.execute(insert_query, data)
+                                    written_semesters.add(detected_semester)
                                     print(f"  INSERT {subject_code}: Old={old_result}, RV={rv_result}, Final={final_result} (Attempt 1)")
                                     print(f"     Internal: {internal_marks} + External: {final_external_marks} = Total: {total_marks}")
                                 except Exception as e:
@@ -497,15 +567,17 @@ def get_vtu_rv_results(usn, url):
                                         try:
                                             # Infer scheme from subject code
                                             subject_scheme = subject_code[:2] if subject_code[:2] in ['21', '22'] else '21'
-                                            cursor.execute("""
-                                            INSERT INTO subjects
-                                            (subject_code, subject_name, semester, credits, scheme)
-                                            VALUES (%s, %s, %s, %s, %s)
-                                            ON DUPLICATE KEY UPDATE subject_name = VALUES(subject_name)
-                                            """, (subject_code, subject_name, detected_semester, 0, subject_scheme))
-                                            
-                                            # Retry insert
-                                            cursor.execute(insert_query, data)
+                                            with stage_timer.stage(STAGE_DB_WRITE):
+                                                cursor.execute("""
+                                                INSERT INTO subjects
+                                                (subject_code, subject_name, semester, credits, scheme)
+                                                VALUES (%s, %s, %s, %s, %s)
+                                                ON DUPLICATE KEY UPDATE subject_name = VALUES(subject_name)
+                                                """, (subject_code, subject_name, detected_semester, 0, subject_scheme))
+                                                
+                                                # Retry insert
+                                                cursor.execute(insert_query, data)
+                                            written_semesters.add(detected_semester)
                                             print(f"  OK Added subject and inserted RV result")
                                         except Exception as e2:
                                             print(f"  FAIL Still failed: {e2}")
@@ -513,16 +585,18 @@ def get_vtu_rv_results(usn, url):
                                         print(f"  FAIL Failed to insert RV result for {subject_code}: {e}")
                         
                         try:
-                            connection.commit()
+                            with stage_timer.stage(STAGE_COMMIT):
+                                connection.commit()
                             print(f"  DB: Transaction COMMITTED for {student_usn}")
                             
                             # Verify commit worked by re-querying one subject
                             if rows:
                                 first_subject = rows[0].find_all("div", attrs={"class": "divTableCell"})[0].text.strip()
-                                cursor.execute("SELECT total_marks FROM results WHERE student_usn=%s AND subject_code=%s LIMIT 1", 
-                                             (student_usn, first_subject))
-                                check = cursor.fetchone()
-                                cursor.fetchall()  # Clear any remaining results
+                                with stage_timer.stage(STAGE_DB_READ):
+                                    cursor.execute("SELECT total_marks FROM results WHERE student_usn=%s AND subject_code=%s LIMIT 1", 
+                                                 (student_usn, first_subject))
+                                    check = cursor.fetchone()
+                                    cursor.fetchall()  # Clear any remaining results
                                 if check:
                                     print(f"  DB: Commit verified - {first_subject} total_marks={check[0]}")
                         except Exception as commit_error:
@@ -532,9 +606,18 @@ def get_vtu_rv_results(usn, url):
                             close_connection(connection)
                             return False
                         
+                        if deferred_summaries and written_semesters:
+                            try:
+                                with stage_timer.stage(STAGE_DB_WRITE):
+                                    refresh_summaries(cursor, connection,
+                                                      [(student_usn, semester) for semester in written_semesters])
+                            except Exception as e:
+                                print(f"  WARN Summary refresh failed for {student_usn}: {e}")
+                        
                         cursor.close()
                         close_connection(connection)
                 
+                outcome = OUTCOME_OK
                 print(f"OK {usn} - RV results scraped and database updated")
                 return True
                 
@@ -542,13 +625,24 @@ def get_vtu_rv_results(usn, url):
                 print(f"FAIL Error parsing RV table for {usn}: {e}")
                 continue
         
+        except PermanentFailure:
+            raise
+        
+        except WebDriverException as e:
+            outcome = OUTCOME_TIMEOUT if contacting_portal else OUTCOME_ERROR
+            print(f"FAIL Error scraping {usn}: {e}")
+            continue
+        
         except Exception as e:
             print(f"FAIL Error scraping {usn}: {e}")
             continue
         
         finally:
+            record_attempt(ticket, time.time() - attempt_start, outcome)
             if driver:
-                driver.quit()
+                with stage_timer.stage(STAGE_DRIVER_QUIT):
+                    driver.quit()
+            stage_timer.end_attempt()
             
             # Cleanup temp files
             try:
@@ -558,69 +652,76 @@ def get_vtu_rv_results(usn, url):
             except:
                 pass
     
-    print(f"FAIL {usn} - Failed after {max_attempts} attempts")
+    print(f"FAIL {usn} - Failed after {max_attempts} browser attempt(s)")
     return False
 
+def record_attempt(ticket, latency, outcome):
+    """Feed one scrape attempt (admitted with ticket) to the circuit breaker and the adaptive concurrency controller"""
+    if outcome == OUTCOME_TIMEOUT:
+        portal_breaker.report(ticket, False)
+    elif outcome == OUTCOME_ERROR:
+        portal_breaker.report(ticket, None)
+    else:
+        portal_breaker.report(ticket, True)
+    if concurrency_controller:
+        concurrency_controller.record(latency, outcome)
+
+def mark_invalid_usn(url, usn):
+    """Cache an invalid-USN verdict so later runs of the same URL skip it"""
+    print(f"INVALID {usn}")
+    if invalid_cache:
+        try:
+            invalid_cache.add(url, usn)
+        except Exception as e:
+            print(f"WARN Could not cache invalid USN {usn}: {e}")
+
 # ==================== SMART RETRY LOGIC ====================
 
-def scrape_rv_with_smart_retry(usn_list, url, max_workers=5):
+def scrape_rv_with_smart_retry(usn_list, url, max_workers=5,
+                               max_attempts=DEFAULT_MAX_ATTEMPTS, deadline_seconds=None,
+                               on_result=None):
     """
-    Scrapes RV results with smart retry logic.
-    Stops when failed count stays constant for 2 consecutive attempts.
+    Scrapes RV results on the continuous retry scheduler (see scrape_scheduler.py).
+    Every failed USN is re-queued on its own with exponential backoff.
+    Stops when each USN has succeeded or used up max_attempts, or when
+    deadline_seconds has passed.
+    
+    USNs cached as invalid for this URL are skipped up front, and USNs VTU
+    reports as invalid are given up without retries.
+    
+    Returns (persistently failed USNs, invalid USNs).
     """
-    failed_usns = set(usn_list)
-    retry_attempt = 0
-    previous_failed_count = len(failed_usns)
-    same_count_streak = 0
-    
-    while failed_usns:
-        retry_attempt += 1
-        print(f"\n{'='*60}")
-        print(f"RETRY Retry Attempt #{retry_attempt}")
-        print(f"INFO USNs to retry: {len(failed_usns)}")
-        print(f"{'='*60}\n")
-        
-        current_failed = set()
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_usn = {
-                executor.submit(get_vtu_rv_results, usn, url): usn
-                for usn in failed_usns
-            }
-            
-            for future in as_completed(future_to_usn):
-                usn = future_to_usn[future]
-                try:
-                    if not future.result():
-                        current_failed.add(usn)
-                except Exception:
-                    current_failed.add(usn)
-        
-        current_failed_count = len(current_failed)
-        
-        # Check stopping criteria
-        if current_failed_count == previous_failed_count:
-            same_count_streak += 1
-            print(f"\nWARN Failed count unchanged: {current_failed_count} (Streak: {same_count_streak}/2)")
-            
-            if same_count_streak >= 2:
-                print(f"\nSTOP Stopping retry: Failed count constant for 2 attempts")
-                if current_failed:
-                    print(f"INFO Persistently failed USNs ({len(current_failed)}):")
-                    for usn in sorted(current_failed):
-                        print(f"  - {usn}")
-                break
-        else:
-            same_count_streak = 0
-        
-        previous_failed_count = current_failed_count
-        failed_usns = current_failed
-        
-        if not failed_usns:
-            print(f"\nOK All USNs scraped successfully!")
-            break
+    usn_list, cached_invalid = skip_invalid(invalid_cache, url, usn_list)
+    
+    scheduler = RetryScheduler(
+        lambda usn: get_vtu_rv_results(usn, url),
+        workers=max_workers,
+        max_attempts=max_attempts,
+        deadline_seconds=deadline_seconds,
+        on_result=on_result,
+        concurrency=slot_limit or concurrency_controller
+    )
+    outcome = scheduler.run(usn_list)
     
-    return list(failed_usns)
+    failed_usns = outcome['failed']
+    invalid_usns = sorted(cached_invalid) + outcome['permanent']
+    retried = sum(1 for attempts in outcome['attempts'].values() if attempts > 1)
+    
+    print(f"\n{'='*60}")
+    print(f"INFO First-try success: {outcome['first_try']}/{len(outcome['attempts'])}")
+    print(f"INFO Retried USNs: {retried} - Total attempts: {outcome['total_attempts']}")
+    print(f"TIME Time: {outcome['elapsed']:.2f}s ({outcome['elapsed']/60:.2f} min)")
+    if invalid_usns:
+        print(f"INFO Invalid USNs / no RV results (not retried): {len(invalid_usns)}")
+    if failed_usns:
+        print(f"INFO Persistently failed USNs ({len(failed_usns)}):")
+        for usn in sorted(failed_usns):
+            print(f"  - {usn}")
+    else:
+        print(f"OK All USNs scraped successfully!")
+    print(f"{'='*60}")
+    
+    return list(failed_usns), invalid_usns
 
 # ==================== MAIN ====================
 
@@ -632,8 +733,26 @@ if __name__ == "__main__":
     parser.add_argument('--workers', type=int, default=20, help='Number of parallel workers')
     parser.add_argument('--usns', type=str, help='Comma-separated USN list', required=False)
     parser.add_argument('--scheme', type=str, help='Scheme (21/22)', required=False)
+    parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help=f'Browser tries per USN before giving up, with backoff between them (default {DEFAULT_MAX_ATTEMPTS})')
+    parser.add_argument('--deadline-minutes', type=float, default=None,
+                        help='Stop starting new attempts after this many minutes')
+    parser.add_argument('--checkpoint', type=str, nargs='?', const=DEFAULT_JOURNAL_PATH, default=None,
+                        help='Record progress in a SQLite journal (default path: scrape_journal.db)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip USNs already done in the checkpoint journal (implies --checkpoint)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Adjust the worker count at runtime (AIMD), starting from --workers')
+    parser.add_argument('--min-workers', type=int, default=DEFAULT_MIN_WORKERS,
+                        help=f'Lower bound for --adaptive (default {DEFAULT_MIN_WORKERS})')
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f'Upper bound for --adaptive (default {DEFAULT_MAX_WORKERS})')
+    parser.add_argument('--slot-file', type=str, default=None,
+                        help='File with the live worker allocation (written by the FastAPI job scheduler)')
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
+    profile_from_args(args, 'rv_scraper')
     
     print("="*70)
     print("RV SCRAPER VTU REVALUATION RESULTS SCRAPER")
@@ -644,6 +763,7 @@ if __name__ == "__main__":
     if args.url:
         url = args.url
         workers = args.workers
+        batch_key = f"rv-{args.scheme}" if args.scheme else "rv"
         
         # Get students
         if args.usns:
@@ -694,9 +814,11 @@ if __name__ == "__main__":
                 sys.exit(0)
             students = [usn]
             workers = 1
+            batch_key = "rv-single"
         
         elif mode == '2':
             scheme = input("Enter Scheme (21/22): ").strip() or '21'
+            batch_key = f"rv-{scheme}"
             
             workers_input = input("Number of parallel workers (default 5): ").strip() or "5"
             try:
@@ -743,56 +865,71 @@ if __name__ == "__main__":
     print("="*70)
     print()
     
-    # Initial scrape
-    failed_usns = []
-    success_count = 0
-    start_time = time.time()
+    # First attempts and retries share one work queue
+    progress = {"completed": 0, "success": 0, "failed": 0}
+    progress_lock = threading.Lock()
     
-    print(f"INFO Starting initial scrape with {workers} workers...")
-    print(f"INFO Progress: [0/{len(students)}] - Success: 0 - Failed: 0\n")
+    def report_progress(usn, success, attempts):
+        with progress_lock:
+            progress["completed"] += 1
+            if success:
+                progress["success"] += 1
+                outcome = "SUCCESS"
+            else:
+                progress["failed"] += 1
+                outcome = "FAIL"
+            print(f"PROGRESS [{progress['completed']}/{len(students)}] {outcome}: {usn} (attempts: {attempts}) - Total Success: {progress['success']}, Failed: {progress['failed']}")
     
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        future_to_usn = {
-            executor.submit(get_vtu_rv_results, usn, url): usn
-            for usn in students
-        }
-        
-        completed = 0
-        for future in as_completed(future_to_usn):
-            usn = future_to_usn[future]
-            completed += 1
-            try:
-                if future.result():
-                    success_count += 1
-                    print(f"PROGRESS [{completed}/{len(students)}] SUCCESS: {usn} - Total Success: {success_count}, Failed: {len(failed_usns)}")
-                else:
-                    failed_usns.append(usn)
-                    print(f"PROGRESS [{completed}/{len(students)}] FAIL: {usn} - Total Success: {success_count}, Failed: {len(failed_usns)}")
-            except Exception as e:
-                failed_usns.append(usn)
-                print(f"PROGRESS [{completed}/{len(students)}] FAIL: {usn} (Exception: {str(e)[:50]}) - Total Success: {success_count}, Failed: {len(failed_usns)}")
+    # RV runs aren't tied to a semester - journal them under semester 0
+    journal = None
+    to_scrape = students
+    if args.checkpoint or args.resume:
+        journal = ScrapeJournal(args.checkpoint or DEFAULT_JOURNAL_PATH)
+        print(f"INFO Checkpoint journal: {journal.path} (batch key: {batch_key})")
+        if args.resume:
+            to_scrape, already_done = skip_completed(journal, batch_key, 0, url, students)
+            progress["completed"] = progress["success"] = len(already_done)
+        record = journal.recorder(batch_key, 0, url)
     
-    elapsed = time.time() - start_time
+    if args.adaptive:
+        concurrency_controller = AdaptiveConcurrency(args.min_workers, args.max_workers, initial=workers)
+        print(f"INFO Adaptive workers: start {concurrency_controller.limit}, "
+              f"range {concurrency_controller.min_workers}-{concurrency_controller.max_workers}")
     
-    print(f"\n{'='*60}")
-    print(f"Initial RV Scrape Complete:")
-    print(f"OK Success: {success_count}/{len(students)}")
-    print(f"FAIL Failed: {len(failed_usns)}")
-    print(f"TIME Time: {elapsed:.2f}s ({elapsed/60:.2f} min)")
-    print(f"{'='*60}")
+    if args.slot_file:
+        slot_limit = SlotFileLimit(args.slot_file, workers, inner=concurrency_controller)
+        print(f"INFO Worker slots from {args.slot_file}: {slot_limit.limit} of {slot_limit.max_workers}")
     
-    # Retry failed USNs
-    if failed_usns:
-        persistent_failures = scrape_rv_with_smart_retry(failed_usns, url, workers)
-        final_success = len(students) - len(persistent_failures)
-        
-        print(f"\n{'='*60}")
-        print(f"FINAL RV STATS:")
-        print(f"OK Successfully scraped: {final_success}/{len(students)} ({final_success/len(students)*100:.1f}%)")
-        print(f"FAIL Permanently failed: {len(persistent_failures)}")
-        print(f"{'='*60}\n")
-    else:
-        print(f"\nOK All RV results scraped successfully!")
+    def on_result(usn, success, attempts):
+        if journal:
+            record(usn, success, attempts)
+        report_progress(usn, success, attempts)
+    
+    print(f"INFO Starting scrape with {workers} workers (max {args.max_attempts} attempts per USN)...")
+    print(f"INFO Progress: [{progress['completed']}/{len(students)}] - Success: {progress['success']} - Failed: 0\n")
+    
+    persistent_failures, invalid_usns = scrape_rv_with_smart_retry(
+        to_scrape, url, workers,
+        max_attempts=args.max_attempts,
+        deadline_seconds=args.deadline_minutes * 60 if args.deadline_minutes else None,
+        on_result=on_result
+    )
+    if journal:
+        journal.close()
+    final_success = len(students) - len(persistent_failures) - len(invalid_usns)
+    
+    print(f"\n{'='*60}")
+    print(f"FINAL RV STATS:")
+    print(f"OK Successfully scraped: {final_success}/{len(students)} ({final_success/len(students)*100:.1f}%)")
+    print(f"FAIL Permanently failed: {len(persistent_failures)}")
+    print(f"INVALID Invalid USNs / no RV results: {len(invalid_usns)}")
+    if concurrency_controller:
+        aimd = concurrency_controller.stats()
+        print(f"AIMD Final workers: {aimd['limit']} (peak {aimd['peak']}, "
+              f"{aimd['increases']} increases, {aimd['decreases']} decreases)")
+    stage_timer.report("STAGE TIMINGS - RV")
+    print(portal_breaker.stats_line())
+    print(f"{'='*60}\n")
     
     print()
     print("="*70)
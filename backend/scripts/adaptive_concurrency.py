@@ -0,0 +1,153 @@
+"""
+ADAPTIVE CONCURRENCY (AIMD)
+===========================
+Picks the number of concurrent scrape workers from how the portal behaves,
+instead of a fixed --workers value.
+
+Every scrape attempt reports its latency and outcome. After each window of
+attempts the controller decides:
+
+- Healthy window  -> additive increase (limit + 1)
+- Unhealthy window -> multiplicative decrease (limit * 0.5)
+
+A window is unhealthy when the alert/timeout/error rate, the captcha
+rejection rate, or the median latency (compared with the best median seen
+so far) is too high. The limit always stays within [min_workers, max_workers]
+and every decision is logged as an "AIMD ..." line.
+
+Usage:
+    controller = AdaptiveConcurrency(min_workers=2, max_workers=30, initial=10)
+    scheduler = RetryScheduler(task, concurrency=controller)
+    ...
+    controller.record(latency_seconds, OUTCOME_OK)     # from the scraper
+"""
+
+import threading
+import time
+
+# Attempt outcomes reported by the scrapers
+OUTCOME_OK = 'ok'               # Results page parsed
+OUTCOME_INVALID = 'invalid'     # Portal answered "invalid USN" (healthy response)
+OUTCOME_CAPTCHA = 'captcha'     # Captcha unreadable or rejected
+OUTCOME_ALERT = 'alert'         # Any other alert from the portal
+OUTCOME_TIMEOUT = 'timeout'     # Page load / element wait failed
+OUTCOME_ERROR = 'error'         # Unparseable page or other failure
+
+ERROR_OUTCOMES = (OUTCOME_ALERT, OUTCOME_TIMEOUT, OUTCOME_ERROR)
+RESPONDED_OUTCOMES = (OUTCOME_OK, OUTCOME_INVALID, OUTCOME_CAPTCHA)
+
+DEFAULT_MIN_WORKERS = 2
+DEFAULT_MAX_WORKERS = 30
+
+
+class AdaptiveConcurrency:
+    """
+    Thread-safe AIMD concurrency limit
+
+    Args:
+        min_workers / max_workers: Bounds for the limit
+        initial: Starting limit (default: min_workers)
+        increase: Added after a healthy window
+        decrease_factor: Multiplied in after an unhealthy window
+        min_window: Minimum attempts per decision (a window is also at least
+                    the current limit, so each decision sees every worker)
+        max_error_rate: Alert/timeout/error share that counts as unhealthy
+        max_captcha_rate: Captcha failure share that counts as unhealthy
+        latency_factor: Median latency this many times the best median seen
+                        counts as unhealthy
+    """
+
+    def __init__(self, min_workers=DEFAULT_MIN_WORKERS, max_workers=DEFAULT_MAX_WORKERS,
+                 initial=None, increase=1, decrease_factor=0.5, min_window=10,
+                 max_error_rate=0.2, max_captcha_rate=0.5, latency_factor=2.0):
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        start = initial if initial is not None else self.min_workers
+        self._limit = min(self.max_workers, max(self.min_workers, start))
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.min_window = min_window
+        self.max_error_rate = max_error_rate
+        self.max_captcha_rate = max_captcha_rate
+        self.latency_factor = latency_factor
+
+        self._lock = threading.Lock()
+        self._samples = []
+        self._baseline_latency = None
+        self._last_decrease = 0.0
+        self._increases = 0
+        self._decreases = 0
+        self._peak = self._limit
+
+    @property
+    def limit(self):
+        """Current number of workers allowed to run at once"""
+        return self._limit
+
+    def record(self, latency, outcome):
+        """Report one scrape attempt; may adjust the limit"""
+        with self._lock:
+            # Attempts started before the last decrease ran at the old, higher
+            # concurrency - counting them would cut the limit again for nothing
+            if time.time() - latency < self._last_decrease:
+                return
+            self._samples.append((latency, outcome))
+            if len(self._samples) >= max(self.min_window, self._limit):
+                self._decide()
+
+    def _decide(self):
+        """Apply AIMD to the finished window (call with the lock held)"""
+        samples, self._samples = self._samples, []
+        count = len(samples)
+        error_rate = sum(1 for _, outcome in samples if outcome in ERROR_OUTCOMES) / count
+        captcha_rate = sum(1 for _, outcome in samples if outcome == OUTCOME_CAPTCHA) / count
+
+        latencies = sorted(latency for latency, outcome in samples if outcome in RESPONDED_OUTCOMES)
+        median = latencies[len(latencies) // 2] if latencies else None
+
+        reasons = []
+        if error_rate > self.max_error_rate:
+            reasons.append(f"error rate {error_rate:.0%} > {self.max_error_rate:.0%}")
+        if captcha_rate > self.max_captcha_rate:
+            reasons.append(f"captcha failures {captcha_rate:.0%} > {self.max_captcha_rate:.0%}")
+        if median is not None and self._baseline_latency is not None \
+                and median > self.latency_factor * self._baseline_latency:
+            reasons.append(f"latency {median:.1f}s > {self.latency_factor:g}x best {self._baseline_latency:.1f}s")
+
+        # Best median so far, allowed to creep up 5% per window so one lucky
+        # window doesn't hold the limit down forever
+        if median is not None:
+            if self._baseline_latency is None:
+                self._baseline_latency = median
+            else:
+                self._baseline_latency = min(median, self._baseline_latency * 1.05)
+
+        old = self._limit
+        if reasons:
+            self._limit = max(self.min_workers, int(self._limit * self.decrease_factor))
+            self._decreases += 1
+            self._last_decrease = time.time()
+            action = "DECREASE"
+        else:
+            self._limit = min(self.max_workers, self._limit + self.increase)
+            self._increases += 1
+            action = "INCREASE"
+        self._peak = max(self._peak, self._limit)
+
+        median_text = f"{median:.1f}s" if median is not None else "-"
+        reason_text = f" - {', '.join(reasons)}" if reasons else ""
+        print(f"AIMD {action} workers {old} -> {self._limit} "
+              f"(window {count}, p50 {median_text}, errors {error_rate:.0%}, captcha {captcha_rate:.0%}){reason_text}")
+
+    def stats(self):
+        """Summary for end-of-run reports"""
+        with self._lock:
+            return {
+                "limit": self._limit,
+                "peak": self._peak,
+                "min_workers": self.min_workers,
+                "max_workers": self.max_workers,
+                "increases": self._increases,
+                "decreases": self._decreases,
+                "baseline_latency": self._baseline_latency,
+            }
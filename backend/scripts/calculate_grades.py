@@ -13,6 +13,13 @@ This script:
 6. Updates CGPA in student_details table
 
 Run after scraping: python calculate_grades.py --semester 4
+Set-based (inside MySQL): python calculate_grades.py --semester 4 --engine sql
+Vectorized (NumPy):       python calculate_grades.py --semester 4 --engine numpy
+Only some students:       python calculate_grades.py --semester 4 --usns 1BI22IS001,1BI22IS002
+Preview changes only:     python calculate_grades.py --semester 4 --dry-run
+
+Only rows whose values actually change are written. A dry run reports the
+per-step diff counts (the CGPA count is based on the SGPAs currently stored).
 Or auto-run: Called by FastAPI after scraping completes
 """
 
@@ -20,9 +27,29 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
 
-from db_config import get_db_connection
-from statistics import mean
+from db_config import get_db_connection, get_pooled_connection
+from run_profiler import add_profile_arguments, profile_from_args
 import argparse
+import time
+
+# Grade engines selectable via --engine
+#   python: row-by-row calculation in Python (original behaviour)
+#   sql:    set-based UPDATE inside MySQL (see update_letter_grades_sql)
+#   numpy:  vectorized kernel over the whole semester (see grade_kernel.py)
+ENGINES = ('python', 'sql', 'numpy')
+
+# VTU grade boundaries: (minimum percentage, letter grade, grade points)
+# Mirrors get_letter_grade / get_grade_points - keep them in sync
+GRADE_BOUNDARIES = [
+    (90, 'O', 10),
+    (80, 'A+', 9),
+    (70, 'A', 8),
+    (60, 'B+', 7),
+    (50, 'B', 6),
+    (40, 'C', 5),
+    (35, 'P', 4),
+    (0, 'F', 0),
+]
 
 # =============================================================================
 # GRADE CALCULATION LOGIC
@@ -137,7 +164,17 @@ def get_subject_max_marks(subject_code, semester, cursor):
     if not result:
         return 100  # Default
     
-    subject_name = result[0].upper()
+    return max_marks_for_subject_name(result[0], semester)
+
+
+def max_marks_for_subject_name(subject_name, semester):
+    """
+    Maximum marks for a subject given its name (no database access)
+    
+    Same rules as get_subject_max_marks - shared by the batch engines that
+    already have subject names in hand.
+    """
+    subject_name = (subject_name or '').upper()
     
     # Check for actual major projects/internships (200 marks)
     # Be specific to avoid matching "Project Management" or "Mini Project"
@@ -151,15 +188,161 @@ def get_subject_max_marks(subject_code, semester, cursor):
     return 100  # Default for regular subjects (including Mini Project, Project Management, etc.)
 
 
+# =============================================================================
+# QUERY / BATCH WRITE HELPERS
+# =============================================================================
+
+def usn_filter(usns, column='student_usn'):
+    """
+    SQL fragment restricting a query to a set of USNs
+
+    Args:
+        usns: Iterable of USNs, or None for no restriction
+        column: Column to filter on (may be table-qualified)
+
+    Returns:
+        (" AND column IN (%s, ...)", params) - or ("", ()) when usns is None
+    """
+    if usns is None:
+        return "", ()
+    usns = tuple(sorted(set(usns)))
+    placeholders = ", ".join(["%s"] * len(usns))
+    return f" AND {column} IN ({placeholders})", usns
+
+
+BULK_CHUNK_SIZE = 500
+
+
+def bulk_update(cursor, table, key_column, columns, rows, chunk_size=BULK_CHUNK_SIZE):
+    """
+    UPDATE many rows with one statement per chunk
+
+    executemany() sends UPDATEs to the server one at a time, so instead each
+    chunk is joined against an inline derived table:
+        UPDATE t JOIN (SELECT k, v0, ... UNION ALL SELECT ...) v ON t.key = v.k
+
+    Args:
+        cursor: Database cursor
+        table: Table to update
+        key_column: Column matched against the first value of each row
+        columns: Columns to set, in the order they follow the key in each row
+        rows: Sequence of (key, value1, value2, ...) tuples
+        chunk_size: Rows per statement
+
+    Returns:
+        Number of rows MySQL reports as changed
+    """
+    set_clause = ", ".join(f"t.{column} = v.v{i}" for i, column in enumerate(columns))
+    first_select = "SELECT %s AS k, " + ", ".join(f"%s AS v{i}" for i in range(len(columns)))
+    next_select = " UNION ALL SELECT " + ", ".join(["%s"] * (len(columns) + 1))
+
+    changed = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        derived = first_select + next_select * (len(chunk) - 1)
+        params = [value for row in chunk for value in row]
+        cursor.execute(f"""
+            UPDATE {table} t
+            INNER JOIN ({derived}) v ON t.{key_column} = v.k
+            SET {set_clause}
+        """, params)
+        changed += cursor.rowcount
+    return changed
+
+
+# =============================================================================
+# CHANGE DETECTION (DIFF MODE)
+# =============================================================================
+# The engines compare what they computed with what is already stored and only
+# write rows that differ - unchanged rows are not rewritten, calculated_at is
+# not bumped and nothing lands in the binlog for them.
+
+def load_stored_summaries(cursor, semester=None, usns=None):
+    """
+    Stored student_semester_summary rows keyed by (usn, semester)
+
+    Values are in the order of the summary rows the engines build (after usn
+    and semester) and normalised to the same Python types, so a computed row
+    can be compared with summary_changed().
+    """
+    students_filter, params = usn_filter(usns)
+    if semester is not None:
+        students_filter += " AND semester = %s"
+        params = (*params, semester)
+
+    cursor.execute(f"""
+        SELECT student_usn, semester, sgpa, total_marks_obtained, total_marks_maximum,
+               percentage, total_credits, class_grade, has_backlogs, backlog_count
+        FROM student_semester_summary
+        WHERE 1=1{students_filter}
+    """, params)
+
+    return {(usn, sem): normalize_stored_summary(*values) for usn, sem, *values in cursor.fetchall()}
+
+
+def normalize_stored_summary(sgpa, obtained, maximum, percentage, credits, class_grade, has_backlogs, backlogs):
+    """Stored summary columns (DECIMAL, TINYINT) → the Python types the engines compute"""
+    return (
+        None if sgpa is None else float(sgpa),
+        obtained,
+        maximum,
+        None if percentage is None else float(percentage),
+        credits,
+        class_grade,
+        None if has_backlogs is None else bool(has_backlogs),
+        backlogs,
+    )
+
+
+def summary_changed(row, stored):
+    """True when a computed summary row (usn, semester, sgpa, ...) differs from the stored one"""
+    stored_row = stored.get((row[0], row[1]))
+    if stored_row is None:
+        return True
+    sgpa, obtained, maximum, percentage, credits, class_grade, has_backlogs, backlogs = row[2:]
+    return stored_row != (float(sgpa), obtained, maximum, float(percentage), credits,
+                          class_grade, bool(has_backlogs), backlogs)
+
+
+def measure_round_trip(cursor, samples=5):
+    """Median time (seconds) of a trivial query - the cost of one write statement on the wire"""
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def chunk_count(rows, chunk_size=BULK_CHUNK_SIZE):
+    """Statements bulk_update needs for this many rows"""
+    return -(-rows // chunk_size)
+
+
+def diff_stats(rows, changed, round_trips_saved):
+    """Per-step diff counts reported by the engines"""
+    return {
+        "rows": rows,
+        "changed": changed,
+        "unchanged": None if rows is None else rows - changed,
+        "round_trips_saved": round_trips_saved,
+    }
+
+
 # =============================================================================
 # STEP 1: UPDATE LETTER GRADES IN RESULTS TABLE
 # =============================================================================
 
-def update_letter_grades(semester, cursor, conn):
+def update_letter_grades(semester, cursor, conn, usns=None, dry_run=False):
     """
     Update letter_grade, grade_points, and result_status in results table
     for all subjects in a given semester (LATEST ATTEMPT ONLY)
     
+    Pass usns to only regrade those students (e.g. the ones a scrape touched).
+    Only rows whose computed grade differs from the stored one are updated;
+    with dry_run nothing is written and the diff counts are just returned.
+    
     VTU Pass/Fail Criteria:
     - Internal-only subjects (external=0): total_marks >= 40 → PASS
     - Regular subjects: external_marks >= 18 AND total_marks >= 40 → PASS
@@ -169,27 +352,33 @@ def update_letter_grades(semester, cursor, conn):
     print(f"STEP 1: Updating Letter Grades & Status for Semester {semester}")
     print(f"{'='*60}")
     
+    inner_filter, inner_params = usn_filter(usns)
+    outer_filter, outer_params = usn_filter(usns, 'r.student_usn')
+    
     # Get all results for this semester (LATEST ATTEMPT ONLY)
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT r.result_id, r.subject_code, r.semester, r.internal_marks, 
-               r.external_marks, r.total_marks, r.student_usn, r.attempt_number
+               r.external_marks, r.total_marks, r.student_usn, r.attempt_number,
+               r.letter_grade, r.grade_points, r.result_status
         FROM results r
         INNER JOIN (
             SELECT student_usn, subject_code, MAX(attempt_number) as max_attempt
             FROM results
-            WHERE semester = %s
+            WHERE semester = %s{inner_filter}
             GROUP BY student_usn, subject_code
         ) latest ON r.student_usn = latest.student_usn 
                    AND r.subject_code = latest.subject_code 
                    AND r.attempt_number = latest.max_attempt
-        WHERE r.semester = %s AND r.total_marks IS NOT NULL
-    """, (semester, semester))
+        WHERE r.semester = %s AND r.total_marks IS NOT NULL{outer_filter}
+    """, (semester, *inner_params, semester, *outer_params))
     
     results = cursor.fetchall()
     print(f"Found {len(results)} subject results to process (latest attempts only)")
     
+    processed = 0
     updated = 0
-    for result_id, subject_code, sem, internal_marks, external_marks, total_marks, usn, attempt_num in results:
+    for (result_id, subject_code, sem, internal_marks, external_marks, total_marks, usn, attempt_num,
+         stored_grade, stored_points, stored_status) in results:
         # Determine max marks for this subject
         max_marks = get_subject_max_marks(subject_code, sem, cursor)
         
@@ -208,72 +397,242 @@ def update_letter_grades(semester, cursor, conn):
             letter_grade = 'F'
             grade_points = 0
         
-        # Update results table
-        cursor.execute("""
-            UPDATE results
-            SET letter_grade = %s, grade_points = %s, result_status = %s
-            WHERE result_id = %s
-        """, (letter_grade, grade_points, result_status, result_id))
+        processed += 1
+        if processed % 50 == 0:
+            print(f"  Processed {processed} results...")
+        
+        # Skip rows that already hold the right values
+        if (letter_grade, grade_points, result_status) == (stored_grade, stored_points, stored_status):
+            continue
         
+        # Update results table
         updated += 1
-        if updated % 50 == 0:
-            print(f"  Processed {updated} results...")
+        if not dry_run:
+            cursor.execute("""
+                UPDATE results
+                SET letter_grade = %s, grade_points = %s, result_status = %s
+                WHERE result_id = %s
+            """, (letter_grade, grade_points, result_status, result_id))
+    
+    if dry_run:
+        print(f"[DRY RUN] {updated} of {processed} results would change")
+    else:
+        conn.commit()
+        print(f"[SUCCESS] Updated grades & status for {updated} results ({processed - updated} unchanged, skipped)")
     
+    # One UPDATE round-trip per row
+    return diff_stats(processed, updated, processed - updated)
+
+
+# =============================================================================
+# STEP 1 (SQL ENGINE): SET-BASED LETTER GRADES INSIDE MYSQL
+# =============================================================================
+
+def ensure_grade_engine_schema(cursor, conn):
+    """
+    Prepare the lookup data used by the SQL engine
+
+    - grade_boundaries: one row per letter grade with its percentage range
+    - subjects.max_marks: precomputed 100/200 flag (same rules as
+      get_subject_max_marks), refreshed every writing run so subjects added by the
+      scrapers are picked up
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS grade_boundaries (
+            letter_grade VARCHAR(5) PRIMARY KEY,
+            grade_points INT NOT NULL,
+            min_percentage INT NOT NULL,
+            max_percentage INT DEFAULT NULL
+        )
+    """)
+
+    # Each grade covers [min_percentage, max_percentage) - O has no upper bound
+    boundary_rows = []
+    upper = None
+    for min_percentage, letter_grade, grade_points in GRADE_BOUNDARIES:
+        boundary_rows.append((letter_grade, grade_points, min_percentage, upper))
+        upper = min_percentage
+
+    cursor.executemany("""
+        REPLACE INTO grade_boundaries (letter_grade, grade_points, min_percentage, max_percentage)
+        VALUES (%s, %s, %s, %s)
+    """, boundary_rows)
+
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = 'subjects'
+        AND COLUMN_NAME = 'max_marks'
+    """)
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("""
+            ALTER TABLE subjects
+            ADD COLUMN max_marks INT NOT NULL DEFAULT 100 COMMENT '100, or 200 for major project/internship'
+        """)
+        print("  Added column: subjects.max_marks")
+
+    cursor.execute("""
+        UPDATE subjects
+        SET max_marks = CASE
+            WHEN UPPER(subject_name) LIKE '%MAJOR PROJECT%'
+              OR UPPER(subject_name) LIKE '%INTERNSHIP%'
+              OR UPPER(subject_name) LIKE '%DISSERTATION%' THEN 200
+            WHEN semester = 8 AND UPPER(subject_name) LIKE '%MAJOR%' THEN 200
+            ELSE 100
+        END
+    """)
+
+    conn.commit()
+
+
+# Computed columns of the SQL engine - shared by the UPDATE and the dry-run count
+_SQL_RESULT_STATUS = """CASE
+                WHEN r.external_marks = 0 THEN
+                    CASE WHEN r.total_marks >= 40 THEN 'PASS' ELSE 'FAIL' END
+                WHEN r.external_marks >= 18 AND r.total_marks >= 40 THEN 'PASS'
+                ELSE 'FAIL'
+            END"""
+
+_SQL_LETTER_GRADE = """CASE
+                WHEN (r.external_marks = 0 AND r.total_marks >= 40)
+                  OR (r.external_marks >= 18 AND r.total_marks >= 40)
+                THEN COALESCE(gb.letter_grade, 'F')
+                ELSE 'F'
+            END"""
+
+_SQL_GRADE_POINTS = """CASE
+                WHEN (r.external_marks = 0 AND r.total_marks >= 40)
+                  OR (r.external_marks >= 18 AND r.total_marks >= 40)
+                THEN COALESCE(gb.grade_points, 0)
+                ELSE 0
+            END"""
+
+
+def update_letter_grades_sql(semester, cursor, conn, usns=None, dry_run=False):
+    """
+    Set-based version of update_letter_grades - the whole semester in a
+    single UPDATE instead of 2 round-trips per result
+
+    Same VTU Pass/Fail Criteria (evaluated inside MySQL):
+    - Internal-only subjects (external=0): total_marks >= 40 → PASS
+    - Regular subjects: external_marks >= 18 AND total_marks >= 40 → PASS
+    - Failed subjects get grade='F' and grade_points=0
+
+    Percentages are compared as total * 100 >= boundary * max_marks so the
+    integer maths gives exactly the same grade as get_letter_grade.
+
+    MySQL only rewrites rows whose values actually change. With dry_run the
+    same expressions are evaluated in a SELECT that counts the differences.
+    """
+    print(f"\n{'='*60}")
+    print(f"STEP 1: Updating Letter Grades & Status for Semester {semester} (SQL engine)")
+    print(f"{'='*60}")
+
+    inner_filter, inner_params = usn_filter(usns)
+    outer_filter, outer_params = usn_filter(usns, 'r.student_usn')
+
+    joins = f"""
+        INNER JOIN (
+            SELECT student_usn, subject_code, MAX(attempt_number) as max_attempt
+            FROM results
+            WHERE semester = %s{inner_filter}
+            GROUP BY student_usn, subject_code
+        ) latest ON r.student_usn = latest.student_usn
+                   AND r.subject_code = latest.subject_code
+                   AND r.attempt_number = latest.max_attempt
+        LEFT JOIN subjects s ON r.subject_code = s.subject_code
+        LEFT JOIN grade_boundaries gb
+               ON r.total_marks * 100 >= gb.min_percentage * COALESCE(s.max_marks, 100)
+              AND (gb.max_percentage IS NULL
+                   OR r.total_marks * 100 < gb.max_percentage * COALESCE(s.max_marks, 100))
+    """
+    params = (semester, *inner_params, semester, *outer_params)
+
+    if dry_run:
+        cursor.execute(f"""
+            SELECT COUNT(*),
+                   COALESCE(SUM(NOT (r.result_status <=> {_SQL_RESULT_STATUS})
+                             OR NOT (r.letter_grade <=> {_SQL_LETTER_GRADE})
+                             OR NOT (r.grade_points <=> {_SQL_GRADE_POINTS})), 0)
+            FROM results r
+            {joins}
+            WHERE r.semester = %s AND r.total_marks IS NOT NULL{outer_filter}
+        """, params)
+        rows, changed = cursor.fetchone()
+        rows, changed = int(rows), int(changed)
+        print(f"[DRY RUN] {changed} of {rows} results would change")
+        return diff_stats(rows, changed, 0)
+
+    cursor.execute(f"""
+        UPDATE results r
+        {joins}
+        SET r.result_status = {_SQL_RESULT_STATUS},
+            r.letter_grade = {_SQL_LETTER_GRADE},
+            r.grade_points = {_SQL_GRADE_POINTS}
+        WHERE r.semester = %s AND r.total_marks IS NOT NULL{outer_filter}
+    """, params)
+
+    # MySQL reports changed rows only - unchanged grades are not rewritten
+    changed = cursor.rowcount
     conn.commit()
-    print(f"[SUCCESS] Updated grades & status for {updated} results")
+    print(f"[SUCCESS] Updated grades & status for {changed} results (changed rows)")
+    return diff_stats(None, changed, 0)
 
 
 # =============================================================================
 # STEP 2: CALCULATE SGPA PER STUDENT PER SEMESTER
 # =============================================================================
 
-def calculate_sgpa(semester, cursor, conn):
+def calculate_sgpa(semester, cursor, conn, usns=None, dry_run=False):
     """
     Calculate SGPA, percentage, class grade for all students in a semester
-    and store in student_semester_summary table
+    (or only the given usns) and store in student_semester_summary table
+    
+    One query fetches every latest-attempt result of the semester with its
+    credits and subject name; students are grouped in memory and the summary
+    rows that differ from the stored ones are upserted in one batched
+    INSERT ... ON DUPLICATE KEY UPDATE (nothing is written with dry_run).
     """
     print(f"\n{'='*60}")
     print(f"STEP 2: Calculating SGPA for Semester {semester}")
     print(f"{'='*60}")
     
-    # Get all distinct students for this semester
-    cursor.execute("""
-        SELECT DISTINCT student_usn
-        FROM results
-        WHERE semester = %s
-    """, (semester,))
+    inner_filter, inner_params = usn_filter(usns)
+    outer_filter, outer_params = usn_filter(usns, 'r.student_usn')
+    
+    # All subject results for this semester (LATEST ATTEMPT ONLY)
+    cursor.execute(f"""
+        SELECT 
+            r.student_usn,
+            r.subject_code,
+            r.total_marks,
+            r.grade_points,
+            r.letter_grade,
+            r.result_status,
+            s.credits,
+            s.subject_name
+        FROM results r
+        LEFT JOIN subjects s ON r.subject_code = s.subject_code
+        INNER JOIN (
+            SELECT student_usn, subject_code, MAX(attempt_number) as max_attempt
+            FROM results
+            WHERE semester = %s{inner_filter}
+            GROUP BY student_usn, subject_code
+        ) latest ON r.student_usn = latest.student_usn
+                   AND r.subject_code = latest.subject_code 
+                   AND r.attempt_number = latest.max_attempt
+        WHERE r.semester = %s{outer_filter}
+        ORDER BY r.student_usn
+    """, (semester, *inner_params, semester, *outer_params))
+    
+    students = {}
+    for usn, *subject_result in cursor.fetchall():
+        students.setdefault(usn, []).append(subject_result)
     
-    students = [row[0] for row in cursor.fetchall()]
     print(f"Found {len(students)} students to process")
     
-    processed = 0
-    for usn in students:
-        # Get all subject results for this student in this semester (LATEST ATTEMPT ONLY)
-        cursor.execute("""
-            SELECT 
-                r.subject_code,
-                r.total_marks,
-                r.grade_points,
-                r.letter_grade,
-                r.result_status,
-                s.credits
-            FROM results r
-            LEFT JOIN subjects s ON r.subject_code = s.subject_code
-            INNER JOIN (
-                SELECT subject_code, MAX(attempt_number) as max_attempt
-                FROM results
-                WHERE student_usn = %s AND semester = %s
-                GROUP BY subject_code
-            ) latest ON r.subject_code = latest.subject_code 
-                       AND r.attempt_number = latest.max_attempt
-            WHERE r.student_usn = %s AND r.semester = %s
-        """, (usn, semester, usn, semester))
-        
-        subject_results = cursor.fetchall()
-        
-        if not subject_results:
-            continue
-        
+    summary_rows = []
+    for usn, subject_results in students.items():
         # Calculate totals
         total_credits = 0
         total_grade_points_weighted = 0
@@ -284,14 +643,14 @@ def calculate_sgpa(semester, cursor, conn):
         
         missing_credits = []
         
-        for subject_code, total_marks, grade_points, letter_grade, result_status, credits in subject_results:
+        for subject_code, total_marks, grade_points, letter_grade, result_status, credits, subject_name in subject_results:
             # Skip subjects without credit info
             if credits is None or credits == 0:
                 missing_credits.append(subject_code)
                 continue
             
             # Determine max marks
-            max_marks = get_subject_max_marks(subject_code, semester, cursor)
+            max_marks = max_marks_for_subject_name(subject_name, semester)
             
             # Add to totals
             total_credits += credits
@@ -320,8 +679,22 @@ def calculate_sgpa(semester, cursor, conn):
         # Determine class grade
         class_grade = get_class_grade(sgpa, has_backlogs)
         
-        # Upsert into student_semester_summary
-        cursor.execute("""
+        summary_rows.append((usn, semester, sgpa, total_marks_obtained, total_marks_maximum,
+                             percentage, total_credits, class_grade, has_backlogs, backlog_count))
+    
+    # Only rows that differ from what is stored
+    stored = load_stored_summaries(cursor, semester, usns)
+    changed_rows = [row for row in summary_rows if summary_changed(row, stored)]
+    unchanged = len(summary_rows) - len(changed_rows)
+    
+    if dry_run:
+        print(f"[DRY RUN] {len(changed_rows)} of {len(summary_rows)} semester summaries would change")
+        return diff_stats(len(summary_rows), len(changed_rows), 0 if changed_rows else int(bool(summary_rows)))
+    
+    # Upsert into student_semester_summary
+    # (executemany turns this INSERT into a single multi-row statement)
+    if changed_rows:
+        cursor.executemany("""
             INSERT INTO student_semester_summary 
             (student_usn, semester, sgpa, total_marks_obtained, total_marks_maximum, 
              percentage, total_credits, class_grade, has_backlogs, backlog_count)
@@ -336,63 +709,76 @@ def calculate_sgpa(semester, cursor, conn):
                 has_backlogs = VALUES(has_backlogs),
                 backlog_count = VALUES(backlog_count),
                 calculated_at = CURRENT_TIMESTAMP
-        """, (usn, semester, sgpa, total_marks_obtained, total_marks_maximum,
-              percentage, total_credits, class_grade, has_backlogs, backlog_count))
-        
-        processed += 1
-        if processed % 20 == 0:
-            print(f"  Processed {processed} students...")
+        """, changed_rows)
     
     conn.commit()
-    print(f"[SUCCESS] Calculated SGPA for {processed} students")
+    print(f"[SUCCESS] Calculated SGPA for {len(summary_rows)} students "
+          f"({len(changed_rows)} changed, {unchanged} unchanged)")
+    return diff_stats(len(summary_rows), len(changed_rows), 0 if changed_rows else int(bool(summary_rows)))
 
 
 # =============================================================================
 # STEP 3: UPDATE CGPA IN STUDENT_DETAILS TABLE
 # =============================================================================
 
-def update_cgpa(cursor, conn):
+def update_cgpa(cursor, conn, usns=None, weighted=False, dry_run=False):
     """
-    Calculate CGPA (mean of all SGPAs) and update student_details table
+    Calculate CGPA and update student_details table
+    for all students, or only the given usns
+    
+    One grouped SELECT over student_semester_summary (with the stored CGPA),
+    then batched UPDATEs for the students whose CGPA changed (instead of one
+    SELECT + one UPDATE per student). dry_run only counts them.
+    
+    Args:
+        weighted: False → mean of all SGPAs (default, VTU convention)
+                  True  → credit-weighted: sum(sgpa * total_credits) / sum(total_credits)
     """
     print(f"\n{'='*60}")
-    print(f"STEP 3: Updating CGPA for All Students")
+    print(f"STEP 3: Updating CGPA for {'All' if usns is None else len(set(usns))} Students"
+          + (" (credit-weighted)" if weighted else ""))
     print(f"{'='*60}")
     
-    # Get all distinct students
-    cursor.execute("SELECT DISTINCT student_usn FROM student_semester_summary")
-    students = [row[0] for row in cursor.fetchall()]
-    
-    print(f"Found {len(students)} students to update")
-    
-    updated = 0
-    for usn in students:
-        # Get all SGPAs for this student
-        cursor.execute("""
-            SELECT sgpa
-            FROM student_semester_summary
-            WHERE student_usn = %s
-        """, (usn,))
-        
-        sgpas = [row[0] for row in cursor.fetchall()]
-        
-        if not sgpas:
-            continue
-        
-        # Calculate CGPA (mean of all SGPAs)
-        cgpa = round(mean(sgpas), 2)
-        
-        # Update student_details
-        cursor.execute("""
-            UPDATE student_details
-            SET cgpa = %s
-            WHERE usn = %s
-        """, (cgpa, usn))
-        
-        updated += 1
+    students_filter, students_params = usn_filter(usns, 'ss.student_usn')
+    
+    # SUM over DECIMAL columns is exact, so dividing the Decimals here gives the
+    # same result as statistics.mean() of the individual SGPAs
+    cursor.execute(f"""
+        SELECT ss.student_usn,
+               SUM(ss.sgpa) as sgpa_sum,
+               COUNT(*) as semesters,
+               SUM(ss.sgpa * ss.total_credits) as weighted_sum,
+               SUM(ss.total_credits) as credits,
+               d.cgpa
+        FROM student_semester_summary ss
+        LEFT JOIN student_details d ON d.usn = ss.student_usn
+        WHERE 1=1{students_filter}
+        GROUP BY ss.student_usn, d.cgpa
+    """, students_params)
+    
+    total = 0
+    cgpa_rows = []
+    for usn, sgpa_sum, semesters, weighted_sum, credits, stored_cgpa in cursor.fetchall():
+        if weighted and credits:
+            cgpa = round(weighted_sum / credits, 2)
+        else:
+            cgpa = round(sgpa_sum / semesters, 2)
+        total += 1
+        if stored_cgpa != cgpa:
+            cgpa_rows.append((usn, cgpa))
+    
+    print(f"Found {total} students ({len(cgpa_rows)} with a changed CGPA)")
+    saved = chunk_count(total) - chunk_count(len(cgpa_rows))
+    
+    if dry_run:
+        print(f"[DRY RUN] {len(cgpa_rows)} of {total} CGPAs would change")
+        return diff_stats(total, len(cgpa_rows), saved)
+    
+    bulk_update(cursor, 'student_details', 'usn', ['cgpa'], cgpa_rows)
     
     conn.commit()
-    print(f"[SUCCESS] Updated CGPA for {updated} students")
+    print(f"[SUCCESS] Updated CGPA for {len(cgpa_rows)} students ({total - len(cgpa_rows)} unchanged)")
+    return diff_stats(total, len(cgpa_rows), saved)
 
 
 # =============================================================================
@@ -468,39 +854,101 @@ def generate_summary_report(semester, cursor):
 # MAIN EXECUTION
 # =============================================================================
 
-def calculate_grades_for_semester(semester, verbose=True):
+def calculate_grades_for_semester(semester, verbose=True, engine='python', usns=None, weighted_cgpa=False,
+                                  include_cgpa=True, pooled=False, dry_run=False, refresh_schema=True):
     """
     Main function to calculate all grades for a semester
     
     Args:
         semester: Semester number (1-8)
         verbose: Print detailed logs
+        engine: 'python' (row-by-row), 'sql' (set-based, inside MySQL)
+                or 'numpy' (vectorized kernel)
+        usns: Only recalculate these students (results, SGPA and CGPA) -
+              e.g. the USNs a scrape just succeeded for. None = everyone.
+        weighted_cgpa: Credit-weighted CGPA instead of the mean of SGPAs
+        include_cgpa: Run the CGPA step (False when the caller updates CGPA
+                      once after several semesters)
+        pooled: Use a connection from the shared pool (parallel callers)
+        dry_run: Compute and compare only - report how many rows would change
+                 and the estimated time the skipped writes save
+        refresh_schema: SQL engine - refresh its lookup data first
+                        (ensure_grade_engine_schema). Callers grading several
+                        semesters at once do that once up front and pass
+                        False. Never done on a dry run, which uses the lookup
+                        data as it is.
     
     Returns:
-        Dictionary with success status and stats
+        Dictionary with success status, stats, per-step diff counts and
+        per-step timings (seconds)
     """
-    conn = get_db_connection()
+    if engine not in ENGINES:
+        return {"success": False, "error": f"Unknown grade engine: {engine}"}
+    
+    if usns is not None:
+        usns = sorted(set(usns))
+        if not usns:
+            return {
+                "success": True,
+                "semester": semester,
+                "engine": engine,
+                "students": 0,
+                "timings": {},
+                "diff": {},
+                "message": "No students to recalculate"
+            }
+    
+    conn = get_pooled_connection() if pooled else get_db_connection()
     if not conn:
         return {"success": False, "error": "Database connection failed"}
     
     cursor = conn.cursor()
+    timings = {}
+    diff = {}
+    
+    def timed(step, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings[step] = round(time.perf_counter() - start, 3)
+        return result
     
     try:
         if verbose:
-            print(f"\n🔍 Starting grade calculation for Semester {semester}...")
+            scope = "all students" if usns is None else f"{len(usns)} students"
+            print(f"\n🔍 Starting grade calculation for Semester {semester} ({scope})...")
         
-        # Step 1: Update letter grades
-        update_letter_grades(semester, cursor, conn)
-        
-        # Step 2: Calculate SGPA
-        calculate_sgpa(semester, cursor, conn)
+        if engine == 'numpy':
+            # Steps 1-3 in one vectorized pass (times each of its own steps)
+            from grade_kernel import recalculate
+            stats = recalculate(cursor, conn, semester, verbose=verbose, usns=usns,
+                                weighted_cgpa=weighted_cgpa, include_cgpa=include_cgpa, dry_run=dry_run)
+            timings.update({step: round(t, 3) for step, t in stats['timings'].items()})
+            diff.update(stats['diff'])
+        else:
+            # Step 1: Update letter grades
+            if engine == 'sql':
+                if refresh_schema and not dry_run:
+                    timed('schema', ensure_grade_engine_schema, cursor, conn)
+                diff['letter_grades'] = timed('letter_grades', update_letter_grades_sql,
+                                              semester, cursor, conn, usns, dry_run)
+            else:
+                diff['letter_grades'] = timed('letter_grades', update_letter_grades,
+                                              semester, cursor, conn, usns, dry_run)
+            
+            # Step 2: Calculate SGPA
+            diff['sgpa'] = timed('sgpa', calculate_sgpa, semester, cursor, conn, usns, dry_run)
+            
+            # Step 3: Update CGPA
+            if include_cgpa:
+                diff['cgpa'] = timed('cgpa', update_cgpa, cursor, conn, usns, weighted_cgpa, dry_run)
         
-        # Step 3: Update CGPA
-        update_cgpa(cursor, conn)
+        # Writes skipped because nothing changed, priced at one round-trip each
+        round_trips_saved = sum(step['round_trips_saved'] for step in diff.values())
+        time_saved = round(round_trips_saved * measure_round_trip(cursor), 3) if round_trips_saved else 0.0
         
         # Step 4: Generate report
         if verbose:
-            generate_summary_report(semester, cursor)
+            timed('report', generate_summary_report, semester, cursor)
         
         cursor.close()
         conn.close()
@@ -508,7 +956,13 @@ def calculate_grades_for_semester(semester, verbose=True):
         return {
             "success": True,
             "semester": semester,
-            "message": "Grade calculation completed successfully"
+            "engine": engine,
+            "students": None if usns is None else len(usns),
+            "timings": timings,
+            "diff": diff,
+            "dry_run": dry_run,
+            "estimated_time_saved": time_saved,
+            "message": "Dry run - nothing written" if dry_run else "Grade calculation completed successfully"
         }
     
     except Exception as e:
@@ -517,7 +971,8 @@ def calculate_grades_for_semester(semester, verbose=True):
         conn.close()
         return {
             "success": False,
-            "error": str(e)
+            "error": str(e),
+            "timings": timings
         }
 
 
@@ -529,13 +984,33 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Calculate SGPA/CGPA after scraping')
     parser.add_argument('--semester', type=int, required=True, help='Semester number (1-8)')
     parser.add_argument('--quiet', action='store_true', help='Suppress detailed output')
+    parser.add_argument('--engine', choices=ENGINES, default='python',
+                        help='Grade engine: python (row-by-row), sql (set-based in MySQL) or numpy (vectorized)')
+    parser.add_argument('--usns', type=str, help='Comma-separated USN list (only recalculate these students)')
+    parser.add_argument('--weighted-cgpa', action='store_true',
+                        help='Credit-weighted CGPA (uses total_credits) instead of mean of SGPAs')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only report how many rows would change (nothing is written)')
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
+    profile_from_args(args, 'calculate_grades')
+    
+    usns = None
+    if args.usns:
+        usns = [usn.strip() for usn in args.usns.split(',') if usn.strip()]
     
-    result = calculate_grades_for_semester(args.semester, verbose=not args.quiet)
+    result = calculate_grades_for_semester(args.semester, verbose=not args.quiet, engine=args.engine,
+                                           usns=usns, weighted_cgpa=args.weighted_cgpa, dry_run=args.dry_run)
     
     if result['success']:
         print(f"\n[SUCCESS] Grade calculation completed for Semester {args.semester}")
+        if result.get('timings'):
+            print("TIMINGS " + ", ".join(f"{step}={seconds:.3f}s" for step, seconds in result['timings'].items()))
+        if result.get('diff'):
+            print("DIFF " + ", ".join(f"{step}={counts['changed']}/{counts['rows'] if counts['rows'] is not None else '?'}"
+                                      for step, counts in result['diff'].items())
+                  + f" (est. {result['estimated_time_saved']:.3f}s saved by skipped writes)")
         sys.exit(0)
     else:
         print(f"\n[ERROR] {result.get('error', 'Unknown error')}")
@@ -0,0 +1,192 @@
+"""
+PORTAL CIRCUIT BREAKER
+======================
+Shared by every scrape worker, wrapped around the page-load/submit step.
+
+When results.vtu.ac.in is down, every worker used to keep launching Chrome,
+sit through the fixed sleeps and timeouts, and fail - 5 times per USN.
+With the breaker:
+
+- CLOSED     Normal operation; consecutive connection failures/timeouts are counted
+- OPEN       After failure_threshold of them in a row: nobody is dispatched,
+             workers wait (instead of failing their USNs) for open_seconds
+- HALF-OPEN  Then a single probe request goes through:
+               portal answers -> CLOSED, everyone resumes
+               probe fails    -> OPEN again, open time doubled (up to max_open_seconds)
+
+acquire() hands out a Ticket stamped with the state it was admitted under;
+report() ignores tickets from before the last state change, so a slow request
+let through before the circuit opened can't close it again, and only the
+probe's own outcome decides HALF-OPEN.
+
+State changes are logged as "BREAKER ..." lines, and stats_line() gives a
+"BREAKER_STATS {json}" line that the FastAPI service parses.
+"""
+
+import os
+import json
+import threading
+import time
+from collections import namedtuple
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half-open'
+
+DEFAULT_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))
+DEFAULT_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', 30))
+DEFAULT_MAX_OPEN_SECONDS = float(os.getenv('BREAKER_MAX_OPEN_SECONDS', 300))
+DEFAULT_MAX_WAIT_SECONDS = float(os.getenv('BREAKER_MAX_WAIT_SECONDS', 900))
+
+# Admission handed out by acquire(): generation = state changes so far,
+# probe = this is the HALF-OPEN probe request
+Ticket = namedtuple('Ticket', ['generation', 'probe'])
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker
+
+    Args:
+        failure_threshold: Consecutive failures that open the circuit
+        open_seconds: First pause before probing
+        max_open_seconds: Cap for the doubling pause
+        max_wait_seconds: Longest a worker waits in acquire() before giving up
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, open_seconds=DEFAULT_OPEN_SECONDS,
+                 max_open_seconds=DEFAULT_MAX_OPEN_SECONDS, max_wait_seconds=DEFAULT_MAX_WAIT_SECONDS):
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max(open_seconds, max_open_seconds)
+        self.max_wait_seconds = max_wait_seconds
+
+        self._cond = threading.Condition()
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._current_open_seconds = open_seconds
+        self._open_until = 0.0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._generation = 0
+
+        self._times_opened = 0
+        self._probes = 0
+        self._failed_probes = 0
+        self._gave_up = 0
+        self._stale_reports = 0
+        self._open_time = 0.0
+
+    @property
+    def state(self):
+        return self._state
+
+    def acquire(self):
+        """
+        Wait until a request may go out
+
+        Returns:
+            Ticket when the caller may contact the portal (it must then pass
+            it to report()), None if the circuit stayed open for max_wait_seconds
+        """
+        give_up_at = time.time() + self.max_wait_seconds
+        with self._cond:
+            while True:
+                now = time.time()
+                if self._state == STATE_CLOSED:
+                    return Ticket(self._generation, False)
+                if self._state == STATE_OPEN and now >= self._open_until:
+                    self._state = STATE_HALF_OPEN
+                    self._generation += 1
+                    print("BREAKER HALF-OPEN - sending one probe request")
+                if self._state == STATE_HALF_OPEN and not self._probe_in_flight:
+                    self._probe_in_flight = True
+                    self._probes += 1
+                    return Ticket(self._generation, True)
+                if now >= give_up_at:
+                    self._gave_up += 1
+                    return None
+
+                wait = give_up_at - now
+                if self._state == STATE_OPEN:
+                    wait = min(wait, self._open_until - now)
+                self._cond.wait(max(0.05, wait))
+
+    def report(self, ticket, success):
+        """
+        Outcome of a request let through by acquire()
+
+        ticket: What acquire() returned for this request
+        success: True (portal answered), False (connection failure/timeout),
+                 None (inconclusive - e.g. a local error; only frees the probe slot)
+
+        Reports from requests admitted before the last state change are ignored.
+        """
+        with self._cond:
+            if ticket.generation != self._generation:
+                self._stale_reports += 1
+                self._cond.notify_all()
+                return
+
+            probe = ticket.probe
+            if probe:
+                self._probe_in_flight = False
+
+            if success:
+                self._consecutive_failures = 0
+                if self._state != STATE_CLOSED:
+                    self._close()
+            elif success is False:
+                self._consecutive_failures += 1
+                if probe:
+                    self._failed_probes += 1
+                    self._open(min(self.max_open_seconds, self._current_open_seconds * 2),
+                               "probe failed")
+                elif self._state == STATE_CLOSED and self._consecutive_failures >= self.failure_threshold:
+                    self._open(self.open_seconds,
+                               f"{self._consecutive_failures} consecutive connection failures")
+
+            self._cond.notify_all()
+
+    def _open(self, seconds, reason):
+        """Open the circuit (call with the lock held)"""
+        now = time.time()
+        if self._state == STATE_CLOSED:
+            self._times_opened += 1
+            self._opened_at = now
+        self._state = STATE_OPEN
+        self._generation += 1
+        self._current_open_seconds = seconds
+        self._open_until = now + seconds
+        print(f"BREAKER OPEN - {reason}, pausing requests for {seconds:g}s")
+
+    def _close(self):
+        """Close the circuit (call with the lock held)"""
+        paused = time.time() - self._opened_at if self._opened_at else 0.0
+        self._open_time += paused
+        self._state = STATE_CLOSED
+        self._generation += 1
+        self._opened_at = None
+        self._current_open_seconds = self.open_seconds
+        print(f"BREAKER CLOSED - portal responding again (paused {paused:.0f}s)")
+
+    def stats(self):
+        """Counters for reports and the service response"""
+        with self._cond:
+            open_time = self._open_time
+            if self._opened_at:
+                open_time += time.time() - self._opened_at
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "times_opened": self._times_opened,
+                "probes": self._probes,
+                "failed_probes": self._failed_probes,
+                "gave_up": self._gave_up,
+                "stale_reports": self._stale_reports,
+                "open_seconds": round(open_time, 1),
+            }
+
+    def stats_line(self):
+        """Machine-readable summary line for the scraper output"""
+        return f"BREAKER_STATS {json.dumps(self.stats())}"
@@ -4,9 +4,11 @@ Handles MySQL connection for VTU Results Scraper
 """
 
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
 import os
+import threading
 from dotenv import load_dotenv
+from query_profiler import profiler_from_env
 
 # Load environment variables from .env file
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
@@ -20,6 +22,15 @@ DB_CONFIG = {
     'port': int(os.getenv('MYSQL_PORT', 3306))
 }
 
+# DB_PROFILE=1: time every statement and report hot spots / N+1 loops at exit
+QUERY_PROFILER = profiler_from_env()
+
+def _profiled(connection):
+    """Wrap the connection's cursors when query profiling is on"""
+    if QUERY_PROFILER:
+        return QUERY_PROFILER.wrap(connection)
+    return connection
+
 def get_db_connection():
     """
     Create and return a MySQL database connection
@@ -31,11 +42,40 @@ def get_db_connection():
         connection = mysql.connector.connect(**DB_CONFIG)
         if connection.is_connected():
             print(f"Successfully connected to MySQL database: {DB_CONFIG['database']}")
-            return connection
+            return _profiled(connection)
     except Error as e:
         print(f"Error connecting to MySQL: {e}")
         return None
 
+# Shared connection pool (created on first use) for code that opens many
+# short-lived connections from worker threads
+POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', 8))
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pooled_connection():
+    """
+    Get a connection from the shared pool
+    
+    close() on the returned connection hands it back to the pool.
+    
+    Returns:
+        connection: Pooled MySQL connection or None if failed
+    """
+    global _pool
+    try:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name="resana_pool",
+                    pool_size=POOL_SIZE,
+                    **DB_CONFIG
+                )
+        return _profiled(_pool.get_connection())
+    except Error as e:
+        print(f"Error getting pooled MySQL connection: {e}")
+        return None
+
 def close_connection(connection):
     """
     Close the database connection
@@ -0,0 +1,620 @@
+"""
+VECTORIZED GRADE KERNEL (NumPy)
+===============================
+Array version of the grading rules in calculate_grades.py.
+
+Instead of running the if/elif chains once per result row, a whole semester
+(or the whole results table) is loaded into NumPy arrays and graded at once:
+
+1. Letter grades via np.digitize against the grade boundary array
+2. VTU pass/fail rules as boolean masks
+3. SGPA, percentage, backlog counts per (usn, semester) via np.bincount
+4. Class grades via np.digitize against the SGPA thresholds
+5. CGPA per student via grouped integer sums (exact, same rounding as
+   statistics.mean + round on DECIMAL SGPAs)
+
+Results match get_letter_grade / get_grade_points / get_class_grade and the
+SGPA/CGPA steps of calculate_grades.py. The Python compute step takes a few
+milliseconds even for a full recalculation - time is spent in the DB fetch.
+
+Usage:
+    python grade_kernel.py                  # Whole results table
+    python grade_kernel.py --semester 4     # One semester
+    python grade_kernel.py --dry-run        # Count rows that would change, write nothing
+    python grade_kernel.py --self-check     # Compare kernel with calculate_grades (no DB)
+
+Or via calculate_grades.py --semester 4 --engine numpy
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import time
+import argparse
+import numpy as np
+
+from calculate_grades import (
+    GRADE_BOUNDARIES,
+    bulk_update,
+    chunk_count,
+    diff_stats,
+    load_stored_summaries,
+    max_marks_for_subject_name,
+    summary_changed,
+    usn_filter,
+)
+
+# =============================================================================
+# BOUNDARY ARRAYS
+# =============================================================================
+
+# Ascending order for np.digitize: index 0 = F, index 7 = O
+_ascending = sorted(GRADE_BOUNDARIES)
+GRADE_BINS = np.array([min_pct for min_pct, _, _ in _ascending[1:]], dtype=np.float64)
+LETTERS = np.array([letter for _, letter, _ in _ascending], dtype=object)
+POINTS = np.array([points for _, _, points in _ascending], dtype=np.int64)
+F_INDEX = 0
+
+# Class grade thresholds (see get_class_grade): <4.0 F, <5.0 P, <6.25 SC, <7.75 FC, else FCD
+CLASS_BINS = np.array([4.0, 5.0, 6.25, 7.75])
+CLASS_GRADES = np.array(['F', 'P', 'SC', 'FC', 'FCD'], dtype=object)
+
+
+# =============================================================================
+# KERNEL FUNCTIONS (pure NumPy - no database access)
+# =============================================================================
+
+def round2(values):
+    """
+    Round to 2 decimals exactly like Python's round(x, 2)
+
+    np.round scales by 100 first, which can land on a false .5 tie. Those
+    near-tie entries (rare) are re-rounded with Python's correctly rounded
+    round(); everything else already agrees.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(v, 2) for v in values[near_tie].tolist()]
+    return rounded
+
+
+def grade_results(total, external, max_marks):
+    """
+    Grade result rows
+
+    Args:
+        total: float array of total marks (NaN = NULL)
+        external: float array of external marks (NaN = NULL)
+        max_marks: int array of subject max marks (100/200)
+
+    Returns:
+        (letter_index, grade_points, passed) arrays - LETTERS[letter_index]
+        gives the letter grade, failed rows are forced to F / 0
+    """
+    # VTU Pass/Fail Criteria
+    #   Internal-only subjects (external=0): total >= 40
+    #   Regular subjects: external >= 18 AND total >= 40
+    # NaN comparisons are False, so NULL marks count as FAIL
+    with np.errstate(invalid='ignore', divide='ignore'):
+        passed = np.where(external == 0, total >= 40, (external >= 18) & (total >= 40))
+        percentage = (total / max_marks) * 100
+
+    letter_index = np.digitize(percentage, GRADE_BINS)
+    letter_index[np.isnan(total) | (max_marks == 0)] = F_INDEX
+    letter_index[~passed] = F_INDEX
+
+    return letter_index, POINTS[letter_index], passed
+
+
+def semester_summaries(group, n_groups, credits, total, max_marks, grade_points, backlog):
+    """
+    Per (usn, semester) group SGPA / percentage / backlog reductions
+
+    Args:
+        group: int array mapping each row to its group (0..n_groups-1)
+        n_groups: number of groups
+        credits: float array of subject credits (NaN = NULL)
+        total: float array of total marks (NaN = NULL, counted as 0)
+        max_marks: int array of subject max marks
+        grade_points: int array of grade points
+        backlog: bool array - row counts as a backlog
+
+    Returns:
+        dict of per-group arrays. Subjects without credits are skipped and
+        groups with no credited subject have valid=False (same rules as
+        calculate_sgpa).
+    """
+    credited = np.nan_to_num(credits) > 0
+    g = group[credited]
+    c = credits[credited]
+
+    total_credits = np.bincount(g, weights=c, minlength=n_groups)
+    weighted_points = np.bincount(g, weights=grade_points[credited] * c, minlength=n_groups)
+    marks_obtained = np.bincount(g, weights=np.nan_to_num(total[credited]), minlength=n_groups)
+    marks_maximum = np.bincount(g, weights=max_marks[credited], minlength=n_groups)
+    backlog_count = np.bincount(g, weights=backlog[credited].astype(np.float64), minlength=n_groups).astype(np.int64)
+
+    valid = total_credits > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sgpa = np.where(valid, round2(weighted_points / total_credits), 0.0)
+        percentage = np.where(marks_maximum > 0, round2((marks_obtained / marks_maximum) * 100), 0.0)
+
+    return {
+        'valid': valid,
+        'sgpa': sgpa,
+        'percentage': percentage,
+        'total_credits': total_credits.astype(np.int64),
+        'total_marks_obtained': marks_obtained.astype(np.int64),
+        'total_marks_maximum': marks_maximum.astype(np.int64),
+        'backlog_count': backlog_count,
+        'class_grade': class_grades(sgpa, backlog_count > 0),
+    }
+
+
+def class_grades(sgpa, has_backlogs):
+    """Vectorized get_class_grade"""
+    index = np.digitize(sgpa, CLASS_BINS)
+    index[has_backlogs] = 0
+    return CLASS_GRADES[index]
+
+
+def half_even_divide(numerator, denominator):
+    """Integer division rounded half-to-even (Decimal's default rounding)"""
+    quotient, remainder = np.divmod(numerator, denominator)
+    twice = 2 * remainder
+    round_up = (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def cgpa_from_sgpa_cents(student, n_students, sgpa_cents, credits=None):
+    """
+    CGPA = mean of SGPAs (or credit-weighted mean when credits are given),
+    rounded to 2 decimals
+
+    SGPAs are DECIMAL(4,2) in the database, so they are summed as integer
+    cents - the result is identical to round(statistics.mean(decimals), 2).
+
+    Returns:
+        (cgpa float array, semester count array)
+    """
+    sgpa_cents = np.asarray(sgpa_cents, dtype=np.int64)
+    counts = np.bincount(student, minlength=n_students)
+    sums = np.bincount(student, weights=sgpa_cents, minlength=n_students).astype(np.int64)
+    cgpa_cents = half_even_divide(sums, np.maximum(counts, 1))
+
+    if credits is not None:
+        credits = np.asarray(credits, dtype=np.int64)
+        credit_sums = np.bincount(student, weights=credits, minlength=n_students).astype(np.int64)
+        weighted_sums = np.bincount(student, weights=sgpa_cents * credits, minlength=n_students).astype(np.int64)
+        has_credits = credit_sums > 0
+        # Students without credit info fall back to the plain mean (same as update_cgpa)
+        cgpa_cents = np.where(has_credits,
+                              half_even_divide(weighted_sums, np.maximum(credit_sums, 1)),
+                              cgpa_cents)
+
+    return cgpa_cents / 100, counts
+
+
+# =============================================================================
+# LOADING
+# =============================================================================
+
+def _float_column(values):
+    """DB column → float64 array with NaN for NULL"""
+    return np.fromiter((np.nan if v is None else v for v in values), dtype=np.float64, count=len(values))
+
+
+def _factorize(values):
+    """Map values to dense integer codes (first-seen order)"""
+    codes = {}
+    index = np.fromiter((codes.setdefault(v, len(codes)) for v in values), dtype=np.int64, count=len(values))
+    return index, list(codes)
+
+
+def load_latest_results(cursor, semester=None, usns=None):
+    """
+    Load latest-attempt results into arrays - one query for the semester
+    (or every semester when semester is None), optionally only for usns
+    """
+    inner_usns, inner_usn_params = usn_filter(usns)
+    outer_usns, outer_usn_params = usn_filter(usns, 'r.student_usn')
+    if semester is not None:
+        semester_filter = "WHERE semester = %s" + inner_usns
+        outer_filter = "WHERE r.semester = %s" + outer_usns
+        params = (semester, *inner_usn_params, semester, *outer_usn_params)
+    else:
+        semester_filter = "WHERE 1=1" + inner_usns
+        outer_filter = "WHERE 1=1" + outer_usns
+        params = (*inner_usn_params, *outer_usn_params)
+
+    cursor.execute(f"""
+        SELECT r.result_id, r.student_usn, r.semester, r.subject_code,
+               r.external_marks, r.total_marks,
+               r.letter_grade, r.grade_points, r.result_status,
+               s.credits, s.subject_name
+        FROM results r
+        INNER JOIN (
+            SELECT student_usn, subject_code, semester, MAX(attempt_number) as max_attempt
+            FROM results
+            {semester_filter}
+            GROUP BY student_usn, subject_code, semester
+        ) latest ON r.student_usn = latest.student_usn
+                   AND r.subject_code = latest.subject_code
+                   AND r.semester = latest.semester
+                   AND r.attempt_number = latest.max_attempt
+        LEFT JOIN subjects s ON r.subject_code = s.subject_code
+        {outer_filter}
+    """, params)
+    rows = cursor.fetchall()
+
+    if not rows:
+        return None
+
+    (result_id, usn, sem, subject_code, external, total,
+     letter_grade, grade_points, result_status, credits, subject_name) = zip(*rows)
+
+    # Max marks only depends on the subject, so evaluate once per subject
+    max_marks_cache = {}
+    for code, name, s in zip(subject_code, subject_name, sem):
+        if (code, s) not in max_marks_cache:
+            max_marks_cache[(code, s)] = max_marks_for_subject_name(name, s)
+
+    usn_index, usn_values = _factorize(usn)
+    semesters = np.array(sem, dtype=np.int64)
+
+    return {
+        'count': len(rows),
+        'result_id': np.array(result_id, dtype=np.int64),
+        'usn_index': usn_index,
+        'usns': usn_values,
+        'semester': semesters,
+        'external': _float_column(external),
+        'total': _float_column(total),
+        'credits': _float_column(credits),
+        'max_marks': np.array([max_marks_cache[(c, s)] for c, s in zip(subject_code, sem)], dtype=np.int64),
+        'stored_letter_grade': np.array(letter_grade, dtype=object),
+        'stored_grade_points': _float_column(grade_points),
+        'stored_result_status': np.array(result_status, dtype=object),
+    }
+
+
+# =============================================================================
+# ENGINE
+# =============================================================================
+
+def grade_loaded(data):
+    """
+    Run the kernel on loaded arrays
+
+    Rows with NULL total marks are not regraded (same as update_letter_grades)
+    - their stored grade points / status still feed the SGPA like before.
+    """
+    letter_index, grade_points, passed = grade_results(data['total'], data['external'], data['max_marks'])
+    graded = ~np.isnan(data['total'])
+
+    letter_grade = np.where(graded, LETTERS[letter_index], data['stored_letter_grade'])
+    result_status = np.where(graded, np.where(passed, 'PASS', 'FAIL'), data['stored_result_status'])
+    points = np.where(graded, grade_points, np.nan_to_num(data['stored_grade_points'])).astype(np.int64)
+    backlog = (letter_grade == 'F') | (result_status == 'FAIL')
+
+    # Group rows by (usn, semester)
+    group_key = data['usn_index'] * 16 + data['semester']
+    group_keys, group = np.unique(group_key, return_inverse=True)
+
+    summaries = semester_summaries(group, len(group_keys), data['credits'], data['total'],
+                                   data['max_marks'], points, backlog)
+    summaries['usn_index'] = group_keys // 16
+    summaries['semester'] = group_keys % 16
+
+    return {
+        'graded': graded,
+        'letter_grade': letter_grade,
+        'grade_points': points,
+        'result_status': result_status,
+        'summaries': summaries,
+    }
+
+
+def recalculate(cursor, conn, semester=None, verbose=True, usns=None, weighted_cgpa=False,
+                include_cgpa=True, dry_run=False):
+    """
+    Full vectorized recalculation: letter grades, SGPA summaries and CGPA
+
+    Args:
+        cursor: Database cursor
+        conn: Database connection
+        semester: Semester number, or None for every semester
+        verbose: Print step timings
+        usns: Only recalculate these students (None = everyone)
+        weighted_cgpa: Credit-weighted CGPA instead of the mean of SGPAs
+        include_cgpa: Run the CGPA step
+        dry_run: Compare with the stored values but write nothing
+
+    Only rows that differ from what is stored are written.
+
+    Returns:
+        Dictionary with counts, per-step diff counts and timings (seconds)
+    """
+    timings = {}
+    label = f"Semester {semester}" if semester is not None else "All Semesters"
+
+    def log(message):
+        if verbose:
+            print(message)
+
+    log(f"\n{'='*60}")
+    log(f"NUMPY ENGINE: {label}")
+    log(f"{'='*60}")
+
+    start = time.perf_counter()
+    data = load_latest_results(cursor, semester, usns)
+    timings['load'] = time.perf_counter() - start
+
+    if data is None:
+        log("No results found")
+        return {"results": 0, "summaries": 0, "cgpa": 0, "timings": timings, "diff": {}}
+    log(f"  Loaded {data['count']} latest-attempt results in {timings['load']:.3f}s")
+
+    start = time.perf_counter()
+    graded = grade_loaded(data)
+    timings['compute'] = time.perf_counter() - start
+    log(f"  Computed grades + SGPA in {timings['compute']*1000:.1f}ms")
+
+    diff = {}
+    action = "Would update" if dry_run else "Updated"
+
+    # Write letter grades that differ from the stored ones
+    start = time.perf_counter()
+    mask = graded['graded'] & (
+        (graded['letter_grade'] != data['stored_letter_grade'])
+        | (graded['grade_points'] != data['stored_grade_points'])  # NULL (NaN) never equal
+        | (graded['result_status'] != data['stored_result_status'])
+    )
+    grade_rows = list(zip(
+        data['result_id'][mask].tolist(),
+        graded['letter_grade'][mask].tolist(),
+        graded['grade_points'][mask].tolist(),
+        graded['result_status'][mask].tolist(),
+    ))
+    graded_count = int(graded['graded'].sum())
+    diff['letter_grades'] = diff_stats(graded_count, len(grade_rows),
+                                       chunk_count(graded_count) - chunk_count(len(grade_rows)))
+    if not dry_run:
+        bulk_update(cursor, 'results', 'result_id', ['letter_grade', 'grade_points', 'result_status'], grade_rows)
+        conn.commit()
+    timings['write_results'] = time.perf_counter() - start
+    log(f"  {action} {len(grade_rows)} of {graded_count} result grades in {timings['write_results']:.3f}s")
+
+    # Upsert semester summaries (executemany INSERT is sent as one multi-row statement)
+    start = time.perf_counter()
+    s = graded['summaries']
+    valid = s['valid']
+    summary_usns = np.array(data['usns'], dtype=object)[s['usn_index'][valid]]
+    backlog_count = s['backlog_count'][valid]
+    summary_rows = list(zip(
+        summary_usns.tolist(),
+        s['semester'][valid].tolist(),
+        s['sgpa'][valid].tolist(),
+        s['total_marks_obtained'][valid].tolist(),
+        s['total_marks_maximum'][valid].tolist(),
+        s['percentage'][valid].tolist(),
+        s['total_credits'][valid].tolist(),
+        s['class_grade'][valid].tolist(),
+        (backlog_count > 0).tolist(),
+        backlog_count.tolist(),
+    ))
+    stored = load_stored_summaries(cursor, semester, usns)
+    changed_rows = [row for row in summary_rows if summary_changed(row, stored)]
+    diff['sgpa'] = diff_stats(len(summary_rows), len(changed_rows),
+                              0 if changed_rows else int(bool(summary_rows)))
+    if changed_rows and not dry_run:
+        cursor.executemany("""
+            INSERT INTO student_semester_summary
+            (student_usn, semester, sgpa, total_marks_obtained, total_marks_maximum,
+             percentage, total_credits, class_grade, has_backlogs, backlog_count)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                sgpa = VALUES(sgpa),
+                total_marks_obtained = VALUES(total_marks_obtained),
+                total_marks_maximum = VALUES(total_marks_maximum),
+                percentage = VALUES(percentage),
+                total_credits = VALUES(total_credits),
+                class_grade = VALUES(class_grade),
+                has_backlogs = VALUES(has_backlogs),
+                backlog_count = VALUES(backlog_count),
+                calculated_at = CURRENT_TIMESTAMP
+        """, changed_rows)
+        conn.commit()
+    timings['write_summaries'] = time.perf_counter() - start
+    skipped = int((~valid).sum())
+    log(f"  {'Would upsert' if dry_run else 'Upserted'} {len(changed_rows)} of {len(summary_rows)} "
+        f"semester summaries in {timings['write_summaries']:.3f}s"
+        + (f" (skipped {skipped} with no credit info)" if skipped else ""))
+
+    # CGPA over every stored SGPA
+    cgpa_rows = []
+    if include_cgpa:
+        start = time.perf_counter()
+        all_cgpa_rows = recalculate_cgpa(cursor, usns, weighted_cgpa)
+        stored_cgpa = load_stored_cgpa(cursor, usns)
+        cgpa_rows = [(usn, cgpa) for usn, cgpa in all_cgpa_rows if stored_cgpa.get(usn) != cgpa]
+        diff['cgpa'] = diff_stats(len(all_cgpa_rows), len(cgpa_rows),
+                                  chunk_count(len(all_cgpa_rows)) - chunk_count(len(cgpa_rows)))
+        if not dry_run:
+            bulk_update(cursor, 'student_details', 'usn', ['cgpa'], cgpa_rows)
+            conn.commit()
+        timings['cgpa'] = time.perf_counter() - start
+        log(f"  {action} CGPA for {len(cgpa_rows)} of {len(all_cgpa_rows)} students in {timings['cgpa']:.3f}s")
+
+    return {
+        "results": len(grade_rows),
+        "summaries": len(changed_rows),
+        "cgpa": len(cgpa_rows),
+        "timings": timings,
+        "diff": diff,
+    }
+
+
+def recalculate_cgpa(cursor, usns=None, weighted=False):
+    """Load stored SGPAs (all students, or only usns) and return (usn, cgpa) rows"""
+    students_filter, params = usn_filter(usns)
+    cursor.execute(f"""
+        SELECT student_usn, sgpa, total_credits
+        FROM student_semester_summary
+        WHERE 1=1{students_filter}
+    """, params)
+    rows = cursor.fetchall()
+    if not rows:
+        return []
+
+    usn, sgpa, credits = zip(*rows)
+    student, usn_values = _factorize(usn)
+    # DECIMAL(4,2) → exact integer cents
+    cents = np.array([int(round(value * 100)) for value in sgpa], dtype=np.int64)
+    credits = np.array([c or 0 for c in credits], dtype=np.int64) if weighted else None
+    cgpa, _ = cgpa_from_sgpa_cents(student, len(usn_values), cents, credits)
+    return list(zip(usn_values, cgpa.tolist()))
+
+
+def load_stored_cgpa(cursor, usns=None):
+    """Stored CGPA per student as floats (None when not set yet)"""
+    students_filter, params = usn_filter(usns, 'usn')
+    cursor.execute(f"SELECT usn, cgpa FROM student_details WHERE 1=1{students_filter}", params)
+    return {usn: None if cgpa is None else float(cgpa) for usn, cgpa in cursor.fetchall()}
+
+
+# =============================================================================
+# SELF-CHECK AGAINST calculate_grades.py
+# =============================================================================
+
+def self_check(rows=200000, seed=42):
+    """
+    Compare the kernel with the row-by-row functions on random data
+    (no database needed). Returns True when every value matches.
+    """
+    from decimal import Decimal
+    from statistics import mean
+    from calculate_grades import get_letter_grade, get_grade_points, get_class_grade
+
+    rng = np.random.default_rng(seed)
+    max_marks = rng.choice([100, 200], size=rows, p=[0.9, 0.1])
+    total = rng.integers(0, max_marks + 1).astype(np.float64)
+    external = np.minimum(rng.integers(0, 61, size=rows), total).astype(np.float64)
+    external[rng.random(rows) < 0.05] = 0  # Internal-only subjects
+    credits = rng.choice([0, 1, 2, 3, 4], size=rows, p=[0.05, 0.15, 0.2, 0.3, 0.3]).astype(np.float64)
+    group = np.sort(rng.integers(0, rows // 8, size=rows))
+    _, group = np.unique(group, return_inverse=True)
+    n_groups = group.max() + 1
+
+    start = time.perf_counter()
+    letter_index, points, passed = grade_results(total, external, max_marks)
+    letters = LETTERS[letter_index]
+    backlog = (letters == 'F') | ~passed
+    summaries = semester_summaries(group, n_groups, credits, total, max_marks, points, backlog)
+    kernel_ms = (time.perf_counter() - start) * 1000
+
+    mismatches = 0
+
+    # Row level
+    for t, e, m, letter, p, ok in zip(total.tolist(), external.tolist(), max_marks.tolist(),
+                                      letters.tolist(), points.tolist(), passed.tolist()):
+        status = 'PASS' if (t >= 40 if e == 0 else (e >= 18 and t >= 40)) else 'FAIL'
+        expected = get_letter_grade(t, m) if status == 'PASS' else 'F'
+        if expected != letter or get_grade_points(expected) != p or (status == 'PASS') != ok:
+            mismatches += 1
+
+    # Group level
+    totals = {}
+    for g, c, t, m, p, b in zip(group.tolist(), credits.tolist(), total.tolist(),
+                                max_marks.tolist(), points.tolist(), backlog.tolist()):
+        if c == 0:
+            continue
+        acc = totals.setdefault(g, [0, 0, 0, 0, 0])
+        acc[0] += int(c)
+        acc[1] += p * int(c)
+        acc[2] += int(t)
+        acc[3] += m
+        acc[4] += int(b)
+    for g in range(n_groups):
+        if g not in totals:
+            if summaries['valid'][g]:
+                mismatches += 1
+            continue
+        cr, wp, obtained, maximum, backlogs = totals[g]
+        sgpa = round(wp / cr, 2)
+        percentage = round((obtained / maximum) * 100, 2)
+        if (sgpa != summaries['sgpa'][g] or percentage != summaries['percentage'][g]
+                or backlogs != summaries['backlog_count'][g]
+                or get_class_grade(sgpa, backlogs > 0) != summaries['class_grade'][g]):
+            mismatches += 1
+
+    # CGPA (plain mean and credit-weighted, as in update_cgpa)
+    valid_groups = np.flatnonzero(summaries['valid'])
+    student = valid_groups // 3
+    cents = np.round(summaries['sgpa'][valid_groups] * 100).astype(np.int64)
+    semester_credits = summaries['total_credits'][valid_groups]
+    cgpa, _ = cgpa_from_sgpa_cents(student, student.max() + 1, cents)
+    weighted_cgpa, _ = cgpa_from_sgpa_cents(student, student.max() + 1, cents, semester_credits)
+    by_student = {}
+    for s, c, cr in zip(student.tolist(), cents.tolist(), semester_credits.tolist()):
+        by_student.setdefault(s, []).append((Decimal(c) / 100, cr))
+    for s, entries in by_student.items():
+        sgpas = [sgpa for sgpa, _ in entries]
+        weighted = sum(sgpa * cr for sgpa, cr in entries) / sum(cr for _, cr in entries)
+        if float(round(mean(sgpas), 2)) != cgpa[s] or float(round(weighted, 2)) != weighted_cgpa[s]:
+            mismatches += 1
+
+    print(f"Kernel: {rows} rows, {n_groups} groups in {kernel_ms:.1f}ms")
+    print(f"Mismatches vs calculate_grades: {mismatches}")
+    return mismatches == 0
+
+
+# =============================================================================
+# CLI INTERFACE
+# =============================================================================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Vectorized grade recalculation (NumPy)')
+    parser.add_argument('--semester', type=int, help='Semester number (1-8), default: all semesters')
+    parser.add_argument('--usns', type=str, help='Comma-separated USN list (only recalculate these students)')
+    parser.add_argument('--weighted-cgpa', action='store_true',
+                        help='Credit-weighted CGPA (uses total_credits) instead of mean of SGPAs')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only report how many rows would change (nothing is written)')
+    parser.add_argument('--self-check', action='store_true', help='Compare kernel with calculate_grades.py (no DB)')
+
+    args = parser.parse_args()
+
+    if args.self_check:
+        sys.exit(0 if self_check() else 1)
+
+    from db_config import get_db_connection
+
+    conn = get_db_connection()
+    if not conn:
+        print("[ERROR] Database connection failed")
+        sys.exit(1)
+
+    cursor = conn.cursor()
+    try:
+        usns = [usn.strip() for usn in args.usns.split(',') if usn.strip()] if args.usns else None
+        stats = recalculate(cursor, conn, args.semester, usns=usns, weighted_cgpa=args.weighted_cgpa,
+                            dry_run=args.dry_run)
+        total_time = sum(stats['timings'].values())
+        if args.dry_run:
+            print(f"\n[DRY RUN] " + ", ".join(f"{step}: {counts['changed']} of {counts['rows']} would change"
+                                            for step, counts in stats['diff'].items()))
+        else:
+            print(f"\n[SUCCESS] Recalculated {stats['results']} results, {stats['summaries']} summaries, "
+                  f"{stats['cgpa']} CGPAs in {total_time:.2f}s (unchanged rows skipped)")
+    except Exception as e:
+        conn.rollback()
+        print(f"\n[ERROR] {e}")
+        sys.exit(1)
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,401 @@
+"""
+GRADE TRIGGERS (MySQL)
+======================
+Optional schema mode: MySQL computes grades at write time, so a scrape no
+longer needs a follow-up recalculation pass (and the scraper can't race the
+grader - there is no grader).
+
+Installs into the current database:
+1. Deterministic functions with the grading rules of calculate_grades.py
+   (vtu_result_status, vtu_letter_grade, vtu_grade_points, vtu_max_marks)
+2. BEFORE INSERT / BEFORE UPDATE triggers on results that set
+   result_status, letter_grade and grade_points from total_marks,
+   external_marks and the subject's max marks
+3. refresh_semester_summary(usn, semester): recomputes that student's
+   student_semester_summary row (latest attempts, same rules as
+   calculate_sgpa) and their CGPA (mean of SGPAs, same as update_cgpa)
+4. AFTER INSERT / AFTER UPDATE triggers on results that call it
+
+The summary triggers fire FOR EACH ROW, so a plain INSERT of N subjects for
+one student recomputes that student's summary (and CGPA) N times. The
+scrapers avoid this: defer_summary_refresh() sets a session variable the
+triggers check, and refresh_summaries() then calls the procedure once per
+student-semester after the commit. Other writers keep the per-row refresh.
+
+Why triggers and not STORED generated columns: a generated column may only
+use columns of its own row, but max marks come from subjects (subject name
+rules), and every grade engine/scraper still writes letter_grade and
+grade_points directly - MySQL rejects explicit values for generated columns.
+The BEFORE triggers give the same "always correct on write" guarantee while
+leaving those writes valid (they are simply overridden with the same value).
+
+Existing rows are not regraded on install - run calculate_grades.py (or
+recalculate_all_grades.py) once afterwards.
+
+With binary logging enabled, creating functions needs SUPER or
+log_bin_trust_function_creators=1 on the server.
+
+Usage:
+    python grade_triggers.py install
+    python grade_triggers.py uninstall
+    python grade_triggers.py status
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import argparse
+import threading
+
+from db_config import get_db_connection
+from calculate_grades import GRADE_BOUNDARIES
+
+TRIGGERS = ('results_grade_bi', 'results_grade_bu', 'results_summary_ai', 'results_summary_au')
+FUNCTIONS = ('vtu_result_status', 'vtu_letter_grade', 'vtu_grade_points', 'vtu_max_marks')
+PROCEDURES = ('refresh_semester_summary',)
+
+# Set on a session to make the summary triggers skip its writes
+DEFER_SUMMARY_VARIABLE = '@grade_triggers_defer_summary'
+
+# =============================================================================
+# SQL DEFINITIONS
+# =============================================================================
+
+def _boundary_case(value):
+    """
+    CASE over GRADE_BOUNDARIES returning the 'letter' or the 'points' -
+    integer comparison total * 100 >= boundary * max_marks, like the SQL engine
+    """
+    whens = []
+    for min_percentage, letter_grade, grade_points in GRADE_BOUNDARIES:
+        result = f"'{letter_grade}'" if value == 'letter' else grade_points
+        whens.append(f"WHEN total * 100 >= {min_percentage} * max_marks THEN {result}")
+    return "CASE " + " ".join(whens) + " END"
+
+
+def routine_definitions():
+    """CREATE statements for the functions and the summary procedure, in install order"""
+    return [
+        # Same pass/fail rules as update_letter_grades / update_letter_grades_sql
+        """
+        CREATE FUNCTION vtu_result_status(total INT, external INT)
+        RETURNS VARCHAR(10) DETERMINISTIC NO SQL
+        RETURN CASE
+            WHEN total IS NULL THEN NULL
+            WHEN external = 0 THEN IF(total >= 40, 'PASS', 'FAIL')
+            WHEN external >= 18 AND total >= 40 THEN 'PASS'
+            ELSE 'FAIL'
+        END
+        """,
+        f"""
+        CREATE FUNCTION vtu_letter_grade(total INT, external INT, max_marks INT)
+        RETURNS VARCHAR(5) DETERMINISTIC NO SQL
+        RETURN CASE
+            WHEN total IS NULL OR max_marks = 0 THEN 'F'
+            WHEN vtu_result_status(total, external) = 'FAIL' THEN 'F'
+            ELSE {_boundary_case('letter')}
+        END
+        """,
+        f"""
+        CREATE FUNCTION vtu_grade_points(total INT, external INT, max_marks INT)
+        RETURNS INT DETERMINISTIC NO SQL
+        RETURN CASE
+            WHEN total IS NULL OR max_marks = 0 THEN 0
+            WHEN vtu_result_status(total, external) = 'FAIL' THEN 0
+            ELSE {_boundary_case('points')}
+        END
+        """,
+        # Same rules as max_marks_for_subject_name
+        """
+        CREATE FUNCTION vtu_max_marks(subject_name VARCHAR(200), semester INT)
+        RETURNS INT DETERMINISTIC NO SQL
+        RETURN CASE
+            WHEN UPPER(subject_name) LIKE '%MAJOR PROJECT%'
+              OR UPPER(subject_name) LIKE '%INTERNSHIP%'
+              OR UPPER(subject_name) LIKE '%DISSERTATION%' THEN 200
+            WHEN semester = 8 AND UPPER(subject_name) LIKE '%MAJOR%' THEN 200
+            ELSE 100
+        END
+        """,
+        # calculate_sgpa + update_cgpa for one student-semester.
+        # SGPA / percentage are rounded from DOUBLE values like Python's round();
+        # CGPA is the DECIMAL mean rounded half-even in integer cents, like
+        # round(statistics.mean(...), 2).
+        """
+        CREATE PROCEDURE refresh_semester_summary(IN p_usn VARCHAR(20), IN p_semester INT)
+        MODIFIES SQL DATA
+        proc: BEGIN
+            DECLARE v_credits INT;
+            DECLARE v_points INT;
+            DECLARE v_obtained INT;
+            DECLARE v_maximum INT;
+            DECLARE v_backlogs INT;
+            DECLARE v_sgpa DOUBLE;
+            DECLARE v_percentage DOUBLE;
+            DECLARE v_class VARCHAR(10);
+            DECLARE v_sum_cents INT;
+            DECLARE v_count INT;
+            DECLARE v_quotient INT;
+            DECLARE v_remainder INT;
+
+            SELECT SUM(s.credits),
+                   SUM(COALESCE(r.grade_points, 0) * s.credits),
+                   SUM(COALESCE(r.total_marks, 0)),
+                   SUM(vtu_max_marks(s.subject_name, p_semester)),
+                   SUM(COALESCE(r.letter_grade = 'F' OR r.result_status = 'FAIL', 0))
+            INTO v_credits, v_points, v_obtained, v_maximum, v_backlogs
+            FROM results r
+            INNER JOIN (
+                SELECT subject_code, MAX(attempt_number) AS max_attempt
+                FROM results
+                WHERE student_usn = p_usn AND semester = p_semester
+                GROUP BY subject_code
+            ) latest ON r.subject_code = latest.subject_code
+                    AND r.attempt_number = latest.max_attempt
+            INNER JOIN subjects s ON r.subject_code = s.subject_code
+            WHERE r.student_usn = p_usn AND r.semester = p_semester
+            AND s.credits > 0;
+
+            -- No credit info: calculate_sgpa skips the student as well
+            IF v_credits IS NULL OR v_credits = 0 THEN
+                LEAVE proc;
+            END IF;
+
+            -- + 0E0 switches to DOUBLE arithmetic (INT / INT would be DECIMAL)
+            SET v_sgpa = ROUND((v_points + 0E0) / v_credits, 2);
+            SET v_percentage = IF(v_maximum > 0, ROUND(((v_obtained + 0E0) / v_maximum) * 100, 2), 0);
+            SET v_class = CASE
+                WHEN v_backlogs > 0 OR v_sgpa < 4.0 THEN 'F'
+                WHEN v_sgpa >= 7.75 THEN 'FCD'
+                WHEN v_sgpa >= 6.25 THEN 'FC'
+                WHEN v_sgpa >= 5.0 THEN 'SC'
+                ELSE 'P'
+            END;
+
+            INSERT INTO student_semester_summary
+            (student_usn, semester, sgpa, total_marks_obtained, total_marks_maximum,
+             percentage, total_credits, class_grade, has_backlogs, backlog_count)
+            VALUES (p_usn, p_semester, v_sgpa, v_obtained, v_maximum,
+                    v_percentage, v_credits, v_class, v_backlogs > 0, v_backlogs)
+            ON DUPLICATE KEY UPDATE
+                sgpa = VALUES(sgpa),
+                total_marks_obtained = VALUES(total_marks_obtained),
+                total_marks_maximum = VALUES(total_marks_maximum),
+                percentage = VALUES(percentage),
+                total_credits = VALUES(total_credits),
+                class_grade = VALUES(class_grade),
+                has_backlogs = VALUES(has_backlogs),
+                backlog_count = VALUES(backlog_count);
+
+            SELECT CAST(SUM(sgpa * 100) AS SIGNED), COUNT(*)
+            INTO v_sum_cents, v_count
+            FROM student_semester_summary
+            WHERE student_usn = p_usn;
+
+            SET v_quotient = v_sum_cents DIV v_count;
+            SET v_remainder = v_sum_cents MOD v_count;
+            IF 2 * v_remainder > v_count OR (2 * v_remainder = v_count AND v_quotient MOD 2 = 1) THEN
+                SET v_quotient = v_quotient + 1;
+            END IF;
+
+            UPDATE student_details
+            SET cgpa = v_quotient / 100
+            WHERE usn = p_usn
+            AND NOT (cgpa <=> v_quotient / 100);
+        END
+        """,
+    ]
+
+
+def trigger_definitions():
+    """CREATE statements for the four triggers on results"""
+    grade_body = """
+        BEGIN
+            DECLARE v_max_marks INT;
+            IF NEW.total_marks IS NOT NULL THEN
+                SET v_max_marks = COALESCE(
+                    (SELECT vtu_max_marks(subject_name, NEW.semester)
+                     FROM subjects WHERE subject_code = NEW.subject_code),
+                    100);
+                SET NEW.result_status = vtu_result_status(NEW.total_marks, NEW.external_marks);
+                SET NEW.letter_grade = vtu_letter_grade(NEW.total_marks, NEW.external_marks, v_max_marks);
+                SET NEW.grade_points = vtu_grade_points(NEW.total_marks, NEW.external_marks, v_max_marks);
+            END IF;
+        END
+    """
+    return [
+        f"CREATE TRIGGER results_grade_bi BEFORE INSERT ON results FOR EACH ROW {grade_body}",
+        f"CREATE TRIGGER results_grade_bu BEFORE UPDATE ON results FOR EACH ROW {grade_body}",
+        f"""
+        CREATE TRIGGER results_summary_ai AFTER INSERT ON results FOR EACH ROW
+        BEGIN
+            IF {DEFER_SUMMARY_VARIABLE} IS NULL THEN
+                CALL refresh_semester_summary(NEW.student_usn, NEW.semester);
+            END IF;
+        END
+        """,
+        # Only when something that feeds the summary changed
+        f"""
+        CREATE TRIGGER results_summary_au AFTER UPDATE ON results FOR EACH ROW
+        BEGIN
+            IF {DEFER_SUMMARY_VARIABLE} IS NULL AND NOT (OLD.total_marks <=> NEW.total_marks
+                    AND OLD.grade_points <=> NEW.grade_points
+                    AND OLD.letter_grade <=> NEW.letter_grade
+                    AND OLD.result_status <=> NEW.result_status
+                    AND OLD.attempt_number <=> NEW.attempt_number
+                    AND OLD.subject_code <=> NEW.subject_code
+                    AND OLD.student_usn <=> NEW.student_usn
+                    AND OLD.semester <=> NEW.semester) THEN
+                CALL refresh_semester_summary(NEW.student_usn, NEW.semester);
+                IF NOT (OLD.student_usn <=> NEW.student_usn AND OLD.semester <=> NEW.semester) THEN
+                    CALL refresh_semester_summary(OLD.student_usn, OLD.semester);
+                END IF;
+            END IF;
+        END
+        """,
+    ]
+
+
+# =============================================================================
+# INSTALL / UNINSTALL / STATUS
+# =============================================================================
+
+def uninstall(cursor, conn, verbose=True):
+    """Drop the triggers, procedure and functions (triggers first - they use the rest)"""
+    for name in TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for name in PROCEDURES:
+        cursor.execute(f"DROP PROCEDURE IF EXISTS {name}")
+    for name in FUNCTIONS:
+        cursor.execute(f"DROP FUNCTION IF EXISTS {name}")
+    conn.commit()
+    if verbose:
+        print(f"[SUCCESS] Removed {len(TRIGGERS)} triggers, {len(PROCEDURES)} procedure, {len(FUNCTIONS)} functions")
+
+
+def install(cursor, conn, verbose=True):
+    """(Re)create everything - safe to run again after changing the grading rules"""
+    uninstall(cursor, conn, verbose=False)
+    for statement in routine_definitions():
+        cursor.execute(statement)
+    for statement in trigger_definitions():
+        cursor.execute(statement)
+    conn.commit()
+    if verbose:
+        print(f"[SUCCESS] Installed grade triggers: {', '.join(TRIGGERS)}")
+        print("INFO Existing rows are unchanged - run recalculate_all_grades.py once to regrade them")
+
+
+def status(cursor):
+    """
+    Installed trigger / routine names
+
+    Returns:
+        {"triggers": [...], "routines": [...], "installed": bool}
+    """
+    placeholders = ", ".join(["%s"] * len(TRIGGERS))
+    cursor.execute(f"""
+        SELECT TRIGGER_NAME FROM information_schema.TRIGGERS
+        WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME IN ({placeholders})
+    """, TRIGGERS)
+    triggers = sorted(row[0] for row in cursor.fetchall())
+
+    routine_names = FUNCTIONS + PROCEDURES
+    placeholders = ", ".join(["%s"] * len(routine_names))
+    cursor.execute(f"""
+        SELECT ROUTINE_NAME FROM information_schema.ROUTINES
+        WHERE ROUTINE_SCHEMA = DATABASE() AND ROUTINE_NAME IN ({placeholders})
+    """, routine_names)
+    routines = sorted(row[0] for row in cursor.fetchall())
+
+    return {
+        "triggers": triggers,
+        "routines": routines,
+        "installed": len(triggers) == len(TRIGGERS) and len(routines) == len(routine_names),
+    }
+
+
+_installed_this_run = None
+_installed_lock = threading.Lock()
+
+
+def defer_summary_refresh(cursor):
+    """
+    For bulk writers: when the triggers are installed, stop the summary
+    triggers from firing for this session's writes (checked once per process)
+
+    Returns:
+        True when deferred - the caller must call refresh_summaries() for the
+        student-semesters it wrote once they are committed
+    """
+    global _installed_this_run
+    with _installed_lock:
+        if _installed_this_run is None:
+            try:
+                _installed_this_run = status(cursor)['installed']
+            except Exception:
+                _installed_this_run = False
+    if _installed_this_run:
+        cursor.execute(f"SET {DEFER_SUMMARY_VARIABLE} = 1")
+    return _installed_this_run
+
+
+def refresh_summaries(cursor, conn, student_semesters):
+    """refresh_semester_summary once per distinct (usn, semester), then commit"""
+    for usn, semester in sorted(set(student_semesters)):
+        cursor.callproc('refresh_semester_summary', (usn, semester))
+    conn.commit()
+
+
+def triggers_installed():
+    """
+    True when grades are maintained by the triggers (callers can skip the
+    post-scrape recalculation). False when not installed or on DB errors.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return False
+    cursor = conn.cursor()
+    try:
+        return status(cursor)['installed']
+    except Exception:
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+# =============================================================================
+# CLI INTERFACE
+# =============================================================================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compute grades inside MySQL with triggers')
+    parser.add_argument('command', choices=['install', 'uninstall', 'status'])
+
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        print("[ERROR] Database connection failed")
+        sys.exit(1)
+
+    cursor = conn.cursor()
+    try:
+        if args.command == 'install':
+            install(cursor, conn)
+        elif args.command == 'uninstall':
+            uninstall(cursor, conn)
+        else:
+            result = status(cursor)
+            print(f"Installed: {'yes' if result['installed'] else 'no'}")
+            print(f"Triggers: {', '.join(result['triggers']) or '-'}")
+            print(f"Routines: {', '.join(result['routines']) or '-'}")
+    except Exception as e:
+        conn.rollback()
+        print(f"\n[ERROR] {e}")
+        sys.exit(1)
+    finally:
+        cursor.close()
+        conn.close()
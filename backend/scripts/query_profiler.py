@@ -0,0 +1,237 @@
+"""
+DB QUERY PROFILER
+=================
+Opt-in instrumentation of the cursors handed out by db_config.
+
+Most of the time in the grade scripts, the migrations and the scraper write
+path goes into per-row queries issued from Python loops. With DB_PROFILE=1
+every connection from get_db_connection()/get_pooled_connection() is wrapped,
+and every statement is recorded under its normalized form (literals -> ?,
+IN lists collapsed), with its call count and total time (execute + fetch).
+
+A statement executed DB_PROFILE_N1_THRESHOLD times (default 50) from the same
+line of code is reported as an N+1 suspect - a query inside a loop that
+should be one batched query (IN (...), executemany, JOIN).
+
+At exit a report of the DB_PROFILE_TOP (default 15) most expensive
+statements and the N+1 suspects is printed.
+
+Usage:
+    DB_PROFILE=1 python calculate_grades.py --semester 5
+    DB_PROFILE=1 DB_PROFILE_TOP=30 python migrate_existing_data.py
+"""
+
+import atexit
+import os
+import re
+import sys
+import threading
+import time
+
+DEFAULT_TOP = 15
+DEFAULT_N1_THRESHOLD = 50
+
+# Frames from these files are skipped when looking for the calling line
+_INTERNAL_FILES = ('query_profiler.py', 'db_config.py')
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\([^)]*\)s|%s|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+",
+                          re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement):
+    """SQL with literals and placeholders as ?, IN/VALUES lists collapsed, whitespace squeezed"""
+    if isinstance(statement, (bytes, bytearray)):
+        statement = statement.decode(errors='replace')
+    sql = _STRING_LITERAL.sub('?', statement)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_LIST.sub(r'VALUES \1, ...', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def call_site():
+    """file:line of the code that issued the query (first frame outside the profiler/db_config)"""
+    frame = sys._getframe(1)
+    while frame is not None and os.path.basename(frame.f_code.co_filename) in _INTERNAL_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return '?'
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno}"
+
+
+class QueryProfiler:
+    """
+    Thread-safe per-statement call counts and timings
+
+    Args:
+        top: Statements listed in the report
+        n1_threshold: Executions from one call site that make an N+1 suspect
+    """
+
+    def __init__(self, top=DEFAULT_TOP, n1_threshold=DEFAULT_N1_THRESHOLD):
+        self.top = top
+        self.n1_threshold = max(2, n1_threshold)
+        self._lock = threading.Lock()
+        self._statements = {}    # sql -> {"calls", "seconds", "sites": {site: calls}}
+        self._started = time.perf_counter()
+
+    def wrap(self, connection):
+        """Connection whose cursors are profiled (None stays None)"""
+        if connection is None or isinstance(connection, ProfiledConnection):
+            return connection
+        return ProfiledConnection(connection, self)
+
+    def record(self, sql, seconds, site=None):
+        """Add one execution (site=None: extra time of the previous one, e.g. fetching)"""
+        with self._lock:
+            stats = self._statements.get(sql)
+            if stats is None:
+                stats = self._statements[sql] = {"calls": 0, "seconds": 0.0, "sites": {}}
+            stats['seconds'] += seconds
+            if site is not None:
+                stats['calls'] += 1
+                stats['sites'][site] = stats['sites'].get(site, 0) + 1
+
+    def n1_suspects(self):
+        """[(sql, site, calls, seconds)] for statements repeated from one call site, most calls first"""
+        suspects = []
+        with self._lock:
+            for sql, stats in self._statements.items():
+                for site, calls in stats['sites'].items():
+                    if calls >= self.n1_threshold:
+                        # Time of the statement split by the site's share of its calls
+                        suspects.append((sql, site, calls, stats['seconds'] * calls / stats['calls']))
+        return sorted(suspects, key=lambda suspect: suspect[2], reverse=True)
+
+    def report(self):
+        """Print the top-N statements by total time and the N+1 suspects"""
+        with self._lock:
+            statements = sorted(self._statements.items(), key=lambda item: item[1]['seconds'], reverse=True)
+        if not statements:
+            return
+        total_calls = sum(stats['calls'] for _, stats in statements)
+        total_seconds = sum(stats['seconds'] for _, stats in statements)
+        elapsed = time.perf_counter() - self._started
+
+        print(f"\n{'='*100}")
+        print(f"DB PROFILE - {total_calls} queries, {len(statements)} distinct, "
+              f"{total_seconds:.2f}s in the database of {elapsed:.2f}s run time")
+        print(f"{'='*100}")
+        print(f"  {'calls':>7}{'total s':>10}{'mean ms':>10}{'share':>7}  statement")
+        for sql, stats in statements[:self.top]:
+            mean_ms = stats['seconds'] / stats['calls'] * 1000 if stats['calls'] else 0.0
+            share = stats['seconds'] / total_seconds if total_seconds else 0.0
+            print(f"  {stats['calls']:>7}{stats['seconds']:>10.3f}{mean_ms:>10.2f}{share:>7.0%}  {sql[:160]}")
+
+        suspects = self.n1_suspects()
+        if suspects:
+            print(f"\nN+1 SUSPECTS (same statement >= {self.n1_threshold} times from one line - batch it)")
+            for sql, site, calls, seconds in suspects[:self.top]:
+                print(f"  {calls:>7}x {seconds:>8.3f}s  {site:<36} {sql[:120]}")
+        print(f"{'='*100}")
+
+
+class ProfiledCursor:
+    """Cursor proxy that records every execute (and the fetches after it)"""
+
+    def __init__(self, cursor, profiler):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._last_sql = None
+
+    def execute(self, operation, *args, **kwargs):
+        sql = normalize_sql(operation)
+        site = call_site()
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, *args, **kwargs)
+        finally:
+            self._last_sql = sql
+            self._profiler.record(sql, time.perf_counter() - start, site)
+
+    def executemany(self, operation, *args, **kwargs):
+        sql = normalize_sql(operation) + ' /* executemany */'
+        site = call_site()
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, *args, **kwargs)
+        finally:
+            self._last_sql = sql
+            self._profiler.record(sql, time.perf_counter() - start, site)
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return getattr(self._cursor, method)(*args)
+        finally:
+            if self._last_sql is not None:
+                self._profiler.record(self._last_sql, time.perf_counter() - start)
+
+    def fetchone(self):
+        return self._fetch('fetchone')
+
+    def fetchmany(self, *args):
+        return self._fetch('fetchmany', *args)
+
+    def fetchall(self):
+        return self._fetch('fetchall')
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ProfiledConnection:
+    """Connection proxy whose cursor() returns ProfiledCursor"""
+
+    def __init__(self, connection, profiler):
+        self._connection = connection
+        self._profiler = profiler
+
+    def cursor(self, *args, **kwargs):
+        return ProfiledCursor(self._connection.cursor(*args, **kwargs), self._profiler)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return self._connection.commit()
+        finally:
+            self._profiler.record('COMMIT', time.perf_counter() - start, call_site())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._connection.close()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def profiler_from_env():
+    """QueryProfiler (report registered at exit) when DB_PROFILE is set, else None"""
+    if os.getenv('DB_PROFILE', '').lower() not in ('1', 'true', 'yes', 'on'):
+        return None
+    profiler = QueryProfiler(
+        top=int(os.getenv('DB_PROFILE_TOP', DEFAULT_TOP)),
+        n1_threshold=int(os.getenv('DB_PROFILE_N1_THRESHOLD', DEFAULT_N1_THRESHOLD))
+    )
+    atexit.register(profiler.report)
+    print("DB PROFILE enabled - query report at exit")
+    return profiler
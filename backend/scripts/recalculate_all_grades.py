@@ -1,52 +1,223 @@
 """
 Run grade calculation for all semesters (1-8)
 This will update letter grades, grade points, result_status, SGPA, CGPA, and class grades
+
+Semesters are independent of each other (letter grades + SGPA only touch
+their own semester), so they run concurrently on a thread pool - each with
+its own pooled connection. CGPA depends on every semester's SGPA, so it is
+computed once at the end instead of after every semester.
+
+Usage:
+    python recalculate_all_grades.py                   # 4 semesters at a time
+    python recalculate_all_grades.py --workers 1       # One after another
+    python recalculate_all_grades.py --engine numpy
+    python recalculate_all_grades.py --dry-run         # Count changes, write nothing
 """
 
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
 
-from calculate_grades import calculate_grades_for_semester
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from calculate_grades import ENGINES, calculate_grades_for_semester, ensure_grade_engine_schema, update_cgpa
+from db_config import POOL_SIZE, get_pooled_connection
+
+SEMESTERS = range(1, 9)
+
+# Concurrent UPDATEs on neighbouring semesters can occasionally deadlock on
+# index gap locks - MySQL rolls one back, so the semester is simply retried
+DEADLOCK_RETRIES = 3
+
+
+def run_semester(semester, engine, dry_run=False):
+    """Grade one semester (without CGPA), retrying on deadlock"""
+    start = time.perf_counter()
+    for attempt in range(1, DEADLOCK_RETRIES + 1):
+        result = calculate_grades_for_semester(semester, verbose=False, engine=engine,
+                                               include_cgpa=False, pooled=True, dry_run=dry_run,
+                                               refresh_schema=False)
+        if result['success'] or 'Deadlock' not in result.get('error', ''):
+            break
+        print(f"⚠️  Semester {semester}: deadlock, retrying ({attempt}/{DEADLOCK_RETRIES})...")
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+
+def prepare_sql_engine():
+    """
+    Refresh the SQL engine's lookup data once, before the semesters fan out
+    (concurrent refreshes would contend for locks on subjects)
+    """
+    conn = get_pooled_connection()
+    if not conn:
+        return {"success": False, "error": "Database connection failed"}
+
+    cursor = conn.cursor()
+    try:
+        ensure_grade_engine_schema(cursor, conn)
+        return {"success": True}
+    except Exception as e:
+        conn.rollback()
+        return {"success": False, "error": str(e)}
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def run_cgpa(weighted=False, dry_run=False):
+    """Update CGPA for every student once all semesters are done"""
+    conn = get_pooled_connection()
+    if not conn:
+        return {"success": False, "error": "Database connection failed"}
+
+    cursor = conn.cursor()
+    start = time.perf_counter()
+    try:
+        diff = update_cgpa(cursor, conn, weighted=weighted, dry_run=dry_run)
+        return {"success": True, "diff": diff, "elapsed": time.perf_counter() - start}
+    except Exception as e:
+        conn.rollback()
+        return {"success": False, "error": str(e), "elapsed": time.perf_counter() - start}
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def print_timing_table(results, cgpa_result, wall_time):
+    """Per-semester timing table"""
+    steps = []
+    for _, result in results:
+        for step in result.get('timings', {}):
+            if step not in steps:
+                steps.append(step)
+
+    header = f"{'Sem':<5}{'Status':<8}" + "".join(f"{step:>16}" for step in steps) + f"{'Total':>10}"
+    print(header)
+    print("-" * len(header))
+    for semester, result in sorted(results):
+        status = 'OK' if result['success'] else 'FAIL'
+        timings = result.get('timings', {})
+        cells = "".join(
+            f"{timings[step]:>15.2f}s" if step in timings else f"{'-':>16}" for step in steps
+        )
+        print(f"{semester:<5}{status:<8}{cells}{result['elapsed']:>9.2f}s")
+    print("-" * len(header))
+    print(f"{'CGPA':<5}{'OK' if cgpa_result['success'] else 'FAIL':<8}"
+          f"{'':>{16 * len(steps)}}{cgpa_result.get('elapsed', 0):>9.2f}s")
+    print(f"Wall time: {wall_time:.2f}s "
+          f"(sum of semesters: {sum(r['elapsed'] for _, r in results):.2f}s)")
+
+
+def print_diff_summary(results, cgpa_result, dry_run):
+    """Rows changed vs. unchanged per step, summed over semesters"""
+    totals = {}
+    for _, result in results:
+        for step, counts in result.get('diff', {}).items():
+            total = totals.setdefault(step, {"rows": 0, "changed": 0, "known": True})
+            total['changed'] += counts['changed']
+            if counts['rows'] is None:
+                total['known'] = False
+            else:
+                total['rows'] += counts['rows']
+    if cgpa_result.get('diff'):
+        totals['cgpa'] = dict(cgpa_result['diff'], known=True)
 
-def run_all_semesters():
+    verb = "would change" if dry_run else "changed"
+    for step, total in totals.items():
+        of_rows = f" of {total['rows']}" if total['known'] else ""
+        print(f"  {step:<15} {total['changed']}{of_rows} rows {verb}")
+    time_saved = sum(r.get('estimated_time_saved', 0) for _, r in results)
+    print(f"  Estimated time saved by skipping unchanged rows: {time_saved:.2f}s")
+
+
+def run_all_semesters(workers=4, engine='python', weighted_cgpa=False, dry_run=False):
     """Run grade calculation for all semesters"""
+    # Each running semester holds a pooled connection, and an exhausted pool
+    # raises instead of waiting - never run more semesters than it has connections
+    limit = min(POOL_SIZE, len(SEMESTERS))
+    if workers > limit:
+        print(f"⚠️  --workers {workers} limited to {limit} (MYSQL_POOL_SIZE={POOL_SIZE}, {len(SEMESTERS)} semesters)")
+        workers = limit
+
     print("\n" + "="*80)
-    print("RUNNING GRADE CALCULATION FOR ALL SEMESTERS")
+    print("RUNNING GRADE CALCULATION FOR ALL SEMESTERS" + (" (DRY RUN)" if dry_run else ""))
+    print(f"Engine: {engine} - Parallel semesters: {workers}")
     print("="*80)
-    
+
+    wall_start = time.perf_counter()
+    if engine == 'sql' and not dry_run:
+        prepared = prepare_sql_engine()
+        if not prepared['success']:
+            print(f"❌ SQL engine lookup data could not be prepared: {prepared['error']}")
+            return False
+
     results = []
-    for semester in range(1, 9):
-        print(f"\n\n{'#'*80}")
-        print(f"# PROCESSING SEMESTER {semester}")
-        print(f"{'#'*80}")
-        
-        result = calculate_grades_for_semester(semester, verbose=True)
-        results.append((semester, result))
-        
-        if not result['success']:
-            print(f"⚠️  Warning: Semester {semester} had errors: {result.get('error', 'Unknown')}")
-    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        future_to_semester = {
+            executor.submit(run_semester, semester, engine, dry_run): semester
+            for semester in SEMESTERS
+        }
+
+        for future in as_completed(future_to_semester):
+            semester = future_to_semester[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"success": False, "error": str(e), "elapsed": 0.0}
+            results.append((semester, result))
+
+            if result['success']:
+                print(f"✅ Semester {semester} done in {result['elapsed']:.2f}s")
+            else:
+                print(f"⚠️  Warning: Semester {semester} had errors: {result.get('error', 'Unknown')}")
+
+    # CGPA once, after every semester's SGPA is in place
+    print(f"\nUpdating CGPA for all students...")
+    cgpa_result = run_cgpa(weighted_cgpa, dry_run)
+    if not cgpa_result['success']:
+        print(f"⚠️  Warning: CGPA update failed: {cgpa_result.get('error', 'Unknown')}")
+
+    wall_time = time.perf_counter() - wall_start
+
     # Summary
     print("\n\n" + "="*80)
     print("FINAL SUMMARY")
     print("="*80)
-    
+
+    print_timing_table(results, cgpa_result, wall_time)
+    print()
+    print_diff_summary(results, cgpa_result, dry_run)
+
     successful = [r for r in results if r[1]['success']]
     failed = [r for r in results if not r[1]['success']]
-    
-    print(f"✅ Successfully processed: {len(successful)} semesters")
+
+    print(f"\n✅ Successfully processed: {len(successful)} semesters")
     if failed:
         print(f"❌ Failed: {len(failed)} semesters")
-        for sem, result in failed:
+        for sem, result in sorted(failed):
             print(f"   Semester {sem}: {result.get('error', 'Unknown error')}")
-    
+
     print("\n" + "="*80)
     print("ALL DONE!")
     print("="*80)
-    
-    return len(failed) == 0
+
+    return len(failed) == 0 and cgpa_result['success']
 
 if __name__ == '__main__':
-    success = run_all_semesters()
+    parser = argparse.ArgumentParser(description='Recalculate grades for all semesters')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Semesters processed in parallel (default 4, at most MYSQL_POOL_SIZE and 8)')
+    parser.add_argument('--engine', choices=ENGINES, default='python', help='Grade engine')
+    parser.add_argument('--weighted-cgpa', action='store_true',
+                        help='Credit-weighted CGPA (uses total_credits) instead of mean of SGPAs')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only report how many rows would change (nothing is written)')
+
+    args = parser.parse_args()
+
+    success = run_all_semesters(workers=max(1, args.workers), engine=args.engine,
+                                weighted_cgpa=args.weighted_cgpa, dry_run=args.dry_run)
     sys.exit(0 if success else 1)
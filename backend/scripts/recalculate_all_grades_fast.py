@@ -6,15 +6,35 @@ Ultra-fast version that processes all students in batches using bulk SQL operati
 Speed improvements:
 - Single query to fetch all results
 - Batch updates instead of individual queries
+- Only rows whose values changed are written (unchanged rows are skipped)
 - Processes 200+ students in seconds instead of minutes
+
+Streaming mode (--stream) reads the same rows through an unbuffered cursor
+ordered by (usn, semester) and handles one student-semester at a time, so
+memory stays flat no matter how many results are stored. Updates go out on a
+second connection in fixed-size batches.
+
+Usage:
+    python recalculate_all_grades_fast.py              # Recalculate and write changes
+    python recalculate_all_grades_fast.py --dry-run    # Report what would change, write nothing
+    python recalculate_all_grades_fast.py --stream --batch-size 1000
 """
 
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
 
+import argparse
+from itertools import groupby
+
 from db_config import get_db_connection
-from statistics import mean
+from run_profiler import add_profile_arguments, profile_from_args
+from calculate_grades import (
+    load_stored_summaries,
+    measure_round_trip,
+    normalize_stored_summary,
+    summary_changed,
+)
 
 def get_letter_grade(total_marks, max_marks=100):
     """Convert total marks to letter grade"""
@@ -45,206 +65,457 @@ def get_class_grade(sgpa, has_backlogs):
     elif sgpa >= 5.0: return 'SC'
     else: return 'P'
 
-def fast_recalculate_all_grades():
-    """Ultra-fast batch recalculation using bulk SQL operations"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+# Rows touched by the Step 1 data fixes
+CORRUPTED_TOTAL_WHERE = """
+    WHERE total_marks = 0
+    AND internal_marks IS NOT NULL
+    AND external_marks IS NOT NULL
+    AND internal_marks > 0
+    AND external_marks > 0
+"""
+BAD_STATUS_WHERE = """
+    WHERE result_status NOT IN ('PASS', 'FAIL', 'REVALUATION', 'WITHHELD', 'ABSENT')
+"""
+
+# Rows flushed per statement in streaming mode
+DEFAULT_BATCH_SIZE = 1000
+
+# Latest attempts with credits - {extra_columns}/{extra_joins} let streaming
+# mode pull the stored semester summary in the same pass
+RESULTS_QUERY = """
+    SELECT
+        r.result_id,
+        r.student_usn,
+        r.semester,
+        r.subject_code,
+        r.internal_marks,
+        r.external_marks,
+        r.total_marks,
+        r.attempt_number,
+        r.letter_grade AS stored_letter_grade,
+        r.grade_points AS stored_grade_points,
+        r.result_status AS stored_result_status,
+        COALESCE(s.credits,
+            CASE
+                WHEN r.subject_code LIKE '%L' THEN 3
+                WHEN s.subject_name LIKE '%LAB%' THEN 3
+                WHEN r.subject_code LIKE 'BNSK%' OR r.subject_code LIKE 'BUHK%' THEN 2
+                ELSE 4
+            END
+        ) as credits,
+        s.subject_name{extra_columns}
+    FROM results r
+    LEFT JOIN subjects s ON r.subject_code = s.subject_code{extra_joins}
+    WHERE r.attempt_number = (
+        SELECT MAX(r2.attempt_number)
+        FROM results r2
+        WHERE r2.student_usn = r.student_usn
+        AND r2.subject_code = r.subject_code
+        AND r2.semester = r.semester
+    )
+    ORDER BY r.student_usn, r.semester, r.subject_code
+"""
+
+STORED_SUMMARY_COLUMNS = """,
+        ss.sgpa AS stored_sgpa,
+        ss.total_marks_obtained AS stored_total_marks_obtained,
+        ss.total_marks_maximum AS stored_total_marks_maximum,
+        ss.percentage AS stored_percentage,
+        ss.total_credits AS stored_total_credits,
+        ss.class_grade AS stored_class_grade,
+        ss.has_backlogs AS stored_has_backlogs,
+        ss.backlog_count AS stored_backlog_count,
+        ss.student_usn AS stored_summary_usn"""
+
+STORED_SUMMARY_JOIN = """
+    LEFT JOIN student_semester_summary ss
+           ON ss.student_usn = r.student_usn AND ss.semester = r.semester"""
+
+GRADE_UPDATE_SQL = """
+    UPDATE results
+    SET letter_grade = %s, grade_points = %s, result_status = %s
+    WHERE result_id = %s
+"""
+
+SUMMARY_UPSERT_SQL = """
+    INSERT INTO student_semester_summary
+    (student_usn, semester, sgpa, total_marks_obtained, total_marks_maximum,
+     percentage, total_credits, class_grade, has_backlogs, backlog_count)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        sgpa = VALUES(sgpa),
+        total_marks_obtained = VALUES(total_marks_obtained),
+        total_marks_maximum = VALUES(total_marks_maximum),
+        percentage = VALUES(percentage),
+        total_credits = VALUES(total_credits),
+        class_grade = VALUES(class_grade),
+        has_backlogs = VALUES(has_backlogs),
+        backlog_count = VALUES(backlog_count),
+        calculated_at = CURRENT_TIMESTAMP
+"""
+
+
+# =============================================================================
+# PER-ROW / PER-GROUP CALCULATION (shared by batch and streaming mode)
+# =============================================================================
+
+def grade_result(result):
+    """
+    Grade one latest-attempt row
     
-    try:
-        print(f"\n{'='*80}")
-        print(f"🚀 FAST BATCH GRADE RECALCULATION")
-        print(f"{'='*80}\n")
-        
-        # =====================================================================
-        # STEP 1: Fix corrupted data (Rajarshi Datta & similar issues)
-        # =====================================================================
-        print("Step 1: Fixing corrupted revaluation data...")
-        
-        cursor.execute("""
-            UPDATE results
-            SET total_marks = internal_marks + external_marks
-            WHERE total_marks = 0 
-            AND internal_marks IS NOT NULL 
-            AND external_marks IS NOT NULL
-            AND internal_marks > 0 
-            AND external_marks > 0
-        """)
-        fixed_corrupted = cursor.rowcount
-        print(f"  ✓ Fixed {fixed_corrupted} corrupted total_marks entries")
+    Returns:
+        (letter_grade, grade_points, result_status, max_marks)
+    """
+    total_marks = result['total_marks']
+    external = result['external_marks'] or 0
+    
+    # Determine max marks (200 for major projects, 100 for others)
+    subject_name_upper = (result['subject_name'] or '').upper()
+    if 'MAJOR PROJECT' in subject_name_upper or 'INTERNSHIP' in subject_name_upper:
+        max_marks = 200
+    else:
+        max_marks = 100
+    
+    # Determine pass/fail status
+    if external == 0:  # Internal-only
+        result_status = 'PASS' if total_marks >= 40 else 'FAIL'
+    else:
+        result_status = 'PASS' if (external >= 18 and total_marks >= 40) else 'FAIL'
+    
+    # Calculate grade
+    letter_grade = get_letter_grade(total_marks, max_marks)
+    grade_points = get_grade_points(letter_grade)
+    
+    # Override to F if failed
+    if result_status == 'FAIL':
+        letter_grade = 'F'
+        grade_points = 0
+    
+    return letter_grade, grade_points, result_status, max_marks
+
+
+def grade_changed(result, letter_grade, grade_points, result_status):
+    """True when the computed grade differs from the stored one"""
+    return (letter_grade, grade_points, result_status) != (
+        result['stored_letter_grade'], result['stored_grade_points'], result['stored_result_status'])
+
+
+def summarize_semester(usn, semester, subjects):
+    """
+    SGPA, percentage and class grade for one student-semester
+    
+    Returns:
+        Upsert row (the 10 values of SUMMARY_UPSERT_SQL)
+    """
+    total_credits = sum(s['credits'] for s in subjects)
+    total_grade_points = sum(s['grade_points'] * s['credits'] for s in subjects)
+    total_marks_obtained = sum(s['total_marks'] for s in subjects)
+    total_marks_maximum = sum(s['max_marks'] for s in subjects)
+    # Same rule as calculate_sgpa: a PASS below 35% (200-mark projects) still grades F
+    backlog_count = sum(1 for s in subjects if s['letter_grade'] == 'F' or s['result_status'] == 'FAIL')
+    has_backlogs = backlog_count > 0
+    
+    sgpa = round(total_grade_points / total_credits, 2) if total_credits > 0 else 0.0
+    percentage = round((total_marks_obtained / total_marks_maximum) * 100, 2) if total_marks_maximum > 0 else 0.0
+    class_grade = get_class_grade(sgpa, has_backlogs)
+    
+    return (
+        usn, semester, sgpa, total_marks_obtained, total_marks_maximum,
+        percentage, total_credits, class_grade, has_backlogs, backlog_count
+    )
+
+
+# =============================================================================
+# STEPS 2-4: BATCH MODE (everything in memory)
+# =============================================================================
+
+def batch_grades_and_sgpa(conn, cursor, plain_cursor, dry_run):
+    """Fetch every latest attempt at once, grade, then write all changed rows"""
+    verb = "Would update" if dry_run else "Updated"
+    
+    # =====================================================================
+    # STEP 2: Fetch ALL results (latest attempts only) in ONE query
+    # =====================================================================
+    print("\nStep 2: Fetching all student results...")
+    
+    cursor.execute(RESULTS_QUERY.format(extra_columns="", extra_joins=""))
+    
+    all_results = cursor.fetchall()
+    total_results = len(all_results)
+    print(f"  ✓ Fetched {total_results} results (latest attempts)")
+    
+    # =====================================================================
+    # STEP 3: Batch calculate grades for all results
+    # =====================================================================
+    print("\nStep 3: Calculating grades in batch...")
+    
+    grade_updates = []
+    student_semesters = {}  # Group by (usn, semester) for SGPA calculation
+    
+    for result in all_results:
+        letter_grade, grade_points, result_status, max_marks = grade_result(result)
         
-        # Fix result_status that are numbers (should be PASS/FAIL)
-        cursor.execute("""
-            UPDATE results
-            SET result_status = CASE
-                WHEN external_marks = 0 THEN 
-                    CASE WHEN total_marks >= 40 THEN 'PASS' ELSE 'FAIL' END
-                ELSE 
-                    CASE WHEN external_marks >= 18 AND total_marks >= 40 THEN 'PASS' ELSE 'FAIL' END
-            END
-            WHERE result_status NOT IN ('PASS', 'FAIL', 'REVALUATION', 'WITHHELD', 'ABSENT')
-        """)
-        fixed_status = cursor.rowcount
-        print(f"  ✓ Fixed {fixed_status} incorrect result_status entries")
+        # Add to batch update (only if something changed)
+        if grade_changed(result, letter_grade, grade_points, result_status):
+            grade_updates.append((letter_grade, grade_points, result_status, result['result_id']))
         
+        # Group for SGPA calculation
+        key = (result['student_usn'], result['semester'])
+        if key not in student_semesters:
+            student_semesters[key] = []
+        student_semesters[key].append({
+            'total_marks': result['total_marks'],
+            'max_marks': max_marks,
+            'grade_points': grade_points,
+            'credits': result['credits'],
+            'result_status': result_status,
+            'letter_grade': letter_grade
+        })
+    
+    # Batch update changed grades
+    unchanged_grades = total_results - len(grade_updates)
+    print(f"  ✓ Calculated grades for {total_results} results "
+          f"({len(grade_updates)} changed, {unchanged_grades} unchanged)")
+    
+    updated_grades = len(grade_updates)
+    if grade_updates and not dry_run:
+        print(f"  ⚡ Executing batch update...")
+        cursor.executemany(GRADE_UPDATE_SQL, grade_updates)
+        updated_grades = cursor.rowcount
         conn.commit()
+    print(f"  ✓ {verb} {updated_grades} result grades")
+    
+    # =====================================================================
+    # STEP 4: Calculate SGPA for all student-semester combinations
+    # =====================================================================
+    print(f"\nStep 4: Calculating SGPA for {len(student_semesters)} student-semester combinations...")
+    
+    sgpa_updates = [summarize_semester(usn, semester, subjects)
+                    for (usn, semester), subjects in student_semesters.items()]
+    
+    # Only student-semesters whose stored summary differs
+    stored_summaries = load_stored_summaries(plain_cursor)
+    sgpa_updates = [row for row in sgpa_updates if summary_changed(row, stored_summaries)]
+    unchanged_sgpa = len(student_semesters) - len(sgpa_updates)
+    print(f"  ✓ {len(sgpa_updates)} changed, {unchanged_sgpa} unchanged")
+    
+    updated_sgpa = len(sgpa_updates)
+    if sgpa_updates and not dry_run:
+        print(f"  ⚡ Executing batch SGPA update...")
+        cursor.executemany(SUMMARY_UPSERT_SQL, sgpa_updates)
+        conn.commit()
+    print(f"  ✓ {verb} SGPA for {updated_sgpa} student-semesters")
+    
+    # executemany sends the grade UPDATEs one statement per row;
+    # the summary upsert (VALUES() only, no extra placeholders after them)
+    # is rewritten into a single multi-row statement
+    return {
+        "updated_grades": updated_grades,
+        "unchanged_grades": unchanged_grades,
+        "updated_sgpa": updated_sgpa,
+        "unchanged_sgpa": unchanged_sgpa,
+        "round_trips_saved": unchanged_grades + (0 if sgpa_updates else 1),
+    }
+
+
+# =============================================================================
+# STEPS 2-4: STREAMING MODE (one student-semester at a time)
+# =============================================================================
+
+def stream_grades_and_sgpa(conn, dry_run, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Same results as batch_grades_and_sgpa with memory bounded by batch_size
+    
+    - Unbuffered cursor: rows arrive from the server as they are consumed
+    - ORDER BY (usn, semester) + groupby: only the current student-semester
+      is held in memory; its stored summary comes along in the same row
+    - Changed grades / summaries are flushed every batch_size rows on a
+      second connection (the read connection is busy until the stream ends)
+    """
+    verb = "Would update" if dry_run else "Updated"
+    
+    print(f"\nSteps 2-4: Streaming results (batches of {batch_size})...")
+    
+    write_conn = None
+    write_cursor = None
+    if not dry_run:
+        write_conn = get_db_connection()
+        if not write_conn:
+            raise RuntimeError("Could not open the write connection for streaming mode")
+        write_cursor = write_conn.cursor()
+    
+    read_cursor = conn.cursor(dictionary=True, buffered=False)
+    
+    stats = {
+        "results": 0,
+        "groups": 0,
+        "updated_grades": 0,
+        "unchanged_grades": 0,
+        "updated_sgpa": 0,
+        "unchanged_sgpa": 0,
+        "flushes": 0,
+        "largest_group": 0,
+    }
+    grade_batch = []
+    summary_batch = []
+    
+    def flush(force=False):
+        """Write the pending batches (when full, or everything when forced)"""
+        if grade_batch and (force or len(grade_batch) >= batch_size):
+            if not dry_run:
+                write_cursor.executemany(GRADE_UPDATE_SQL, grade_batch)
+                write_conn.commit()
+                stats['flushes'] += 1
+            grade_batch.clear()
+        if summary_batch and (force or len(summary_batch) >= batch_size):
+            if not dry_run:
+                write_cursor.executemany(SUMMARY_UPSERT_SQL, summary_batch)
+                write_conn.commit()
+                stats['flushes'] += 1
+            summary_batch.clear()
+    
+    try:
+        read_cursor.execute(RESULTS_QUERY.format(extra_columns=STORED_SUMMARY_COLUMNS,
+                                                 extra_joins=STORED_SUMMARY_JOIN))
         
-        # =====================================================================
-        # STEP 2: Fetch ALL results (latest attempts only) in ONE query
-        # =====================================================================
-        print("\nStep 2: Fetching all student results...")
-        
-        cursor.execute("""
-            SELECT 
-                r.result_id,
-                r.student_usn,
-                r.semester,
-                r.subject_code,
-                r.internal_marks,
-                r.external_marks,
-                r.total_marks,
-                r.attempt_number,
-                COALESCE(s.credits, 
-                    CASE 
-                        WHEN r.subject_code LIKE '%L' THEN 3
-                        WHEN s.subject_name LIKE '%LAB%' THEN 3
-                        WHEN r.subject_code LIKE 'BNSK%' OR r.subject_code LIKE 'BUHK%' THEN 2
-                        ELSE 4
-                    END
-                ) as credits,
-                s.subject_name
-            FROM results r
-            LEFT JOIN subjects s ON r.subject_code = s.subject_code
-            WHERE r.attempt_number = (
-                SELECT MAX(r2.attempt_number)
-                FROM results r2
-                WHERE r2.student_usn = r.student_usn
-                AND r2.subject_code = r.subject_code
-                AND r2.semester = r.semester
-            )
-            ORDER BY r.student_usn, r.semester, r.subject_code
-        """)
-        
-        all_results = cursor.fetchall()
-        total_results = len(all_results)
-        print(f"  ✓ Fetched {total_results} results (latest attempts)")
-        
-        # =====================================================================
-        # STEP 3: Batch calculate grades for all results
-        # =====================================================================
-        print("\nStep 3: Calculating grades in batch...")
-        
-        grade_updates = []
-        student_semesters = {}  # Group by (usn, semester) for SGPA calculation
-        
-        for result in all_results:
-            result_id = result['result_id']
-            usn = result['student_usn']
-            semester = result['semester']
-            total_marks = result['total_marks']
-            internal = result['internal_marks'] or 0
-            external = result['external_marks'] or 0
-            credits = result['credits']
-            
-            # Determine max marks (200 for major projects, 100 for others)
-            subject_name_upper = (result['subject_name'] or '').upper()
-            if 'MAJOR PROJECT' in subject_name_upper or 'INTERNSHIP' in subject_name_upper:
-                max_marks = 200
-            else:
-                max_marks = 100
+        for (usn, semester), rows in groupby(read_cursor, key=lambda r: (r['student_usn'], r['semester'])):
+            subjects = []
+            stored = {}
+            for result in rows:
+                if not stored and result['stored_summary_usn'] is not None:
+                    stored[(usn, semester)] = normalize_stored_summary(
+                        result['stored_sgpa'], result['stored_total_marks_obtained'],
+                        result['stored_total_marks_maximum'], result['stored_percentage'],
+                        result['stored_total_credits'], result['stored_class_grade'],
+                        result['stored_has_backlogs'], result['stored_backlog_count'])
+                
+                letter_grade, grade_points, result_status, max_marks = grade_result(result)
+                if grade_changed(result, letter_grade, grade_points, result_status):
+                    grade_batch.append((letter_grade, grade_points, result_status, result['result_id']))
+                    stats['updated_grades'] += 1
+                else:
+                    stats['unchanged_grades'] += 1
+                
+                subjects.append({
+                    'total_marks': result['total_marks'],
+                    'max_marks': max_marks,
+                    'grade_points': grade_points,
+                    'credits': result['credits'],
+                    'result_status': result_status,
+                    'letter_grade': letter_grade
+                })
             
-            # Determine pass/fail status
-            if external == 0:  # Internal-only
-                result_status = 'PASS' if total_marks >= 40 else 'FAIL'
+            summary = summarize_semester(usn, semester, subjects)
+            if summary_changed(summary, stored):
+                summary_batch.append(summary)
+                stats['updated_sgpa'] += 1
             else:
-                result_status = 'PASS' if (external >= 18 and total_marks >= 40) else 'FAIL'
-            
-            # Calculate grade
-            letter_grade = get_letter_grade(total_marks, max_marks)
-            grade_points = get_grade_points(letter_grade)
+                stats['unchanged_sgpa'] += 1
             
-            # Override to F if failed
-            if result_status == 'FAIL':
-                letter_grade = 'F'
-                grade_points = 0
+            stats['results'] += len(subjects)
+            stats['groups'] += 1
+            stats['largest_group'] = max(stats['largest_group'], len(subjects))
+            flush()
             
-            # Add to batch update
-            grade_updates.append((letter_grade, grade_points, result_status, result_id))
-            
-            # Group for SGPA calculation
-            key = (usn, semester)
-            if key not in student_semesters:
-                student_semesters[key] = []
-            student_semesters[key].append({
-                'total_marks': total_marks,
-                'max_marks': max_marks,
-                'grade_points': grade_points,
-                'credits': credits,
-                'result_status': result_status,
-                'letter_grade': letter_grade
-            })
-        
-        # Batch update all grades
-        print(f"  ✓ Calculated grades for {len(grade_updates)} results")
-        print(f"  ⚡ Executing batch update...")
-        
-        cursor.executemany("""
-            UPDATE results
-            SET letter_grade = %s, grade_points = %s, result_status = %s
-            WHERE result_id = %s
-        """, grade_updates)
+            if stats['groups'] % 1000 == 0:
+                print(f"  Processed {stats['groups']} student-semesters ({stats['results']} results)...")
         
-        updated_grades = cursor.rowcount
-        print(f"  ✓ Updated {updated_grades} result grades")
-        conn.commit()
+        flush(force=True)
+    finally:
+        read_cursor.close()
+        if write_conn:
+            write_cursor.close()
+            write_conn.close()
+    
+    print(f"  ✓ Streamed {stats['results']} results in {stats['groups']} student-semesters "
+          f"(largest group: {stats['largest_group']} rows)")
+    print(f"  ✓ {verb} {stats['updated_grades']} result grades ({stats['unchanged_grades']} unchanged)")
+    print(f"  ✓ {verb} SGPA for {stats['updated_sgpa']} student-semesters ({stats['unchanged_sgpa']} unchanged)")
+    if not dry_run:
+        print(f"  ✓ {stats['flushes']} batch writes")
+    
+    # Grade UPDATEs go one statement per row; each summary flush is one statement
+    summary_statements = -(-(stats['updated_sgpa'] + stats['unchanged_sgpa']) // batch_size)
+    written_statements = -(-stats['updated_sgpa'] // batch_size)
+    stats['round_trips_saved'] = stats['unchanged_grades'] + summary_statements - written_statements
+    return stats
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def fast_recalculate_all_grades(dry_run=False, stream=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Ultra-fast batch recalculation using bulk SQL operations
+    
+    Computed grades, summaries and CGPAs are compared with the stored values
+    and only rows that differ are written. With dry_run nothing is written -
+    the diff counts and the estimated time saved are reported instead.
+    stream=True processes results one student-semester at a time with
+    constant memory (see stream_grades_and_sgpa).
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    plain_cursor = conn.cursor()
+    
+    verb = "Would update" if dry_run else "Updated"
+    
+    try:
+        print(f"\n{'='*80}")
+        print(f"🚀 FAST BATCH GRADE RECALCULATION"
+              + (" (STREAMING)" if stream else "")
+              + (" (DRY RUN - nothing is written)" if dry_run else ""))
+        print(f"{'='*80}\n")
         
         # =====================================================================
-        # STEP 4: Calculate SGPA for all student-semester combinations
+        # STEP 1: Fix corrupted data (Rajarshi Datta & similar issues)
         # =====================================================================
-        print(f"\nStep 4: Calculating SGPA for {len(student_semesters)} student-semester combinations...")
-        
-        sgpa_updates = []
+        print("Step 1: Fixing corrupted revaluation data...")
         
-        for (usn, semester), subjects in student_semesters.items():
-            total_credits = sum(s['credits'] for s in subjects)
-            total_grade_points = sum(s['grade_points'] * s['credits'] for s in subjects)
-            total_marks_obtained = sum(s['total_marks'] for s in subjects)
-            total_marks_maximum = sum(s['max_marks'] for s in subjects)
-            backlog_count = sum(1 for s in subjects if s['result_status'] == 'FAIL')
-            has_backlogs = backlog_count > 0
+        if dry_run:
+            # Count only - later steps see the marks as currently stored
+            cursor.execute(f"SELECT COUNT(*) AS n FROM results {CORRUPTED_TOTAL_WHERE}")
+            fixed_corrupted = cursor.fetchone()['n']
+            cursor.execute(f"SELECT COUNT(*) AS n FROM results {BAD_STATUS_WHERE}")
+            fixed_status = cursor.fetchone()['n']
+            print(f"  ✓ Would fix {fixed_corrupted} corrupted total_marks entries")
+            print(f"  ✓ Would fix {fixed_status} incorrect result_status entries")
+        else:
+            cursor.execute(f"""
+                UPDATE results
+                SET total_marks = internal_marks + external_marks
+                {CORRUPTED_TOTAL_WHERE}
+            """)
+            fixed_corrupted = cursor.rowcount
+            print(f"  ✓ Fixed {fixed_corrupted} corrupted total_marks entries")
             
-            sgpa = round(total_grade_points / total_credits, 2) if total_credits > 0 else 0.0
-            percentage = round((total_marks_obtained / total_marks_maximum) * 100, 2) if total_marks_maximum > 0 else 0.0
-            class_grade = get_class_grade(sgpa, has_backlogs)
+            # Fix result_status that are numbers (should be PASS/FAIL)
+            cursor.execute(f"""
+                UPDATE results
+                SET result_status = CASE
+                    WHEN external_marks = 0 THEN
+                        CASE WHEN total_marks >= 40 THEN 'PASS' ELSE 'FAIL' END
+                    ELSE
+                        CASE WHEN external_marks >= 18 AND total_marks >= 40 THEN 'PASS' ELSE 'FAIL' END
+                END
+                {BAD_STATUS_WHERE}
+            """)
+            fixed_status = cursor.rowcount
+            print(f"  ✓ Fixed {fixed_status} incorrect result_status entries")
             
-            sgpa_updates.append((
-                usn, semester, sgpa, total_marks_obtained, total_marks_maximum,
-                percentage, total_credits, class_grade, has_backlogs, backlog_count,
-                # For UPDATE clause
-                sgpa, total_marks_obtained, total_marks_maximum,
-                percentage, total_credits, class_grade, has_backlogs, backlog_count
-            ))
-        
-        print(f"  ⚡ Executing batch SGPA update...")
-        cursor.executemany("""
-            INSERT INTO student_semester_summary 
-            (student_usn, semester, sgpa, total_marks_obtained, total_marks_maximum,
-             percentage, total_credits, class_grade, has_backlogs, backlog_count)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                sgpa = %s,
-                total_marks_obtained = %s,
-                total_marks_maximum = %s,
-                percentage = %s,
-                total_credits = %s,
-                class_grade = %s,
-                has_backlogs = %s,
-                backlog_count = %s,
-                calculated_at = CURRENT_TIMESTAMP
-        """, sgpa_updates)
+            conn.commit()
         
-        updated_sgpa = cursor.rowcount
-        print(f"  ✓ Updated SGPA for {updated_sgpa} student-semesters")
-        conn.commit()
+        # =====================================================================
+        # STEPS 2-4: Grades + SGPA
+        # =====================================================================
+        if stream:
+            stats = stream_grades_and_sgpa(conn, dry_run, batch_size)
+            # End the streaming SELECT's snapshot so Step 5 sees the summaries
+            # committed on the write connection
+            conn.commit()
+        else:
+            stats = batch_grades_and_sgpa(conn, cursor, plain_cursor, dry_run)
         
         # =====================================================================
         # STEP 5: Calculate CGPA for all students
@@ -252,39 +523,55 @@ def fast_recalculate_all_grades():
         print("\nStep 5: Calculating CGPA for all students...")
         
         cursor.execute("""
-            SELECT student_usn, AVG(sgpa) as cgpa
-            FROM student_semester_summary
-            GROUP BY student_usn
+            SELECT ss.student_usn, AVG(ss.sgpa) as cgpa, d.cgpa as stored_cgpa
+            FROM student_semester_summary ss
+            LEFT JOIN student_details d ON d.usn = ss.student_usn
+            GROUP BY ss.student_usn, d.cgpa
         """)
         
         cgpa_data = cursor.fetchall()
-        cgpa_updates = [(round(row['cgpa'], 2), row['student_usn']) for row in cgpa_data]
+        cgpa_updates = [(round(row['cgpa'], 2), row['student_usn']) for row in cgpa_data
+                        if row['stored_cgpa'] != round(row['cgpa'], 2)]
+        unchanged_cgpa = len(cgpa_data) - len(cgpa_updates)
+        print(f"  ✓ {len(cgpa_updates)} changed, {unchanged_cgpa} unchanged")
         
-        print(f"  ⚡ Executing batch CGPA update...")
-        cursor.executemany("""
-            UPDATE student_details
-            SET cgpa = %s
-            WHERE usn = %s
-        """, cgpa_updates)
+        updated_cgpa = len(cgpa_updates)
+        if cgpa_updates and not dry_run:
+            print(f"  ⚡ Executing batch CGPA update...")
+            cursor.executemany("""
+                UPDATE student_details
+                SET cgpa = %s
+                WHERE usn = %s
+            """, cgpa_updates)
+            updated_cgpa = cursor.rowcount
+            conn.commit()
+        print(f"  ✓ {verb} CGPA for {updated_cgpa} students")
         
-        updated_cgpa = cursor.rowcount
-        print(f"  ✓ Updated CGPA for {updated_cgpa} students")
-        conn.commit()
+        # =====================================================================
+        # TIME SAVED
+        # =====================================================================
+        # executemany sends the CGPA UPDATEs one statement per row
+        round_trips_saved = stats['round_trips_saved'] + unchanged_cgpa
+        time_saved = round_trips_saved * measure_round_trip(plain_cursor)
         
         # =====================================================================
         # FINAL SUMMARY
         # =====================================================================
         print(f"\n{'='*80}")
-        print(f"✅ BATCH RECALCULATION COMPLETED SUCCESSFULLY")
+        if dry_run:
+            print(f"🔍 DRY RUN COMPLETED - NOTHING WRITTEN")
+        else:
+            print(f"✅ BATCH RECALCULATION COMPLETED SUCCESSFULLY")
         print(f"{'='*80}")
         print(f"  • Fixed corrupted data: {fixed_corrupted + fixed_status} records")
-        print(f"  • Updated grades: {updated_grades} results")
-        print(f"  • Updated SGPA: {updated_sgpa} student-semesters")
-        print(f"  • Updated CGPA: {updated_cgpa} students")
+        print(f"  • {verb} grades: {stats['updated_grades']} results ({stats['unchanged_grades']} unchanged, skipped)")
+        print(f"  • {verb} SGPA: {stats['updated_sgpa']} student-semesters ({stats['unchanged_sgpa']} unchanged, skipped)")
+        print(f"  • {verb} CGPA: {updated_cgpa} students ({unchanged_cgpa} unchanged, skipped)")
+        print(f"  • Estimated time saved: {time_saved:.2f}s ({round_trips_saved} write round-trips skipped)")
         print(f"{'='*80}\n")
         
         return True
-        
+    
     except Exception as e:
         conn.rollback()
         print(f"\n❌ ERROR: {str(e)}")
@@ -293,8 +580,22 @@ def fast_recalculate_all_grades():
         return False
     finally:
         cursor.close()
+        plain_cursor.close()
         conn.close()
 
 if __name__ == '__main__':
-    success = fast_recalculate_all_grades()
+    parser = argparse.ArgumentParser(description='Fast batch grade recalculation for all students')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only report how many rows would change (nothing is written)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream results one student-semester at a time (constant memory)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Rows per write batch in streaming mode (default {DEFAULT_BATCH_SIZE})')
+    add_profile_arguments(parser)
+    
+    args = parser.parse_args()
+    profile_from_args(args, 'recalculate_all_grades_fast')
+    
+    success = fast_recalculate_all_grades(dry_run=args.dry_run, stream=args.stream,
+                                          batch_size=max(1, args.batch_size))
     sys.exit(0 if success else 1)
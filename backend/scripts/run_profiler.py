@@ -0,0 +1,204 @@
+"""
+RUN PROFILER
+============
+Built-in --profile mode for the scrapers and the grade scripts.
+
+Profiles a whole run without editing code:
+
+- cProfile of the main thread and of every thread started afterwards (the
+  scraper workers), merged into one .prof file (snakeviz / pstats)
+- tracemalloc: the snapshot taken when traced memory was at its highest
+  (checked every few seconds), dumped to a .tracemalloc file
+- a short .txt summary: hottest functions by self and cumulative time, and
+  the lines that allocated most at the memory peak
+
+Files go to PROFILE_DIR (default backend/profiles) as
+{script}-{YYYYmmdd-HHMMSS}-{pid}.*. At exit the hottest functions are printed,
+followed by a "PROFILE_STATS {json}" line with the file paths, which the
+FastAPI service returns when a job is run with "profile": true.
+
+Usage:
+    python calculate_grades.py --semester 5 --profile
+    python ultimate_scraper.py ... --profile --profile-dir /tmp/profiles
+"""
+
+import atexit
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+DEFAULT_PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'profiles')))
+DEFAULT_MEMORY_INTERVAL = 2.0   # Seconds between peak-memory checks
+TRACEMALLOC_FRAMES = 1
+SUMMARY_FUNCTIONS = 25
+PRINTED_FUNCTIONS = 10
+# Take a new peak snapshot only after this much growth, to keep the overhead down
+SNAPSHOT_GROWTH = 1.10
+
+
+def add_profile_arguments(parser):
+    """Add --profile / --profile-dir to a script's argument parser"""
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile the run (cProfile + tracemalloc peak) into the profiles directory')
+    parser.add_argument('--profile-dir', type=str, default=DEFAULT_PROFILE_DIR,
+                        help=f'Where --profile writes its files (default {DEFAULT_PROFILE_DIR}, env PROFILE_DIR)')
+
+
+def profile_from_args(args, name):
+    """Start a RunProfiler when --profile was given (it stops itself at exit)"""
+    if not getattr(args, 'profile', False):
+        return None
+    profiler = RunProfiler(name, args.profile_dir)
+    profiler.start()
+    return profiler
+
+
+class RunProfiler:
+    """
+    cProfile + tracemalloc for one script run
+
+    Args:
+        name: Prefix of the output files
+        profile_dir: Output directory
+        memory_interval: Seconds between peak-memory checks
+    """
+
+    def __init__(self, name, profile_dir=DEFAULT_PROFILE_DIR, memory_interval=DEFAULT_MEMORY_INTERVAL):
+        self.name = name
+        self.profile_dir = profile_dir
+        self.memory_interval = memory_interval
+        self._lock = threading.Lock()
+        self._profiles = []
+        self._stop_event = threading.Event()
+        self._memory_thread = None
+        self._peak_snapshot = None
+        self._peak_snapshot_bytes = 0
+        self._started_at = None
+        self._stopped = False
+
+    def start(self):
+        """Start profiling this thread and every thread started from now on"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._started_at = time.time()
+
+        # Started before the thread hook, so it isn't profiled itself
+        self._memory_thread = threading.Thread(target=self._watch_memory, daemon=True)
+        self._memory_thread.start()
+
+        if sys.version_info < (3, 12):
+            # One profiler per thread; from 3.12 on cProfile sees every thread
+            threading.setprofile(self._thread_hook)
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        profile.enable()
+
+        atexit.register(self.stop)
+        print(f"PROFILE enabled - writing to {os.path.abspath(self.profile_dir)}")
+
+    def _thread_hook(self, frame, event, arg):
+        """First profile event of a new thread: give it its own profiler"""
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with self._lock:
+            if self._stopped:
+                return
+            self._profiles.append(profile)
+        profile.enable()
+
+    def _watch_memory(self):
+        """Keep the tracemalloc snapshot taken closest to the memory peak"""
+        while not self._stop_event.wait(self.memory_interval):
+            self._snapshot_if_grown()
+
+    def _snapshot_if_grown(self):
+        if not tracemalloc.is_tracing():
+            return
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self._peak_snapshot_bytes * SNAPSHOT_GROWTH:
+            self._peak_snapshot = tracemalloc.take_snapshot()
+            self._peak_snapshot_bytes = current
+
+    def stop(self):
+        """Stop profiling and write the .prof, .tracemalloc and .txt files"""
+        with self._lock:
+            if self._stopped or self._started_at is None:
+                return None
+            self._stopped = True
+        threading.setprofile(None)
+        for profile in self._profiles:
+            profile.disable()
+        self._stop_event.set()
+        self._snapshot_if_grown()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        base = os.path.join(self.profile_dir, f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        files = {}
+
+        stats = self._merged_stats()
+        if stats:
+            files['profile'] = base + '.prof'
+            stats.dump_stats(files['profile'])
+        if self._peak_snapshot:
+            files['memory'] = base + '.tracemalloc'
+            self._peak_snapshot.dump(files['memory'])
+        files['summary'] = base + '.txt'
+        top = self._write_summary(files['summary'], stats, peak_bytes)
+
+        print(f"\nPROFILE - {time.time() - self._started_at:.1f}s run, "
+              f"{len(self._profiles)} threads profiled, peak traced memory {peak_bytes / 1024 / 1024:.1f} MB")
+        for entry in top[:PRINTED_FUNCTIONS]:
+            print(f"  {entry['self_seconds']:>9.3f}s self {entry['cumulative_seconds']:>9.3f}s cum  "
+                  f"{entry['calls']:>9} calls  {entry['function']}")
+        print(f"PROFILE saved to {files['summary']}")
+        summary = {**files, "peak_mb": round(peak_bytes / 1024 / 1024, 1), "top": top[:5]}
+        print(f"PROFILE_STATS {json.dumps(summary)}")
+        return summary
+
+    def _merged_stats(self):
+        """pstats.Stats of all threads (None if nothing was recorded)"""
+        merged = None
+        for profile in self._profiles:
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            if merged is None:
+                merged = pstats.Stats(profile)
+            else:
+                merged.add(profile)
+        return merged
+
+    def _write_summary(self, path, stats, peak_bytes):
+        """Text summary; returns the hottest functions by self time"""
+        top = []
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"{self.name} - peak traced memory {peak_bytes / 1024 / 1024:.1f} MB\n\n")
+            if stats:
+                stats.stream = f
+                f.write("HOTTEST FUNCTIONS BY SELF TIME\n")
+                stats.sort_stats('tottime').print_stats(SUMMARY_FUNCTIONS)
+                f.write("HOTTEST FUNCTIONS BY CUMULATIVE TIME\n")
+                stats.sort_stats('cumulative').print_stats(SUMMARY_FUNCTIONS)
+                stats.stream = sys.stdout
+
+                for (filename, line, function), (_, calls, self_time, cumulative, _) in sorted(
+                        stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:SUMMARY_FUNCTIONS]:
+                    top.append({
+                        "function": f"{os.path.basename(filename)}:{line}({function})",
+                        "calls": calls,
+                        "self_seconds": round(self_time, 4),
+                        "cumulative_seconds": round(cumulative, 4),
+                    })
+
+            if self._peak_snapshot:
+                f.write(f"\nTOP ALLOCATIONS AT PEAK ({self._peak_snapshot_bytes / 1024 / 1024:.1f} MB traced)\n")
+                for statistic in self._peak_snapshot.statistics('lineno')[:SUMMARY_FUNCTIONS]:
+                    f.write(f"  {statistic}\n")
+        return top
@@ -0,0 +1,330 @@
+"""
+CONTINUOUS RETRY SCHEDULER
+==========================
+Work-queue scheduler shared by the VTU and RV scrapers.
+
+The old retry logic ran in rounds: every USN of a round had to finish before
+the next round started, so one slow USN held back the whole retry wave, and
+it stopped when the failed count stayed the same twice. Here instead:
+
+- Every USN is an independent task in one queue (first attempts and retries)
+- A failed USN is re-queued on its own with exponential backoff + jitter
+- Workers pick up the next ready task as soon as they finish one, so they
+  only wait when everything left is still backing off
+- Each USN has an attempt budget, and the whole run has an optional deadline
+- A task can raise PermanentFailure (e.g. invalid USN) to be given up at once
+- An optional concurrency controller (adaptive_concurrency.py) can lower or
+  raise the number of tasks running at once while the run is in progress
+- SlotFileLimit does the same from a file the FastAPI job scheduler rewrites,
+  so one scraper process shrinks or grows its share of the service budget
+- Tasks can be grouped (e.g. by results URL): groups are served round-robin
+  so one big group can't starve the others, and each group can be capped to
+  a number of concurrent tasks
+
+Usage:
+    scheduler = RetryScheduler(lambda usn: scrape(usn, url), workers=20)
+    outcome = scheduler.run(usns)
+    outcome['failed']   # USNs that used up their budget or hit the deadline
+    outcome['permanent']  # USNs whose task raised PermanentFailure
+
+    # Several semesters on one pool, at most 10 workers per URL
+    scheduler = RetryScheduler(scrape_task, workers=20,
+                               group_of=lambda task: task[1], group_limit=10)
+"""
+
+import heapq
+import random
+import threading
+import time
+
+DEFAULT_MAX_ATTEMPTS = 8      # Scheduler attempts per USN (each one is a single browser try)
+DEFAULT_BASE_DELAY = 2.0      # Backoff before the 1st retry (seconds)
+DEFAULT_MAX_DELAY = 60.0      # Backoff cap (seconds)
+
+
+class PermanentFailure(Exception):
+    """Raised by a task when retrying can't help - the item is given up at once"""
+
+
+def backoff_delay(attempt, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """
+    Delay before retrying after `attempt` failed attempts
+
+    Exponential (base, 2*base, 4*base, ...) capped at max_delay, with half of
+    it randomised so USNs that failed together don't all retry together.
+    """
+    delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class RetryScheduler:
+    """
+    Runs task(item) -> bool for every item on a fixed set of worker threads
+
+    Args:
+        task: Callable(item) returning True on success (exceptions = failure,
+              PermanentFailure = failure without retries)
+        workers: Number of worker threads
+        max_attempts: Attempts per item before it is given up
+        base_delay / max_delay: Backoff bounds (seconds)
+        deadline_seconds: Stop starting new attempts after this long (None = no limit)
+        on_result: Optional callback(item, success, attempts) called once per
+                   item when it succeeds or is given up
+        group_of: Optional callable(item) -> group key (default: one group)
+        group_limit: Max concurrent tasks per group (None = no cap)
+        label: Optional callable(item) -> str for log lines
+        concurrency: Optional controller with .limit and .max_workers - runs
+                     max_workers threads but only .limit tasks at once
+    """
+
+    def __init__(self, task, workers=5, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 deadline_seconds=None, on_result=None, group_of=None,
+                 group_limit=None, label=None, concurrency=None):
+        self.task = task
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline_seconds = deadline_seconds
+        self.on_result = on_result
+        self.group_of = group_of or (lambda item: None)
+        self.group_limit = group_limit
+        self.label = label or str
+        self.concurrency = concurrency
+        if concurrency is not None:
+            self.workers = max(1, concurrency.max_workers)
+
+        self._cond = threading.Condition()
+        self._queues = {}           # group -> heap of (ready_at, attempts_so_far, seq, item)
+        self._groups = []           # Round-robin order
+        self._next_group = 0
+        self._group_in_flight = {}
+        self._seq = 0
+        self._in_flight = 0
+        self._deadline = None
+        self._attempts = {}
+        self._succeeded = []
+        self._failed = []
+        self._permanent = []
+        self._first_try = 0
+
+    def _push(self, item, ready_at):
+        """Queue an item (call with the lock held)"""
+        group = self.group_of(item)
+        if group not in self._queues:
+            self._queues[group] = []
+            self._groups.append(group)
+            self._group_in_flight[group] = 0
+        self._seq += 1
+        heapq.heappush(self._queues[group], (ready_at, self._attempts[item], self._seq, item))
+
+    def _pending(self):
+        return any(self._queues.values())
+
+    def _pick(self, now):
+        """
+        Pop the next ready task, visiting groups round-robin and skipping
+        groups at their cap (call with the lock held)
+
+        Returns:
+            (item, None) if a task is ready, else (None, seconds until the
+            earliest backoff among uncapped groups ends - None if there is none)
+        """
+        wait = None
+        count = len(self._groups)
+        for offset in range(count):
+            index = (self._next_group + offset) % count
+            group = self._groups[index]
+            queue = self._queues[group]
+            if not queue:
+                continue
+            if self.group_limit and self._group_in_flight[group] >= self.group_limit:
+                continue
+            if queue[0][0] <= now:
+                self._next_group = (index + 1) % count
+                self._group_in_flight[group] += 1
+                return heapq.heappop(queue)[3], None
+            ready_in = queue[0][0] - now
+            wait = ready_in if wait is None else min(wait, ready_in)
+        return None, wait
+
+    def _deadline_passed(self, now):
+        return self._deadline is not None and now >= self._deadline
+
+    def _next_task(self):
+        """Block until a task is ready; None when there is nothing left to do"""
+        with self._cond:
+            while True:
+                now = time.time()
+                if self._deadline_passed(now):
+                    return None
+                if not self._pending() and self._in_flight == 0:
+                    return None
+                if self.concurrency is not None and self._in_flight >= self.concurrency.limit:
+                    # The controller may raise the limit at any time - re-check every second
+                    self._cond.wait(1.0)
+                    continue
+                item, timeout = self._pick(now)
+                if item is not None:
+                    self._in_flight += 1
+                    return item
+
+                # Sleep until the earliest backoff ends, the deadline, or a
+                # finishing task frees a group slot
+                if self._deadline is not None:
+                    remaining = self._deadline - now
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                self._cond.wait(timeout)
+
+    def _finish(self, item, success, permanent=False):
+        """Record one attempt's outcome and re-queue the item if it has budget left"""
+        final = None
+        with self._cond:
+            self._in_flight -= 1
+            self._group_in_flight[self.group_of(item)] -= 1
+            attempts = self._attempts[item] = self._attempts[item] + 1
+
+            if success:
+                self._succeeded.append(item)
+                if attempts == 1:
+                    self._first_try += 1
+                final = True
+            elif permanent:
+                self._permanent.append(item)
+                final = False
+            else:
+                delay = backoff_delay(attempts, self.base_delay, self.max_delay)
+                ready_at = time.time() + delay
+                out_of_time = self._deadline is not None and ready_at >= self._deadline
+                if attempts < self.max_attempts and not out_of_time:
+                    self._push(item, ready_at)
+                    print(f"RETRY {self.label(item)} in {delay:.1f}s (attempt {attempts + 1}/{self.max_attempts})")
+                else:
+                    self._failed.append(item)
+                    final = False
+
+            self._cond.notify_all()
+
+        if final is not None and self.on_result:
+            # e.g. a journal write hitting "database is locked" - must not kill the worker
+            try:
+                self.on_result(item, final, attempts)
+            except Exception as e:
+                print(f"WARN {self.label(item)}: result callback failed: {e}")
+
+    def _worker(self):
+        while True:
+            item = self._next_task()
+            if item is None:
+                with self._cond:
+                    self._cond.notify_all()
+                return
+            permanent = False
+            try:
+                success = bool(self.task(item))
+            except PermanentFailure:
+                success, permanent = False, True
+            except Exception:
+                success = False
+            self._finish(item, success, permanent)
+
+    def run(self, items):
+        """
+        Process every item until it succeeds, runs out of attempts, or the
+        deadline passes
+
+        Returns:
+            dict with succeeded, failed, expired (never finished because of the
+            deadline, also included in failed), permanent (gave up via
+            PermanentFailure, not included in failed), attempts per item,
+            first_try successes, total_attempts and elapsed seconds
+        """
+        items = list(dict.fromkeys(items))
+        start = time.time()
+        self._deadline = start + self.deadline_seconds if self.deadline_seconds else None
+
+        with self._cond:
+            for item in items:
+                self._attempts[item] = 0
+                self._push(item, start)
+
+        threads = [
+            threading.Thread(target=self._worker, daemon=True)
+            for _ in range(min(self.workers, len(items)))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Whatever is still queued was cut off by the deadline
+        expired = [entry[3] for queue in self._queues.values() for entry in sorted(queue)]
+        self._queues = {}
+        if expired:
+            print(f"STOP Deadline reached: {len(expired)} USNs not finished")
+            for item in expired:
+                if self.on_result:
+                    self.on_result(item, False, self._attempts[item])
+        failed = self._failed + expired
+
+        return {
+            "succeeded": list(self._succeeded),
+            "failed": failed,
+            "expired": expired,
+            "permanent": list(self._permanent),
+            "attempts": dict(self._attempts),
+            "first_try": self._first_try,
+            "total_attempts": sum(self._attempts.values()),
+            "elapsed": time.time() - start,
+        }
+
+
+class SlotFileLimit:
+    """
+    Concurrency limit published in a file by the service's job scheduler
+
+    The file holds a single integer (the slots currently allocated to this
+    scraper). It is re-read at most every refresh_seconds; while it is
+    missing or unreadable the last value is kept.
+
+    Args:
+        path: Slot file
+        max_workers: Pool size (the most slots this job can use)
+        inner: Optional controller (AdaptiveConcurrency) - the effective
+               limit is the lower of both
+        refresh_seconds: How often the file is re-read
+    """
+
+    def __init__(self, path, max_workers, inner=None, refresh_seconds=2.0):
+        self.path = path
+        self.inner = inner
+        self.max_workers = max(1, inner.max_workers if inner is not None else max_workers)
+        self.refresh_seconds = refresh_seconds
+        self._slots = self.max_workers
+        self._read_at = 0.0
+        self._lock = threading.Lock()
+        self._read()
+
+    def _read(self):
+        """Load the allocation from the file (keeps the old value on errors)"""
+        self._read_at = time.time()
+        try:
+            with open(self.path) as f:
+                slots = int(f.read().strip())
+        except (OSError, ValueError):
+            return
+        slots = min(self.max_workers, max(1, slots))
+        if slots != self._slots:
+            print(f"SLOTS Service allocation {self._slots} -> {slots} workers")
+            self._slots = slots
+
+    @property
+    def limit(self):
+        with self._lock:
+            if time.time() - self._read_at >= self.refresh_seconds:
+                self._read()
+            slots = self._slots
+        if self.inner is not None:
+            return min(slots, self.inner.limit)
+        return slots
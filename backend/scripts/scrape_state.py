@@ -0,0 +1,280 @@
+"""
+SCRAPE CHECKPOINT JOURNAL
+=========================
+SQLite journal of scrape progress, keyed by (batch, semester, url, usn),
+plus a negative cache of USNs the portal rejected as invalid.
+
+Each USN's outcome is recorded as soon as it is final (done / failed, plus
+the attempts it took), so when a long batch run is interrupted - container
+restart, crash, Ctrl+C - the next run with --resume skips every USN that is
+already done and only scrapes the rest.
+
+When VTU answers "University Seat Number is not available or Invalid" no
+retry will change that, so the verdict is cached per (url, usn) for
+INVALID_USN_TTL_HOURS (default 24) and those USNs are skipped up front.
+
+Both live in one SQLite file next to the scripts by default; set
+SCRAPE_JOURNAL to put it somewhere persistent (e.g. a Docker volume).
+
+Usage:
+    python scrape_state.py status                   # Counts per batch/semester
+    python scrape_state.py clear --batch 2022       # Forget one batch
+    python scrape_state.py clear                    # Forget everything
+    python scrape_state.py invalid                  # List cached invalid USNs
+    python scrape_state.py clear-invalid            # Empty the invalid-USN cache
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import argparse
+
+DEFAULT_JOURNAL_PATH = os.getenv(
+    'SCRAPE_JOURNAL',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scrape_journal.db')
+)
+
+INVALID_USN_TTL_HOURS = float(os.getenv('INVALID_USN_TTL_HOURS', 24))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_journal (
+    batch TEXT NOT NULL,
+    semester INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    usn TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (batch, semester, url, usn)
+)
+"""
+
+INVALID_SCHEMA = """
+CREATE TABLE IF NOT EXISTS invalid_usns (
+    url TEXT NOT NULL,
+    usn TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (url, usn)
+)
+"""
+
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def _connect(path):
+    """Open (and create) the state database - shared by the journal and the cache"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Several scraper processes may share the file - wait for locks instead of failing
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(SCHEMA)
+    conn.execute(INVALID_SCHEMA)
+    conn.commit()
+    return conn
+
+
+class ScrapeJournal:
+    """
+    Thread-safe checkpoint journal (one SQLite connection shared by all workers)
+
+    Args:
+        path: SQLite file (created if missing)
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_JOURNAL_PATH
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+
+    def completed(self, batch, semester, url, usns=None):
+        """USNs already done for (batch, semester, url), optionally limited to usns"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT usn FROM scrape_journal WHERE batch = ? AND semester = ? AND url = ? AND status = ?",
+                (str(batch), semester, url, STATUS_DONE)
+            ).fetchall()
+        done = {row[0] for row in rows}
+        if usns is not None:
+            done &= set(usns)
+        return done
+
+    def record(self, batch, semester, url, usn, success, attempts):
+        """Store one USN's final outcome (attempts add up across runs)"""
+        status = STATUS_DONE if success else STATUS_FAILED
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO scrape_journal (batch, semester, url, usn, status, attempts, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (batch, semester, url, usn) DO UPDATE SET
+                    status = excluded.status,
+                    attempts = scrape_journal.attempts + excluded.attempts,
+                    updated_at = excluded.updated_at
+            """, (str(batch), semester, url, usn, status, attempts, time.time()))
+            self._conn.commit()
+
+    def recorder(self, batch, semester, url):
+        """on_result callback for RetryScheduler that records into this journal"""
+        def on_result(usn, success, attempts):
+            self.record(batch, semester, url, usn, success, attempts)
+        return on_result
+
+    def summary(self, batch=None):
+        """[(batch, semester, url, done, failed, attempts)] for status reports"""
+        query = """
+            SELECT batch, semester, url,
+                   SUM(status = 'done'), SUM(status = 'failed'), SUM(attempts)
+            FROM scrape_journal
+        """
+        params = ()
+        if batch is not None:
+            query += " WHERE batch = ?"
+            params = (str(batch),)
+        query += " GROUP BY batch, semester, url ORDER BY batch, semester"
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    def clear(self, batch=None):
+        """Forget a batch (or everything); returns rows deleted"""
+        with self._lock:
+            if batch is None:
+                cursor = self._conn.execute("DELETE FROM scrape_journal")
+            else:
+                cursor = self._conn.execute("DELETE FROM scrape_journal WHERE batch = ?", (str(batch),))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class InvalidUsnCache:
+    """
+    Thread-safe negative cache of (url, usn) pairs the portal reported as invalid
+
+    Args:
+        path: SQLite file (same file as the journal by default)
+        ttl_hours: How long a verdict is trusted
+    """
+
+    def __init__(self, path=None, ttl_hours=INVALID_USN_TTL_HOURS):
+        self.path = path or DEFAULT_JOURNAL_PATH
+        self.ttl_seconds = ttl_hours * 3600
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+
+    def add(self, url, usn):
+        """Remember that usn is invalid on url"""
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO invalid_usns (url, usn, seen_at) VALUES (?, ?, ?)
+                ON CONFLICT (url, usn) DO UPDATE SET seen_at = excluded.seen_at
+            """, (url, usn, time.time()))
+            self._conn.commit()
+
+    def invalid_usns(self, url, usns=None):
+        """USNs with an unexpired invalid verdict for url, optionally limited to usns"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT usn FROM invalid_usns WHERE url = ? AND seen_at >= ?",
+                (url, time.time() - self.ttl_seconds)
+            ).fetchall()
+        invalid = {row[0] for row in rows}
+        if usns is not None:
+            invalid &= set(usns)
+        return invalid
+
+    def entries(self):
+        """[(url, usn, seen_at)] of unexpired verdicts"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT url, usn, seen_at FROM invalid_usns WHERE seen_at >= ? ORDER BY url, usn",
+                (time.time() - self.ttl_seconds,)
+            ).fetchall()
+
+    def clear(self, url=None):
+        """Forget verdicts for one URL (or all, including expired ones); returns rows deleted"""
+        with self._lock:
+            if url is None:
+                cursor = self._conn.execute("DELETE FROM invalid_usns")
+            else:
+                cursor = self._conn.execute("DELETE FROM invalid_usns WHERE url = ?", (url,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def skip_invalid(cache, url, usns):
+    """
+    Split usns into (to_scrape, cached_invalid) using the invalid-USN cache.
+
+    Cached USNs are printed as "INVALID {usn}" - the FastAPI service lists
+    them separately from real failures.
+    """
+    if not cache:
+        return list(usns), set()
+    invalid = cache.invalid_usns(url, usns)
+    if invalid:
+        print(f"SKIP {len(invalid)} USNs cached as invalid for this URL")
+        for usn in sorted(invalid):
+            print(f"INVALID {usn}")
+    return [usn for usn in usns if usn not in invalid], invalid
+
+
+def skip_completed(journal, batch, semester, url, usns):
+    """
+    Split usns into (to_scrape, already_done) using the journal.
+
+    Already-done USNs are printed as "OK {usn}" so callers that parse the
+    scraper output (the FastAPI service) still count them as succeeded.
+    """
+    done = journal.completed(batch, semester, url, usns)
+    if done:
+        print(f"RESUME Skipping {len(done)} USNs already scraped (checkpoint: {journal.path})")
+        for usn in sorted(done):
+            print(f"OK {usn}")
+    return [usn for usn in usns if usn not in done], done
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Inspect or clear the scrape checkpoint journal')
+    parser.add_argument('command', choices=['status', 'clear', 'invalid', 'clear-invalid'])
+    parser.add_argument('--batch', type=str, help='Only this batch')
+    parser.add_argument('--url', type=str, help='Only this URL (clear-invalid)')
+    parser.add_argument('--journal', type=str, default=DEFAULT_JOURNAL_PATH, help='Journal file')
+
+    args = parser.parse_args()
+
+    if args.command in ('invalid', 'clear-invalid'):
+        cache = InvalidUsnCache(args.journal)
+        if args.command == 'invalid':
+            entries = cache.entries()
+            if not entries:
+                print("INFO No cached invalid USNs")
+            for url, usn, seen_at in entries:
+                print(f"{usn:<12} {time.strftime('%Y-%m-%d %H:%M', time.localtime(seen_at))}  {url}")
+        else:
+            print(f"OK Removed {cache.clear(args.url)} invalid-USN entries")
+        cache.close()
+        raise SystemExit(0)
+
+    journal = ScrapeJournal(args.journal)
+
+    if args.command == 'status':
+        rows = journal.summary(args.batch)
+        if not rows:
+            print("INFO Journal is empty")
+        for batch, semester, url, done, failed, attempts in rows:
+            print(f"{batch:<12} Sem {semester}  done: {done:<6} failed: {failed:<6} attempts: {attempts:<7} {url}")
+    else:
+        deleted = journal.clear(args.batch)
+        print(f"OK Removed {deleted} journal entries")
+
+    journal.close()
@@ -0,0 +1,154 @@
+"""
+SCRAPE STAGE TIMINGS
+====================
+Per-stage latency histograms for the scrapers.
+
+A USN takes ~15 seconds, but nothing said where they go. Every scrape attempt
+now times its stages (driver start, page load, captcha, OCR, submit, parse,
+database work, ...). The time spent in each stage during one attempt is one
+sample. At the end of a run the samples are summarised per stage (count,
+mean, p50, p95, p99, share of the total time) as a table plus one
+"STAGE_STATS {json}" line, which the FastAPI service returns with its response
+and adds to its /metrics histograms.
+
+Usage:
+    stage_timer = StageTimings()
+
+    stage_timer.begin_attempt()              # In the worker thread
+    with stage_timer.stage(STAGE_PAGE_LOAD):
+        driver.get(url)
+    ...
+    stage_timer.end_attempt()                # Adds this attempt's samples
+
+    stage_timer.report()                     # Table + STAGE_STATS line
+"""
+
+import bisect
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+STAGE_DRIVER_ACQUIRE = 'driver_acquire'    # Start Chrome
+STAGE_PAGE_LOAD = 'page_load'              # Open the results page
+STAGE_CAPTCHA_CAPTURE = 'captcha_capture'  # Refresh + screenshot the captcha
+STAGE_MASKING = 'masking'                  # OpenCV masking of the captcha image
+STAGE_OCR = 'ocr'                          # Tesseract
+STAGE_SUBMIT_WAIT = 'submit_wait'          # Fill the form, submit, wait, check alerts
+STAGE_PARSE = 'parse'                      # BeautifulSoup
+STAGE_DB_LOCK_WAIT = 'db_lock_wait'        # Waiting for the shared DB lock
+STAGE_DB_CONNECT = 'db_connect'            # Opening the MySQL connection
+STAGE_DB_READ = 'db_read'                  # Lookups (subjects, existing results)
+STAGE_DB_WRITE = 'db_write'                # INSERT / UPDATE statements
+STAGE_COMMIT = 'commit'
+STAGE_DRIVER_QUIT = 'driver_quit'          # Close Chrome
+STAGE_ATTEMPT = 'attempt'                  # Whole attempt, for reference
+
+STAGES = (
+    STAGE_DRIVER_ACQUIRE, STAGE_PAGE_LOAD, STAGE_CAPTCHA_CAPTURE, STAGE_MASKING,
+    STAGE_OCR, STAGE_SUBMIT_WAIT, STAGE_PARSE, STAGE_DB_LOCK_WAIT, STAGE_DB_CONNECT,
+    STAGE_DB_READ, STAGE_DB_WRITE, STAGE_COMMIT, STAGE_DRIVER_QUIT, STAGE_ATTEMPT,
+)
+
+# Histogram bucket upper bounds (seconds) - the service's /metrics uses the same
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class StageTimings:
+    """
+    Thread-safe stage histograms for one scraper run
+
+    Stages timed outside begin_attempt()/end_attempt() count as one sample each.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._local = threading.local()
+
+    def begin_attempt(self):
+        """Start collecting this thread's stage times for a new attempt"""
+        self._local.attempt = {}
+        self._local.started = time.perf_counter()
+
+    def end_attempt(self):
+        """Record the finished attempt (one sample per stage it went through)"""
+        attempt = getattr(self._local, 'attempt', None)
+        if attempt is None:
+            return
+        attempt[STAGE_ATTEMPT] = time.perf_counter() - self._local.started
+        self._local.attempt = None
+        with self._lock:
+            for name, seconds in attempt.items():
+                self._samples.setdefault(name, []).append(seconds)
+
+    def add(self, name, seconds):
+        """Add time to a stage of the current attempt (or as its own sample)"""
+        attempt = getattr(self._local, 'attempt', None)
+        if attempt is not None:
+            attempt[name] = attempt.get(name, 0.0) + seconds
+        else:
+            with self._lock:
+                self._samples.setdefault(name, []).append(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as part of stage `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def summary(self):
+        """
+        {stage: {count, mean, p50, p95, p99, total, buckets}} in seconds, in pipeline order
+
+        buckets are cumulative counts per BUCKETS bound (samples <= bound)
+        """
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items() if values}
+        ordered = [name for name in STAGES if name in samples] + \
+                  sorted(name for name in samples if name not in STAGES)
+        result = {}
+        for name in ordered:
+            values = samples[name]
+            total = sum(values)
+            result[name] = {
+                "count": len(values),
+                "mean": round(total / len(values), 4),
+                "p50": round(percentile(values, 0.50), 4),
+                "p95": round(percentile(values, 0.95), 4),
+                "p99": round(percentile(values, 0.99), 4),
+                "total": round(total, 3),
+                "buckets": [bisect.bisect_right(values, bound) for bound in BUCKETS],
+            }
+        return result
+
+    def stats_line(self):
+        """Machine-readable summary line for the scraper output"""
+        return f"STAGE_STATS {json.dumps(self.summary())}"
+
+    def report(self, title="STAGE TIMINGS"):
+        """Print the histogram table and the STAGE_STATS line"""
+        summary = self.summary()
+        if not summary:
+            return
+        # Share of the time spent inside attempts (the attempt row itself excluded)
+        staged = sum(stats['total'] for name, stats in summary.items() if name != STAGE_ATTEMPT) or 1.0
+        print(f"\n{title} (seconds per attempt)")
+        print(f"  {'stage':<16}{'count':>7}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'share':>8}")
+        for name, stats in summary.items():
+            share = "" if name == STAGE_ATTEMPT else f"{stats['total'] / staged:.0%}"
+            print(f"  {name:<16}{stats['count']:>7}{stats['mean']:>9.2f}{stats['p50']:>9.2f}"
+                  f"{stats['p95']:>9.2f}{stats['p99']:>9.2f}{share:>8}")
+        print(self.stats_line())
@@ -8,8 +8,8 @@ Features:
 ✓ Elective subject mapping (21CS48LX → 21CSL481)
 ✓ Semester auto-detection from subject code
 ✓ Attempt tracking (handles retakes)
-✓ Smart retry logic (stops when failed count constant)
-✓ Parallel scraping with ThreadPoolExecutor
+✓ Continuous retry scheduler (per-USN backoff, attempt budget, deadline)
+✓ Parallel scraping on a shared worker queue
 ✓ Handles diploma students (4xx pattern missing Sem 1-2)
 ✓ All result statuses (F, P, A, X, W, NE, ABS)
 ✓ NE (13) format parsing
@@ -34,12 +34,22 @@ import pytesseract
 from PIL import Image
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoAlertPresentException
+from selenium.common.exceptions import NoAlertPresentException, WebDriverException
 import time
 from bs4 import BeautifulSoup
 from datetime import datetime
 from db_config import get_db_connection, close_connection
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from scrape_scheduler import RetryScheduler, PermanentFailure, SlotFileLimit, DEFAULT_MAX_ATTEMPTS
+from scrape_state import ScrapeJournal, InvalidUsnCache, DEFAULT_JOURNAL_PATH, skip_completed, skip_invalid
+from adaptive_concurrency import (AdaptiveConcurrency, DEFAULT_MIN_WORKERS, DEFAULT_MAX_WORKERS,
+                                  OUTCOME_OK, OUTCOME_INVALID, OUTCOME_CAPTCHA, OUTCOME_ALERT,
+                                  OUTCOME_TIMEOUT, OUTCOME_ERROR)
+from circuit_breaker import CircuitBreaker
+from grade_triggers import defer_summary_refresh, refresh_summaries
+from stage_timings import (StageTimings, STAGE_DRIVER_ACQUIRE, STAGE_PAGE_LOAD, STAGE_CAPTCHA_CAPTURE,
+                           STAGE_MASKING, STAGE_OCR, STAGE_SUBMIT_WAIT, STAGE_PARSE, STAGE_DB_LOCK_WAIT,
+                           STAGE_DB_CONNECT, STAGE_DB_READ, STAGE_DB_WRITE, STAGE_COMMIT, STAGE_DRIVER_QUIT)
+from run_profiler import add_profile_arguments, profile_from_args
 import threading
 import re
 
@@ -55,6 +65,25 @@ if not sys.warnoptions:
 thread_local = threading.local()
 db_lock = threading.Lock()
 
+# Persistent cache of USNs VTU reported as invalid (per URL)
+try:
+    invalid_cache = InvalidUsnCache()
+except Exception as e:
+    print(f"WARN Invalid-USN cache disabled: {e}")
+    invalid_cache = None
+
+# Set by --adaptive: AIMD controller that picks the worker count at runtime
+concurrency_controller = None
+
+# Set by --slot-file: the FastAPI service's share of its global worker budget
+slot_limit = None
+
+# Shared by all workers: pauses requests while the results portal is down
+portal_breaker = CircuitBreaker()
+
+# Per-stage latency histograms of every scrape attempt in this run
+stage_timer = StageTimings()
+
 # ==================== ELECTIVE MAPPING ====================
 
 ELECTIVE_PATTERNS = {
@@ -120,28 +149,30 @@ def map_actual_to_placeholder(actual_subject_code):
 
 def mask_captcha(image_path):
     """Processes the CAPTCHA image by applying masking for improved text extraction."""
-    try:
-        image = cv2.imread(image_path)
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        lower = np.array([-10, -10, 62])
-        upper = np.array([10, 10, 142])
-        mask = cv2.inRange(hsv_image, lower, upper)
-        masked_image = cv2.bitwise_and(image, image, mask=mask)
-        
-        thread_id = threading.get_ident()
-        processed_image_path = f"masked_captcha_{thread_id}.png"
-        cv2.imwrite(processed_image_path, masked_image)
-        return processed_image_path
-    except Exception as e:
-        return None
+    with stage_timer.stage(STAGE_MASKING):
+        try:
+            image = cv2.imread(image_path)
+            hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            lower = np.array([-10, -10, 62])
+            upper = np.array([10, 10, 142])
+            mask = cv2.inRange(hsv_image, lower, upper)
+            masked_image = cv2.bitwise_and(image, image, mask=mask)
+            
+            thread_id = threading.get_ident()
+            processed_image_path = f"masked_captcha_{thread_id}.png"
+            cv2.imwrite(processed_image_path, masked_image)
+            return processed_image_path
+        except Exception as e:
+            return None
 
 def capture_and_process_captcha(driver):
     """Captures the CAPTCHA image and processes it with masking."""
     try:
-        captcha_element = driver.find_element(By.XPATH, '//*[@id="raj"]/div[2]/div[2]/img')
-        thread_id = threading.get_ident()
-        captcha_image_path = f"captcha_{thread_id}.png"
-        captcha_element.screenshot(captcha_image_path)
+        with stage_timer.stage(STAGE_CAPTCHA_CAPTURE):
+            captcha_element = driver.find_element(By.XPATH, '//*[@id="raj"]/div[2]/div[2]/img')
+            thread_id = threading.get_ident()
+            captcha_image_path = f"captcha_{thread_id}.png"
+            captcha_element.screenshot(captcha_image_path)
         return mask_captcha(captcha_image_path)
     except Exception as e:
         return None
@@ -149,9 +180,10 @@ def capture_and_process_captcha(driver):
 def refresh_and_capture_captcha(driver):
     """Refreshes the CAPTCHA by clicking the refresh button, then captures and processes it."""
     try:
-        refresh_button = driver.find_element(By.XPATH, '//*[@id="raj"]/div[2]/div[2]/p/a')
-        refresh_button.click()
-        time.sleep(1.5)
+        with stage_timer.stage(STAGE_CAPTCHA_CAPTURE):
+            refresh_button = driver.find_element(By.XPATH, '//*[@id="raj"]/div[2]/div[2]/p/a')
+            refresh_button.click()
+            time.sleep(1.5)
         return capture_and_process_captcha(driver)
     except Exception as e:
         return capture_and_process_captcha(driver)
@@ -258,7 +290,7 @@ def is_diploma_student(usn):
 
 # ==================== MAIN SCRAPING FUNCTION ====================
 
-def get_vtu_results(usn, url, expected_semester=None):
+def get_vtu_results(usn, url, expected_semester=None, max_attempts=1):
     """
     Scrapes VTU results for a single USN with elective support.
     
@@ -269,6 +301,9 @@ def get_vtu_results(usn, url, expected_semester=None):
     - Handles all result statuses
     - Reads ALL tables (multi-semester support)
     
+    One browser try per call by default: RetryScheduler owns the retries,
+    the backoff between them and the attempt budget (--max-attempts).
+    
     Returns True if successful, False otherwise.
     """
     # Check if diploma student trying to access Sem 1-2
@@ -285,46 +320,64 @@ def get_vtu_results(usn, url, expected_semester=None):
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--log-level=3")
     
-    max_attempts = 5
-    
     for attempt in range(max_attempts):
         driver = None
+        ticket = portal_breaker.acquire()
+        if not ticket:
+            print(f"WARN {usn}: Results portal unavailable (circuit open) - giving up for now")
+            break
+        attempt_start = time.time()
+        stage_timer.begin_attempt()
+        outcome = OUTCOME_ERROR
+        # Only a WebDriverException while this is set (page load, submit) counts
+        # against the portal - Chrome failing to start or a local driver error doesn't
+        contacting_portal = False
         try:
-            driver = webdriver.Chrome(options=options)
-            driver.get(url)
-            time.sleep(2)
+            with stage_timer.stage(STAGE_DRIVER_ACQUIRE):
+                driver = webdriver.Chrome(options=options)
+            with stage_timer.stage(STAGE_PAGE_LOAD):
+                contacting_portal = True
+                driver.get(url)
+                time.sleep(2)
+                contacting_portal = False
             
             masked_image_path = refresh_and_capture_captcha(driver)
             if not masked_image_path:
+                outcome = OUTCOME_CAPTCHA
                 continue
             
-            img = Image.open(masked_image_path)
-            ocr_configs = [
-                r'--psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789',
-                r'--psm 8 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            ]
-            captcha_text = ''
-            for cfg in ocr_configs:
-                try:
-                    captcha_text = pytesseract.image_to_string(img, config=cfg).strip()
-                    captcha_text = ''.join(c for c in captcha_text if c.isalnum())
-                    if len(captcha_text) >= 6:
-                        break
-                except Exception:
-                    continue
+            with stage_timer.stage(STAGE_OCR):
+                img = Image.open(masked_image_path)
+                ocr_configs = [
+                    r'--psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789',
+                    r'--psm 8 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
+                ]
+                captcha_text = ''
+                for cfg in ocr_configs:
+                    try:
+                        captcha_text = pytesseract.image_to_string(img, config=cfg).strip()
+                        captcha_text = ''.join(c for c in captcha_text if c.isalnum())
+                        if len(captcha_text) >= 6:
+                            break
+                    except Exception:
+                        continue
             
             if not captcha_text or len(captcha_text) < 6:
+                outcome = OUTCOME_CAPTCHA
                 continue
             
             # Fill form
-            usn_input_field = driver.find_element(By.NAME, "lns")
-            captcha_input_field = driver.find_element(By.NAME, "captchacode")
-            usn_input_field.clear()
-            captcha_input_field.clear()
-            usn_input_field.send_keys(usn)
-            captcha_input_field.send_keys(captcha_text)
-            driver.find_element(By.ID, "submit").click()
-            time.sleep(3)
+            with stage_timer.stage(STAGE_SUBMIT_WAIT):
+                usn_input_field = driver.find_element(By.NAME, "lns")
+                captcha_input_field = driver.find_element(By.NAME, "captchacode")
+                usn_input_field.clear()
+                captcha_input_field.clear()
+                usn_input_field.send_keys(usn)
+                captcha_input_field.send_keys(captcha_text)
+                contacting_portal = True
+                driver.find_element(By.ID, "submit").click()
+                time.sleep(3)
+                contacting_portal = False
             
             # Check for alert
             try:
@@ -334,50 +387,61 @@ def get_vtu_results(usn, url, expected_semester=None):
                 
                 if "University Seat Number is not available or Invalid" in alert_text:
                     print(f"WARN {usn}: Invalid USN")
-                    return False
+                    outcome = OUTCOME_INVALID
+                    mark_invalid_usn(url, usn)
+                    raise PermanentFailure(f"{usn}: invalid USN")
                 elif "captcha" in alert_text.lower():
+                    outcome = OUTCOME_CAPTCHA
                     continue
                 else:
+                    outcome = OUTCOME_ALERT
                     continue
             except NoAlertPresentException:
                 pass
             
             # Parse with BeautifulSoup
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            
-            try:
-                student_name = soup.find_all("td")[3].text.lstrip(" : ")
-                student_usn = soup.find_all("td")[1].text.lstrip(" : ")
-                print(f"OK Found student: {student_name} ({student_usn})")
-            except (IndexError, AttributeError) as e:
-                print(f"FAIL Could not extract student info: {e}")
-                continue
-            
-            # Extract ALL result tables (VTU shows multiple tables for different semesters)
-            try:
-                all_tables = soup.find_all("div", attrs={"class": "divTable"})
-                print(f"INFO Found {len(all_tables)} result tables")
-                all_rows = []
-                for idx, table in enumerate(all_tables):
-                    table_rows = table.find_all("div", attrs={"class": "divTableRow"})[1:]  # Skip header
-                    print(f"  Table {idx+1}: {len(table_rows)} rows")
-                    all_rows.extend(table_rows)
-                rows = all_rows
-                print(f"DATA Total rows to process: {len(rows)}")
-            except (IndexError, AttributeError) as e:
-                print(f"FAIL Could not extract tables: {e}")
-                continue
+            with stage_timer.stage(STAGE_PARSE):
+                soup = BeautifulSoup(driver.page_source, "html.parser")
+                
+                try:
+                    student_name = soup.find_all("td")[3].text.lstrip(" : ")
+                    student_usn = soup.find_all("td")[1].text.lstrip(" : ")
+                    print(f"OK Found student: {student_name} ({student_usn})")
+                except (IndexError, AttributeError) as e:
+                    print(f"FAIL Could not extract student info: {e}")
+                    continue
+                
+                # Extract ALL result tables (VTU shows multiple tables for different semesters)
+                try:
+                    all_tables = soup.find_all("div", attrs={"class": "divTable"})
+                    print(f"INFO Found {len(all_tables)} result tables")
+                    all_rows = []
+                    for idx, table in enumerate(all_tables):
+                        table_rows = table.find_all("div", attrs={"class": "divTableRow"})[1:]  # Skip header
+                        print(f"  Table {idx+1}: {len(table_rows)} rows")
+                        all_rows.extend(table_rows)
+                    rows = all_rows
+                    print(f"DATA Total rows to process: {len(rows)}")
+                except (IndexError, AttributeError) as e:
+                    print(f"FAIL Could not extract tables: {e}")
+                    continue
             
             if not rows:
                 return False
             
             # Process results with database lock
+            lock_requested = time.perf_counter()
             with db_lock:
-                connection = get_db_connection()
+                stage_timer.add(STAGE_DB_LOCK_WAIT, time.perf_counter() - lock_requested)
+                with stage_timer.stage(STAGE_DB_CONNECT):
+                    connection = get_db_connection()
                 if not connection:
                     return False
                 
                 cursor = connection.cursor()
+                # Grade triggers installed: refresh each summary once after the commit, not per row
+                deferred_summaries = defer_summary_refresh(cursor)
+                written_semesters = set()
                 
                 for row in rows:
                     cells = row.find_all("div", attrs={"class": "divTableCell"})
@@ -399,8 +463,9 @@ def get_vtu_results(usn, url, expected_semester=None):
                     # Extract semester - FIRST try from subjects table, then from subject code
                     # This ensures we use the correct semester defined in the database
                     try:
-                        cursor.execute("SELECT semester FROM subjects WHERE subject_code = %s", (actual_subject_code,))
-                        subject_row = cursor.fetchone()
+                        with stage_timer.stage(STAGE_DB_READ):
+                            cursor.execute("SELECT semester FROM subjects WHERE subject_code = %s", (actual_subject_code,))
+                            subject_row = cursor.fetchone()
                         if subject_row:
                             detected_semester = subject_row[0]
                         else:
@@ -428,20 +493,22 @@ def get_vtu_results(usn, url, expected_semester=None):
                     if is_elective:
                         # Store actual elective choice in elective_subjects table
                         try:
-                            cursor.execute("""
-                                INSERT INTO elective_subjects 
-                                (subject_code, subject_name, semester, credits, placeholder_code, scheme)
-                                VALUES (%s, %s, %s, %s, %s, '21')
-                                ON DUPLICATE KEY UPDATE 
-                                    subject_name = VALUES(subject_name),
-                                    placeholder_code = VALUES(placeholder_code)
-                            """, (actual_subject_code, actual_subject_name, detected_semester, 
-                                  elective_credits, placeholder_code))
+                            with stage_timer.stage(STAGE_DB_WRITE):
+                                cursor.execute("""
+                                    INSERT INTO elective_subjects 
+                                    (subject_code, subject_name, semester, credits, placeholder_code, scheme)
+                                    VALUES (%s, %s, %s, %s, %s, '21')
+                                    ON DUPLICATE KEY UPDATE 
+                                        subject_name = VALUES(subject_name),
+                                        placeholder_code = VALUES(placeholder_code)
+                                """, (actual_subject_code, actual_subject_name, detected_semester, 
+                                      elective_credits, placeholder_code))
                         except Exception:
                             pass  # Table might not exist for non-21 scheme
                     
                     # Get existing record
-                    existing_attempt, existing_total, existing_status = get_existing_record(student_usn, actual_subject_code, detected_semester)
+                    with stage_timer.stage(STAGE_DB_READ):
+                        existing_attempt, existing_total, existing_status = get_existing_record(student_usn, actual_subject_code, detected_semester)
                     
                     # Check if record exists and decide UPDATE vs INSERT
                     if existing_attempt > 0:
@@ -474,7 +541,9 @@ def get_vtu_results(usn, url, expected_semester=None):
                             )
                             
                             try:
-                                cursor.execute(insert_query, data)
+                                with stage_timer.stage(STAGE_DB_WRITE):
+                                    cursor.execute(insert_query, data)
+                                written_semesters.add(detected_semester)
                             except Exception as e:
                                 print(f"  FAIL Failed to insert backlog attempt for {actual_subject_code}: {e}")
                         else:
@@ -505,7 +574,9 @@ def get_vtu_results(usn, url, expected_semester=None):
                             )
                             
                             try:
-                                cursor.execute(update_query, data)
+                                with stage_timer.stage(STAGE_DB_WRITE):
+                                    cursor.execute(update_query, data)
+                                written_semesters.add(detected_semester)
                             except Exception as e:
                                 print(f"  FAIL Failed to update {actual_subject_code}: {e}")
                     
@@ -531,7 +602,9 @@ def get_vtu_results(usn, url, expected_semester=None):
                         )
                         
                         try:
-                            cursor.execute(insert_query, data)
+                            with stage_timer.stage(STAGE_DB_WRITE):
+                                cursor.execute(insert_query, data)
+                            written_semesters.add(detected_semester)
                         except Exception as e:
                             # If foreign key constraint fails, try to add the subject first
                             if "foreign key constraint" in str(e).lower():
@@ -539,34 +612,55 @@ def get_vtu_results(usn, url, expected_semester=None):
                                 try:
                                     # Infer scheme from subject code
                                     subject_scheme = actual_subject_code[:2] if actual_subject_code[:2] in ['21', '22'] else '21'
-                                    cursor.execute("""
-                                        INSERT INTO subjects 
-                                        (subject_code, subject_name, semester, credits, scheme)
-                                        VALUES (%s, %s, %s, %s, %s)
-                                        ON DUPLICATE KEY UPDATE subject_name = VALUES(subject_name)
-                                    """, (actual_subject_code, actual_subject_name, detected_semester, 0, subject_scheme))
-                                    
-                                    # Now retry the results insert
-                                    cursor.execute(insert_query, data)
+                                    with stage_timer.stage(STAGE_DB_WRITE):
+                                        cursor.execute("""
+                                            INSERT INTO subjects 
+                                            (subject_code, subject_name, semester, credits, scheme)
+                                            VALUES (%s, %s, %s, %s, %s)
+                                            ON DUPLICATE KEY UPDATE subject_name = VALUES(subject_name)
+                                        """, (actual_subject_code, actual_subject_name, detected_semester, 0, subject_scheme))
+                                        
+                                        # Now retry the results insert
+                                        cursor.execute(insert_query, data)
+                                    written_semesters.add(detected_semester)
                                     print(f"  OK Added subject and inserted result")
                                 except Exception as e2:
                                     print(f"  FAIL Still failed: {e2}")
                             else:
                                 print(f"  FAIL Failed to insert {actual_subject_code}: {e}")
                 
-                connection.commit()
+                with stage_timer.stage(STAGE_COMMIT):
+                    connection.commit()
+                if deferred_summaries and written_semesters:
+                    try:
+                        with stage_timer.stage(STAGE_DB_WRITE):
+                            refresh_summaries(cursor, connection,
+                                              [(student_usn, semester) for semester in written_semesters])
+                    except Exception as e:
+                        print(f"  WARN Summary refresh failed for {student_usn}: {e}")
                 cursor.close()
                 close_connection(connection)
             
+            outcome = OUTCOME_OK
             print(f"OK {usn}")
             return True
             
+        except PermanentFailure:
+            raise
+        
+        except WebDriverException:
+            outcome = OUTCOME_TIMEOUT if contacting_portal else OUTCOME_ERROR
+            continue
+        
         except Exception:
             continue
         
         finally:
+            record_attempt(ticket, time.time() - attempt_start, outcome)
             if driver:
-                driver.quit()
+                with stage_timer.stage(STAGE_DRIVER_QUIT):
+                    driver.quit()
+            stage_timer.end_attempt()
             # Cleanup temp files
             try:
                 thread_id = threading.get_ident()
@@ -578,72 +672,179 @@ def get_vtu_results(usn, url, expected_semester=None):
     print(f"FAIL {usn}")
     return False
 
-# ==================== SMART RETRY LOGIC ====================
+def record_attempt(ticket, latency, outcome):
+    """Feed one scrape attempt (admitted with ticket) to the circuit breaker and the adaptive concurrency controller"""
+    if outcome == OUTCOME_TIMEOUT:
+        portal_breaker.report(ticket, False)
+    elif outcome == OUTCOME_ERROR:
+        portal_breaker.report(ticket, None)
+    else:
+        portal_breaker.report(ticket, True)
+    if concurrency_controller:
+        concurrency_controller.record(latency, outcome)
+
+def mark_invalid_usn(url, usn):
+    """Cache an invalid-USN verdict so later runs of the same URL skip it"""
+    print(f"INVALID {usn}")
+    if invalid_cache:
+        try:
+            invalid_cache.add(url, usn)
+        except Exception as e:
+            print(f"WARN Could not cache invalid USN {usn}: {e}")
+
+# ==================== SKIP ALREADY-SCRAPED ====================
 
-def scrape_with_smart_retry(usn_list, url, expected_semester=None, max_workers=5):
+# Raw scraped statuses ('P') and statuses set by calculate_grades.py ('PASS')
+PASSED_STATUSES = ('P', 'PASS')
+
+def find_complete_usns(usns, semester):
     """
-    Scrapes USNs with smart retry logic.
-    Stops when failed count stays constant for 2 consecutive attempts.
+    USNs whose results for a semester are already complete and final.
+    
+    A USN is complete when every subject it has has a passing attempt
+    (failed subjects stay in scope so backlog results are still picked up)
+    and it has as many distinct subjects as the best-covered student of its
+    batch for the semester - the whole batch, not just this request, so a
+    late-announced subject one student already has is fetched for the rest
+    (electives make the subjects table unreliable as a reference).
+    
+    Without a reference - the USN is not in student_details, or nobody else
+    of its batch has results for the semester - the USN is not skipped.
     """
-    failed_usns = set(usn_list)
-    retry_attempt = 0
-    previous_failed_count = len(failed_usns)
-    same_count_streak = 0
-    
-    while failed_usns:
-        retry_attempt += 1
-        print(f"\n{'='*60}")
-        print(f"RETRY Retry Attempt #{retry_attempt}")
-        print(f"INFO USNs to retry: {len(failed_usns)}")
-        print(f"{'='*60}\n")
-        
-        current_failed = set()
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_usn = {
-                executor.submit(get_vtu_results, usn, url, expected_semester): usn 
-                for usn in failed_usns
-            }
-            
-            for future in as_completed(future_to_usn):
-                usn = future_to_usn[future]
-                try:
-                    if not future.result():
-                        current_failed.add(usn)
-                except Exception:
-                    current_failed.add(usn)
-        
-        current_failed_count = len(current_failed)
-        
-        # Check stopping criteria
-        if current_failed_count == previous_failed_count:
-            same_count_streak += 1
-            print(f"\nWARN Failed count unchanged: {current_failed_count} (Streak: {same_count_streak}/2)")
-            
-            if same_count_streak >= 2:
-                print(f"\nSTOP Stopping retry: Failed count constant for 2 attempts")
-                if current_failed:
-                    print(f"INFO Persistently failed USNs ({len(current_failed)}):")
-                    for usn in sorted(current_failed):
-                        print(f"   - {usn}")
-                break
-        else:
-            same_count_streak = 0
-        
-        previous_failed_count = current_failed_count
-        failed_usns = current_failed
+    if not usns:
+        return set()
+    
+    connection = get_db_connection()
+    if not connection:
+        return set()
+    
+    cursor = connection.cursor()
+    placeholders = ', '.join(['%s'] * len(usns))
+    status_placeholders = ', '.join(['%s'] * len(PASSED_STATUSES))
+    try:
+        cursor.execute(f"""
+            SELECT r.student_usn, d.batch,
+                   COUNT(DISTINCT r.subject_code) AS subjects,
+                   COUNT(DISTINCT CASE WHEN r.result_status IN ({status_placeholders})
+                                       THEN r.subject_code END) AS cleared
+            FROM results r
+            INNER JOIN student_details d ON d.usn = r.student_usn
+            WHERE r.semester = %s AND r.student_usn IN ({placeholders})
+            GROUP BY r.student_usn, d.batch
+        """, (*PASSED_STATUSES, semester, *usns))
+        rows = cursor.fetchall()
         
-        if not failed_usns:
-            print(f"\nOK All USNs scraped successfully!")
-            break
+        reference = {}
+        batches = sorted({batch for _, batch, _, _ in rows})
+        if batches:
+            # Most subjects any student of the batch has for the semester
+            batch_placeholders = ', '.join(['%s'] * len(batches))
+            cursor.execute(f"""
+                SELECT batch, MAX(subjects), COUNT(*)
+                FROM (
+                    SELECT d.batch, r.student_usn, COUNT(DISTINCT r.subject_code) AS subjects
+                    FROM results r
+                    INNER JOIN student_details d ON d.usn = r.student_usn
+                    WHERE r.semester = %s AND d.batch IN ({batch_placeholders})
+                    GROUP BY d.batch, r.student_usn
+                ) per_student
+                GROUP BY batch
+            """, (semester, *batches))
+            reference = {batch: (expected, students) for batch, expected, students in cursor.fetchall()}
+    except Exception as e:
+        print(f"WARN Could not check existing results ({e}) - scraping everyone")
+        return set()
+    finally:
+        cursor.close()
+        close_connection(connection)
+    
+    complete = set()
+    for usn, batch, subjects, cleared in rows:
+        expected, students = reference.get(batch, (0, 0))
+        # students > 1: someone besides this USN defines what complete means
+        if students > 1 and subjects >= expected and cleared == subjects:
+            complete.add(usn)
+    return complete
+
+def skip_already_scraped(usns, semester):
+    """
+    Drop USNs whose semester results are already complete (see find_complete_usns).
+    
+    Skipped USNs are printed as "OK {usn}" so the FastAPI service still
+    counts them as succeeded.
+    """
+    complete = find_complete_usns(usns, semester)
+    if complete:
+        print(f"SKIP {len(complete)}/{len(usns)} USNs already have complete Sem {semester} results (use --force to re-scrape)")
+        for usn in sorted(complete):
+            print(f"OK {usn}")
+    return [usn for usn in usns if usn not in complete]
+
+# ==================== SMART RETRY LOGIC ====================
+
+def scrape_with_smart_retry(usn_list, url, expected_semester=None, max_workers=5,
+                            max_attempts=DEFAULT_MAX_ATTEMPTS, deadline_seconds=None,
+                            on_result=None):
+    """
+    Scrapes USNs on the continuous retry scheduler (see scrape_scheduler.py).
+    Every failed USN is re-queued on its own with exponential backoff, so a
+    slow USN never holds back the others. Stops when each USN has succeeded
+    or used up max_attempts, or when deadline_seconds has passed.
+    on_result(usn, success, attempts) is called once per USN when its
+    outcome is final.
+    
+    USNs cached as invalid for this URL are skipped up front, and USNs VTU
+    reports as invalid are given up without retries.
+    
+    Returns (persistently failed USNs, invalid USNs).
+    """
+    usn_list, cached_invalid = skip_invalid(invalid_cache, url, usn_list)
+    
+    scheduler = RetryScheduler(
+        lambda usn: get_vtu_results(usn, url, expected_semester),
+        workers=max_workers,
+        max_attempts=max_attempts,
+        deadline_seconds=deadline_seconds,
+        on_result=on_result,
+        concurrency=slot_limit or concurrency_controller
+    )
+    outcome = scheduler.run(usn_list)
+    
+    failed_usns = outcome['failed']
+    invalid_usns = sorted(cached_invalid) + outcome['permanent']
+    retried = sum(1 for attempts in outcome['attempts'].values() if attempts > 1)
+    
+    print(f"\n{'='*60}")
+    print(f"INFO First-try success: {outcome['first_try']}/{len(outcome['attempts'])}")
+    print(f"INFO Retried USNs: {retried} - Total attempts: {outcome['total_attempts']}")
+    print(f"TIME Time: {outcome['elapsed']:.2f}s ({outcome['elapsed']/60:.2f} min)")
+    if invalid_usns:
+        print(f"INFO Invalid USNs (not retried): {len(invalid_usns)}")
+    if failed_usns:
+        print(f"INFO Persistently failed USNs ({len(failed_usns)}):")
+        for usn in sorted(failed_usns):
+            print(f"   - {usn}")
+    else:
+        print(f"OK All USNs scraped successfully!")
+    print(f"{'='*60}")
     
-    return list(failed_usns)
+    return list(failed_usns), invalid_usns
 
 # ==================== SEMESTER-WISE SCRAPING ====================
 
-def scrape_semester_batch(semester_config, students, max_workers=5):
+def scrape_semester_batch(semester_config, students, max_workers=5,
+                          max_attempts=DEFAULT_MAX_ATTEMPTS, deadline_seconds=None,
+                          journal=None, batch=None, resume=False, force=False):
     """
     Scrape a single semester with retry logic.
+    First attempts and retries share one work queue.
+    
+    With a journal (scrape_state.ScrapeJournal) every final outcome is
+    checkpointed under (batch, semester, url, usn); with resume=True USNs
+    already done in the journal are skipped.
+    
+    USNs whose results for the semester are already complete are skipped
+    unless force=True.
     
     semester_config = {
         "semester": 4,
@@ -659,58 +860,48 @@ def scrape_semester_batch(semester_config, students, max_workers=5):
     print(f"USERS Students: {len(students)}")
     print(f"{'#'*60}\n")
     
-    # Initial scrape
-    failed_usns = []
-    success_count = 0
-    
-    start_time = time.time()
-    
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_usn = {
-            executor.submit(get_vtu_results, usn, url, semester): usn 
-            for usn in students
-        }
-        
-        for future in as_completed(future_to_usn):
-            usn = future_to_usn[future]
-            try:
-                if future.result():
-                    success_count += 1
-                else:
-                    failed_usns.append(usn)
-            except Exception:
-                failed_usns.append(usn)
+    to_scrape = students if force else skip_already_scraped(students, semester)
+    on_result = None
+    if journal:
+        if resume:
+            to_scrape, _ = skip_completed(journal, batch, semester, url, to_scrape)
+        on_result = journal.recorder(batch, semester, url)
     
-    elapsed = time.time() - start_time
+    persistent_failures, invalid_usns = scrape_with_smart_retry(
+        to_scrape, url, semester, max_workers,
+        max_attempts=max_attempts, deadline_seconds=deadline_seconds,
+        on_result=on_result
+    )
     
+    final_success = len(students) - len(persistent_failures) - len(invalid_usns)
     print(f"\n{'='*60}")
-    print(f"Initial Scrape Complete (Sem {semester}):")
-    print(f"OK Success: {success_count}/{len(students)}")
-    print(f"FAIL Failed: {len(failed_usns)}")
-    print(f"TIME Time: {elapsed:.2f}s ({elapsed/60:.2f} min)")
-    print(f"{'='*60}")
+    print(f"FINAL STATS - SEMESTER {semester}:")
+    print(f"OK Successfully scraped: {final_success}/{len(students)} ({final_success/len(students)*100:.1f}%)")
+    print(f"FAIL Permanently failed: {len(persistent_failures)}")
+    print(f"INVALID Invalid USNs: {len(invalid_usns)}")
+    stage_timer.report(f"STAGE TIMINGS - SEMESTER {semester}")
+    print(f"{'='*60}\n")
     
-    # Retry failed USNs
-    if failed_usns:
-        persistent_failures = scrape_with_smart_retry(failed_usns, url, semester, max_workers)
-        
-        final_success = len(students) - len(persistent_failures)
-        print(f"\n{'='*60}")
-        print(f"FINAL STATS - SEMESTER {semester}:")
-        print(f"OK Successfully scraped: {final_success}/{len(students)} ({final_success/len(students)*100:.1f}%)")
-        print(f"FAIL Permanently failed: {len(persistent_failures)}")
-        print(f"{'='*60}\n")
-        
-        return persistent_failures
-    
-    return []
+    return persistent_failures
 
 # ==================== MULTI-SEMESTER BATCH SCRAPING ====================
 
-def scrape_batch_all_semesters(batch_config, max_workers=5):
+def scrape_batch_all_semesters(batch_config, max_workers=5,
+                               max_attempts=DEFAULT_MAX_ATTEMPTS, deadline_seconds=None,
+                               per_url_limit=None, journal=None, resume=False, force=False):
     """
     Scrape all semesters for a batch.
     
+    Every (usn, semester) pair goes into one shared worker queue, so workers
+    move on to other semesters instead of idling through one semester's
+    retry tail. Semesters (results URLs) are served round-robin, and
+    per_url_limit caps concurrent requests to any single URL.
+    
+    With a journal every (usn, semester) outcome is checkpointed under the
+    batch name; resume=True skips pairs already done in a previous run.
+    Students whose results for a semester are already complete are skipped
+    for that semester unless force=True.
+    
     batch_config = {
         "batch_name": "21 Scheme IS",
         "usn_pattern": "1BI21IS%",
@@ -753,22 +944,62 @@ def scrape_batch_all_semesters(batch_config, max_workers=5):
     if diploma_count > 0:
         print(f"[WARN]  Detected {diploma_count} diploma students (will skip Sem 1-2)")
     
-    print(f"[SCRAPER] Using {max_workers} parallel workers\n")
+    cap_text = f", max {per_url_limit} per URL" if per_url_limit else ""
+    print(f"[SCRAPER] Using {max_workers} parallel workers shared by all semesters{cap_text}\n")
     
     overall_start = time.time()
-    all_failures = {}
     
-    # Scrape each semester
+    # One task per (usn, semester), interleaved across semesters
+    url_by_semester = {sem_config['semester']: sem_config['url'] for sem_config in batch_config['semesters']}
+    tasks = []
+    all_invalid = {}
     for sem_config in batch_config['semesters']:
-        failures = scrape_semester_batch(sem_config, students, max_workers)
-        if failures:
-            all_failures[sem_config['semester']] = failures
-        
-        # Small delay between semesters
-        time.sleep(2)
+        pending = students if force else skip_already_scraped(students, sem_config['semester'])
+        pending, cached_invalid = skip_invalid(invalid_cache, sem_config['url'], pending)
+        for usn in cached_invalid:
+            all_invalid.setdefault(sem_config['semester'], []).append(usn)
+        if journal and resume:
+            pending, _ = skip_completed(journal, batch_config['batch_name'],
+                                        sem_config['semester'], sem_config['url'], pending)
+        tasks.extend((usn, sem_config['semester']) for usn in pending)
+    
+    on_result = None
+    if journal:
+        def on_result(task, success, attempts):
+            usn, semester = task
+            journal.record(batch_config['batch_name'], semester, url_by_semester[semester],
+                           usn, success, attempts)
+    
+    scheduler = RetryScheduler(
+        lambda task: get_vtu_results(task[0], url_by_semester[task[1]], task[1]),
+        workers=max_workers,
+        max_attempts=max_attempts,
+        deadline_seconds=deadline_seconds,
+        group_of=lambda task: url_by_semester[task[1]],
+        group_limit=per_url_limit,
+        label=lambda task: f"{task[0]} (Sem {task[1]})",
+        on_result=on_result,
+        concurrency=slot_limit or concurrency_controller
+    )
+    outcome = scheduler.run(tasks)
+    
+    all_failures = {}
+    for usn, semester in outcome['failed']:
+        all_failures.setdefault(semester, []).append(usn)
+    for usn, semester in outcome['permanent']:
+        all_invalid.setdefault(semester, []).append(usn)
     
     overall_elapsed = time.time() - overall_start
     
+    print(f"\n{'='*70}")
+    print(f"SEM Per-semester results:")
+    for semester in sorted(url_by_semester):
+        failed_count = len(all_failures.get(semester, []))
+        invalid_count = len(all_invalid.get(semester, []))
+        ok_count = len(students) - failed_count - invalid_count
+        print(f"   Sem {semester}: {ok_count}/{len(students)} OK, {failed_count} failed, {invalid_count} invalid")
+    print(f"INFO First-try success: {outcome['first_try']}/{len(tasks)} - Total attempts: {outcome['total_attempts']}")
+    
     # Final summary
     print(f"\n{'='*70}")
     print(f"[DONE] BATCH COMPLETE: {batch_config['batch_name']}")
@@ -778,6 +1009,7 @@ def scrape_batch_all_semesters(batch_config, max_workers=5):
     if all_failures:
         print(f"\n[WARN]  PERSISTENT FAILURES BY SEMESTER:")
         for sem, usns in sorted(all_failures.items()):
+            usns.sort()
             print(f"   Sem {sem}: {len(usns)} USNs")
             for usn in usns[:5]:  # Show first 5
                 print(f"      - {usn}")
@@ -786,6 +1018,8 @@ def scrape_batch_all_semesters(batch_config, max_workers=5):
     else:
         print(f"\nOK NO PERSISTENT FAILURES - ALL STUDENTS SCRAPED SUCCESSFULLY!")
     
+    stage_timer.report(f"STAGE TIMINGS - {batch_config['batch_name']}")
+    print(portal_breaker.stats_line())
     print()
 
 # ==================== MAIN ====================
@@ -800,8 +1034,29 @@ if __name__ == "__main__":
     parser.add_argument('--scheme', type=str, help='Scheme (21/22)', required=False)
     parser.add_argument('--workers', type=int, default=7, help='Number of parallel workers')
     parser.add_argument('--usns', type=str, help='Comma-separated USN list', required=False)
+    parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help=f'Browser tries per USN before giving up, with backoff between them (default {DEFAULT_MAX_ATTEMPTS})')
+    parser.add_argument('--deadline-minutes', type=float, default=None,
+                        help='Stop starting new attempts after this many minutes')
+    parser.add_argument('--checkpoint', type=str, nargs='?', const=DEFAULT_JOURNAL_PATH, default=None,
+                        help='Record progress in a SQLite journal (default path: scrape_journal.db)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip USNs already done in the checkpoint journal (implies --checkpoint)')
+    parser.add_argument('--force', action='store_true',
+                        help='Scrape every USN, even those whose semester results are already complete')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Adjust the worker count at runtime (AIMD), starting from --workers')
+    parser.add_argument('--min-workers', type=int, default=DEFAULT_MIN_WORKERS,
+                        help=f'Lower bound for --adaptive (default {DEFAULT_MIN_WORKERS})')
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f'Upper bound for --adaptive (default {DEFAULT_MAX_WORKERS})')
+    parser.add_argument('--slot-file', type=str, default=None,
+                        help='File with the live worker allocation (written by the FastAPI job scheduler)')
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
+    profile_from_args(args, 'ultimate_scraper')
+    deadline_seconds = args.deadline_minutes * 60 if args.deadline_minutes else None
     
     print("="*70)
     print("SCRAPER VTU RESULTS SCRAPER")
@@ -814,6 +1069,7 @@ if __name__ == "__main__":
         semester = args.semester
         scheme = args.scheme
         workers = args.workers
+        batch_key = f"scheme-{scheme}"
         
         # Validate inputs
         if semester < 1 or semester > 8:
@@ -892,6 +1148,7 @@ if __name__ == "__main__":
             
             students = [usn]
             workers = 1
+            batch_key = "single"
             
         elif mode == '2':
             # Batch mode
@@ -935,6 +1192,8 @@ if __name__ == "__main__":
             if not students:
                 print(f"FAIL No students found for batch {batch}")
                 sys.exit(0)
+            
+            batch_key = batch
         else:
             print("FAIL Invalid choice. Exiting.")
             sys.exit(0)
@@ -965,7 +1224,27 @@ if __name__ == "__main__":
         "url": url
     }
     
-    failures = scrape_semester_batch(semester_config, students, max_workers=workers)
+    journal = None
+    if args.checkpoint or args.resume:
+        journal = ScrapeJournal(args.checkpoint or DEFAULT_JOURNAL_PATH)
+        print(f"INFO Checkpoint journal: {journal.path} (batch key: {batch_key})")
+    
+    if args.adaptive:
+        concurrency_controller = AdaptiveConcurrency(args.min_workers, args.max_workers, initial=workers)
+        print(f"INFO Adaptive workers: start {concurrency_controller.limit}, "
+              f"range {concurrency_controller.min_workers}-{concurrency_controller.max_workers}")
+    
+    if args.slot_file:
+        slot_limit = SlotFileLimit(args.slot_file, workers, inner=concurrency_controller)
+        print(f"INFO Worker slots from {args.slot_file}: {slot_limit.limit} of {slot_limit.max_workers}")
+    
+    failures = scrape_semester_batch(semester_config, students, max_workers=workers,
+                                     max_attempts=args.max_attempts, deadline_seconds=deadline_seconds,
+                                     journal=journal, batch=batch_key, resume=args.resume,
+                                     force=args.force)
+    
+    if journal:
+        journal.close()
     
     print()
     print("="*70)
@@ -981,5 +1260,11 @@ if __name__ == "__main__":
     else:
         print("OK All students scraped successfully!")
     
+    if concurrency_controller:
+        aimd = concurrency_controller.stats()
+        print(f"AIMD Final workers: {aimd['limit']} (peak {aimd['peak']}, "
+              f"{aimd['increases']} increases, {aimd['decreases']} decreases)")
+    print(portal_breaker.stats_line())
+    
     print("="*70)
 